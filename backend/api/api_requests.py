@@ -6,39 +6,22 @@ import redis
 import json
 
 from datetime import datetime, timezone, timedelta
-from dotenv import load_dotenv
 from threading import Lock
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from config.settings import load_env, get_setting
 from config.db_connection import get_redis_connection
 from utils.logging_utils import setup_logger, log_info, log_warning, log_error
 from utils.notification_utils import add_to_batch_notification
+from utils.profiling_utils import record_timing, timed
 
-# Load environment variables from .env file
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+# Load environment variables from .env file (once per process)
+load_env()
 
-# API details
-API_KEY = os.getenv("API_KEY")
-if not API_KEY:
-    raise ValueError("API_KEY is not set in the .env file.")
-
-BASE_URL = os.getenv("BASE_URL")
-if not BASE_URL:
-    raise ValueError("BASE_URL is not set in the .env file.")
-
-BASE_HOST = os.getenv("BASE_HOST")
-if not BASE_HOST:
-    raise ValueError("BASE_HOST is not set in the .env file.")
-
-HEADERS = {
-    "X-RapidAPI-Key": API_KEY,
-    "X-RapidAPI-Host": BASE_HOST
-}
+# Dane dostępowe API (API_KEY, BASE_URL, BASE_HOST) sprawdzane przy pierwszym zapytaniu, nie przy imporcie
+_api_config = None
 
 # Variables
 redis_client = get_redis_connection()
@@ -51,6 +34,20 @@ REQUESTS_PER_MINUTE = int(os.getenv("REQUESTS_PER_MINUTE", 30))
 DAILY_LIMIT = int(os.getenv("DAILY_LIMIT", 100))
 REQUEST_INTERVAL = 60 / REQUESTS_PER_MINUTE  # Time between requests to stay within the limit
 
+# Wspólny (między procesami) limiter zapytań - włączany dla workerów w trybie shardowanym
+SHARED_RATE_LIMIT = os.getenv("SHARED_RATE_LIMIT", "0") == "1"
+SHARED_RATE_LIMIT_KEY = "api_rate_limit:next_slot"
+
+# Rezerwuje najbliższy wolny slot czasowy: zwraca czas startu slotu i przesuwa kolejny o interwał
+_reserve_slot_script = redis_client.register_script("""
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local next_slot = tonumber(redis.call('GET', KEYS[1]) or '0')
+local slot = math.max(now, next_slot)
+redis.call('SET', KEYS[1], tostring(slot + interval), 'EX', 3600)
+return tostring(slot)
+""")
+
 def get_ttl_to_midnight():
     now = datetime.now()
     next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
@@ -86,11 +83,27 @@ def can_execute_request():
         return False
     return True
 
+def is_daily_limit_reached():
+    """Sprawdza (bez inkrementacji licznika), czy dzienny limit API został wyczerpany."""
+    daily_count = int(redis_client.get("api_requests_daily") or 0)
+    return daily_count >= DAILY_LIMIT
+
+def get_api_config():
+    """Zwraca (BASE_URL, nagłówki zapytań); brak zmiennych w .env zgłaszany jest przy pierwszym użyciu."""
+    global _api_config
+    if _api_config is None:
+        api_key = get_setting("API_KEY", required=True)
+        base_url = get_setting("BASE_URL", required=True)
+        base_host = get_setting("BASE_HOST", required=True)
+        _api_config = (base_url, {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": base_host})
+    return _api_config
+
 def fetch_from_api(endpoint, params=None):
-    url = f"{BASE_URL}{endpoint}"
+    base_url, headers = get_api_config()
+    url = f"{base_url}{endpoint}"
 
     try:
-        response = requests.get(url, headers=HEADERS, params=params, timeout=10)
+        response = requests.get(url, headers=headers, params=params, timeout=10)
     except requests.RequestException as e:
         log_error(logger, f"⚠️ Błąd połączenia z API: {e}")
         return None
@@ -131,8 +144,18 @@ def fetch_from_api(endpoint, params=None):
 
     return response.json()
 
+def shared_rate_limited_fetch(fetch_function, endpoint, params):
+    """Limiter współdzielony przez wszystkie procesy za pomocą slotów czasowych w Redis."""
+    slot = float(_reserve_slot_script(keys=[SHARED_RATE_LIMIT_KEY], args=[time.time(), REQUEST_INTERVAL]))
+    wait = slot - time.time()
+    if wait > 0:
+        time.sleep(wait)
+    return fetch_function(endpoint, params)
+
 def rate_limited_fetch(fetch_function, endpoint, params):
     global last_request_time
+    if SHARED_RATE_LIMIT:
+        return shared_rate_limited_fetch(fetch_function, endpoint, params)
     with lock:
         now = time.time()
         elapsed = now - last_request_time
@@ -141,7 +164,13 @@ def rate_limited_fetch(fetch_function, endpoint, params):
         last_request_time = time.time()
     return fetch_function(endpoint, params)
 
-def get_data(endpoint, params=None, cache_ttl=None):
+def get_data(endpoint, params=None, cache_ttl=None, cache=True):
+    """
+    Pobiera dane z API z cache `api_cache:*`.
+    `cache=False` pomija ten cache - dla endpointów, których odpowiedź wywołujący przechowuje sam
+    jako kanoniczną kopię (np. `predictions:{fixture_id}`). Wtedy zwracana jest surowa odpowiedź,
+    także z pustą listą `response`; None oznacza błąd zapytania albo wyczerpany limit.
+    """
     if cache_ttl is None:
         cache_ttl = get_ttl_to_midnight()
 
@@ -150,11 +179,12 @@ def get_data(endpoint, params=None, cache_ttl=None):
     log_info(logger, f"Daily API requests made: {daily_count}/{DAILY_LIMIT}")
 
     cache_key = f"api_cache:{endpoint}:{json.dumps(params, sort_keys=True)}" if params else f"api_cache:{endpoint}"
-    cached_data = redis_client.get(cache_key)
+    cached_data = redis_client.get(cache_key) if cache else None
 
     if cached_data:
         try:
-            data = json.loads(cached_data)
+            with timed("json_decode"):
+                data = json.loads(cached_data)
             if data == "NO_DATA":
                 log_info(logger, f"No data found (cached) for {endpoint} with params {params}")
                 return None
@@ -170,13 +200,18 @@ def get_data(endpoint, params=None, cache_ttl=None):
     start_time = time.time()
     data = rate_limited_fetch(fetch_from_api, endpoint, params)
     elapsed_time = time.time() - start_time
+    record_timing("api_wait", elapsed_time)
 
     if elapsed_time > 2:
         log_warning(logger, f"Slow request: {endpoint} with params {params} took {elapsed_time:.2f} seconds")
 
     if not data or 'response' not in data or not data['response']:
+        if not cache:
+            # Pusta odpowiedź (brak danych) odróżniona od błędu - decyzję o zapamiętaniu braku podejmuje wywołujący
+            return data if isinstance(data, dict) else None
         redis_client.setex(cache_key, cache_ttl, json.dumps("NO_DATA"))
         return None
 
-    redis_client.setex(cache_key, cache_ttl, json.dumps(data))
+    if cache:
+        redis_client.setex(cache_key, cache_ttl, json.dumps(data))
     return data
\ No newline at end of file
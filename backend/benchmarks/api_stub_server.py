@@ -0,0 +1,200 @@
+"""
+Lokalny zamiennik API-Football do benchmarków.
+Zwraca syntetyczne, deterministyczne odpowiedzi dla endpointów używanych przez ETL
+(fixtures, predictions, statistics, events, teams, players, standings, coachs, leagues)
+z konfigurowalnym opóźnieniem. Uruchomienie:
+
+    python benchmarks/api_stub_server.py --port 8099 --latency-ms 80
+
+i w środowisku ETL: BASE_URL=http://127.0.0.1:8099/
+"""
+import json
+import time
+import random
+import argparse
+
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES_PER_LEAGUE_DAY = 8
+TEAMS_PER_LEAGUE = 20
+PLAYERS_PER_TEAM = 25
+SEASON = 2024
+
+def team_ids_for_league(league_id):
+    return [league_id * 1000 + i for i in range(1, TEAMS_PER_LEAGUE + 1)]
+
+def league_for_team(team_id):
+    return team_id // 1000
+
+def make_fixture(fixture_id, league_id=None, date=None, finished=False):
+    rnd = random.Random(fixture_id)
+    league_id = league_id or (fixture_id // 100000) or 39
+    teams = team_ids_for_league(league_id)
+    home, away = rnd.sample(teams, 2)
+    kickoff = date or (datetime(2025, 1, 1) + timedelta(days=fixture_id % 300)).strftime("%Y-%m-%d")
+    goals_home, goals_away = (rnd.randint(0, 4), rnd.randint(0, 4)) if finished else (None, None)
+    return {
+        "fixture": {
+            "id": fixture_id,
+            "referee": f"Referee {fixture_id % 37}",
+            "date": f"{kickoff}T18:00:00+00:00",
+            "venue": {"id": home, "name": f"Stadium {home}", "city": "City"},
+            "status": {"long": "Match Finished" if finished else "Not Started", "short": "FT" if finished else "NS",
+                       "elapsed": 90 if finished else None, "extra": None},
+        },
+        "league": {"id": league_id, "name": f"League {league_id}", "season": SEASON, "round": "Regular Season - 1"},
+        "teams": {
+            "home": {"id": home, "name": f"Team {home}", "winner": None if not finished else goals_home > goals_away if goals_home != goals_away else None},
+            "away": {"id": away, "name": f"Team {away}", "winner": None if not finished else goals_away > goals_home if goals_home != goals_away else None},
+        },
+        "goals": {"home": goals_home, "away": goals_away},
+        "score": {
+            "halftime": {"home": goals_home, "away": goals_away},
+            "fulltime": {"home": goals_home, "away": goals_away},
+            "extratime": {"home": None, "away": None},
+            "penalty": {"home": None, "away": None},
+        },
+    }
+
+def make_team(team_id):
+    return {
+        "team": {"id": team_id, "name": f"Team {team_id}", "country": "Country", "founded": 1900, "logo": ""},
+        "venue": {"name": f"Stadium {team_id}", "capacity": 30000, "address": "Street 1", "city": "City", "surface": "grass", "image": ""},
+    }
+
+def make_player(player_id, team_id):
+    league_id = league_for_team(team_id)
+    return {
+        "player": {"id": player_id, "name": f"P. {player_id}", "firstname": "P", "lastname": str(player_id), "age": 25,
+                   "birth": {"date": "1999-01-01", "place": "City", "country": "Country"}, "nationality": "Country",
+                   "height": "180 cm", "weight": "75 kg", "injured": False, "photo": ""},
+        "statistics": [{
+            "team": {"id": team_id}, "league": {"id": league_id, "season": SEASON},
+            "games": {"appearences": 10, "lineups": 8, "minutes": 700, "position": "Midfielder", "rating": "6.9"},
+            "goals": {"total": 2, "assists": 1}, "shots": {"total": 12, "on": 5},
+            "passes": {"total": 300, "key": 10, "accuracy": 82}, "tackles": {"total": 15, "blocks": 2, "interceptions": 6},
+            "duels": {"total": 60, "won": 31}, "dribbles": {"attempts": 10, "success": 6},
+            "fouls": {"drawn": 9, "committed": 7}, "cards": {"yellow": 1, "red": 0},
+            "penalty": {"scored": 0, "missed": 0},
+        }],
+    }
+
+def make_standings(league_id):
+    rows = []
+    for rank, team_id in enumerate(team_ids_for_league(league_id), start=1):
+        side = {"played": 5, "win": 2, "draw": 2, "lose": 1, "goals": {"for": 7, "against": 5}}
+        rows.append({"rank": rank, "team": {"id": team_id}, "points": 40 - rank, "goalsDiff": 10 - rank, "form": "WDLWW",
+                     "status": "same", "description": None, "all": {"goals": {"for": 14, "against": 10}}, "home": side, "away": side})
+    return [{"league": {"id": league_id, "season": SEASON, "standings": [rows]}}]
+
+def build_response(endpoint, params):
+    """Buduje listę `response` dla danego endpointu i parametrów."""
+    if endpoint == "fixtures":
+        if "id" in params:
+            return [make_fixture(int(params["id"]))]
+        if "ids" in params:
+            return [make_fixture(int(fixture_id)) for fixture_id in params["ids"].split("-")]
+        if "team" in params:
+            team_id = int(params["team"])
+            last = int(params.get("last", 10))
+            return [make_fixture(team_id * 100 + i, league_id=league_for_team(team_id), finished=True) for i in range(last)]
+        if "date" in params:
+            leagues = [int(params["league"])] if "league" in params else [39, 61, 78, 135, 140]
+            day = int(params["date"].replace("-", "")) % 1000
+            return [make_fixture(league_id * 100000 + day * 10 + i % 10, league_id=league_id, date=params["date"])
+                    for league_id in leagues for i in range(FIXTURES_PER_LEAGUE_DAY)]
+        return []
+    if endpoint == "fixtures/statistics":
+        fixture = make_fixture(int(params["fixture"]), finished=True)
+        return [{"team": {"id": fixture["teams"][side]["id"]}, "statistics": [
+            {"type": "Shots on Goal", "value": 5}, {"type": "Total Shots", "value": 12}, {"type": "Fouls", "value": 11},
+            {"type": "Ball Possession", "value": "51%"}, {"type": "Yellow Cards", "value": 2}, {"type": "Passes %", "value": "83%"},
+        ]} for side in ("home", "away")]
+    if endpoint == "fixtures/events":
+        fixture = make_fixture(int(params["fixture"]), finished=True)
+        home = fixture["teams"]["home"]["id"]
+        return [{"time": {"elapsed": 23, "extra": None}, "team": {"id": home}, "player": {"id": home * 100 + 9},
+                 "assist": {"id": home * 100 + 10}, "type": "Goal", "detail": "Normal Goal"}]
+    if endpoint == "predictions":
+        fixture = make_fixture(int(params["fixture"]))
+        home, away = fixture["teams"]["home"], fixture["teams"]["away"]
+        return [{
+            "predictions": {"winner": {"id": home["id"], "name": home["name"]}, "advice": "Double chance : home or draw",
+                            "percent": {"home": "45%", "draw": "30%", "away": "25%"}, "goals": {"home": "-2.5", "away": "-1.5"}},
+            "teams": {"home": {"id": home["id"], "last_5": {"form": "60%", "att": "55%", "def": "50%"}},
+                      "away": {"id": away["id"], "last_5": {"form": "40%", "att": "45%", "def": "52%"}}},
+            "comparison": {"form": {"home": "60%", "away": "40%"}, "total": {"home": "55%", "away": "45%"}},
+            "h2h": [make_fixture(fixture["fixture"]["id"] * 10 + i, league_id=fixture["league"]["id"], finished=True) for i in range(5)],
+        }]
+    if endpoint == "teams":
+        if "id" in params:
+            return [make_team(int(params["id"]))]
+        return [make_team(team_id) for team_id in team_ids_for_league(int(params.get("league", 39)))]
+    if endpoint == "teams/seasons":
+        return [2022, 2023, SEASON]
+    if endpoint == "players":
+        if "id" in params:
+            player_id = int(params["id"])
+            return [make_player(player_id, player_id // 100)]
+        team_id = int(params["team"])
+        return [make_player(team_id * 100 + i, team_id) for i in range(1, PLAYERS_PER_TEAM + 1)]
+    if endpoint == "standings":
+        league_id = int(params["league"]) if "league" in params else league_for_team(int(params["team"]))
+        return make_standings(league_id)
+    if endpoint == "coachs":
+        team_id = int(params["team"])
+        return [{"name": f"Coach {team_id}", "career": [{"team": {"id": team_id}, "start": "2023-07-01", "end": None}]}]
+    if endpoint == "leagues":
+        return [{"league": {"id": league_id, "name": f"League {league_id}", "type": "League", "logo": ""},
+                 "country": {"name": "Country", "code": "CC", "flag": ""},
+                 "seasons": [{"year": SEASON, "start": f"{SEASON}-08-01", "end": f"{SEASON + 1}-05-31", "current": True}]}
+                for league_id in (39, 61, 78, 135, 140)]
+    return []
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    requests_served = 0
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        endpoint = parsed.path.strip("/")
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        time.sleep(self.latency)
+        StubHandler.requests_served += 1
+
+        payload = {"get": endpoint, "parameters": params, "errors": [], "paging": {"current": 1, "total": 1}}
+        payload["response"] = build_response(endpoint, params)
+        payload["results"] = len(payload["response"])
+        body = json.dumps(payload).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-RateLimit-requests-Remaining", "1000000")
+        self.send_header("X-RateLimit-requests-Reset", "60")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port, latency_ms):
+    StubHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    print(f"API stub listening on http://127.0.0.1:{port}/ (latency {latency_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {StubHandler.requests_served} requests.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokalny zamiennik API-Football do benchmarków")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=int, default=80)
+    args = parser.parse_args()
+    serve(args.port, args.latency_ms)
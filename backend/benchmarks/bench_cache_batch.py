@@ -0,0 +1,96 @@
+"""
+Benchmark odczytu i zapisu cache dla listy ID: dotychczasowa pętla (GET / SETEX na każde ID)
+vs cache_get_many (MGET) i cache_set_many (SETEX w pipeline). Wartości mają rozmiar zbliżony
+do pojedynczego meczu z `fixtures` API; klucze benchmarku są usuwane po każdym pomiarze.
+Wymaga Redis z .env.
+
+    python benchmarks/bench_cache_batch.py --sizes 1000 10000
+"""
+import sys
+import os
+import json
+import time
+import argparse
+
+from datetime import datetime
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'logs', 'benchmarks')
+
+PREFIX = "bench_cache_batch"
+TTL = 600
+
+def build_payload(fixture_id):
+    return {
+        "fixture": {"id": fixture_id, "referee": "Benchmark Referee", "timezone": "UTC",
+                    "date": "2025-01-01T20:00:00+00:00", "timestamp": 1735761600,
+                    "venue": {"id": 1, "name": "Benchmark Stadium", "city": "Benchmark"},
+                    "status": {"long": "Match Finished", "short": "FT", "elapsed": 90}},
+        "league": {"id": 39, "name": "Premier League", "country": "England", "season": 2024, "round": "Regular Season - 20"},
+        "teams": {"home": {"id": 1, "name": "Home", "winner": True}, "away": {"id": 2, "name": "Away", "winner": False}},
+        "goals": {"home": 2, "away": 1},
+        "score": {"halftime": {"home": 1, "away": 0}, "fulltime": {"home": 2, "away": 1}},
+    }
+
+def clear_keys(redis_client, ids):
+    for i in range(0, len(ids), 1000):
+        redis_client.delete(*(f"{PREFIX}:{item_id}" for item_id in ids[i:i + 1000]))
+
+def measure(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def loop_set(redis_client, mapping):
+    for item_id, value in mapping.items():
+        redis_client.setex(f"{PREFIX}:{item_id}", TTL, json.dumps(value))
+
+def loop_get(redis_client, ids):
+    values = {}
+    for item_id in ids:
+        raw = redis_client.get(f"{PREFIX}:{item_id}")
+        if raw:
+            values[item_id] = json.loads(raw)
+    return values
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark zbiorczego cache (MGET / pipeline SETEX)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Liczby ID do zmierzenia")
+    args = parser.parse_args()
+
+    from config.db_connection import get_redis_connection
+    from utils.cache_utils import cache_get_many, cache_set_many
+
+    redis_client = get_redis_connection()
+    results = {}
+    for size in args.sizes:
+        ids = list(range(5000001, 5000001 + size))
+        mapping = {item_id: build_payload(item_id) for item_id in ids}
+        try:
+            clear_keys(redis_client, ids)
+            set_loop = measure(lambda: loop_set(redis_client, mapping))
+            get_loop = measure(lambda: loop_get(redis_client, ids))
+            clear_keys(redis_client, ids)
+            set_batch = measure(lambda: cache_set_many(PREFIX, mapping, TTL))
+            get_batch = measure(lambda: cache_get_many(PREFIX, ids))
+        finally:
+            clear_keys(redis_client, ids)
+
+        results[size] = {"set_loop": set_loop, "set_batch": set_batch, "get_loop": get_loop, "get_batch": get_batch}
+        print(f"{size} IDs")
+        for name, seconds in results[size].items():
+            print(f"  {name:<10} {seconds:8.3f}s")
+        print(f"  speedup set: {set_loop / set_batch:.2f}x, get: {get_loop / get_batch:.2f}x")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = os.path.join(RESULTS_DIR, f"cache_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump({str(size): {name: round(seconds, 4) for name, seconds in timings.items()}
+                   for size, timings in results.items()}, f, indent=2)
+    print(f"Wyniki zapisane w {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark pobierania statystyk dla listy meczów H2H: dotychczasowa pętla sekwencyjna
+(fetch_match_statistics mecz po meczu) vs prefetch_match_statistics (MGET + pula wątków).
+Lista H2H pochodzi z endpointu `predictions` lokalnego zamiennika API (5 meczów H2H na mecz),
+więc ma realistyczną strukturę. Mierzone są przebiegi na zimnym i ciepłym cache.
+Wymaga Redis z .env.
+
+    python benchmarks/bench_h2h_prefetch.py --fixtures 20 --latency-ms 80
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import subprocess
+
+from datetime import datetime
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'logs', 'benchmarks')
+
+def build_h2h_list(get_data, fixtures):
+    h2h_matches = []
+    for fixture_id in range(3900001, 3900001 + fixtures):
+        response = get_data("predictions", params={"fixture": fixture_id}, cache_ttl=60)
+        if response and response.get('response'):
+            h2h_matches.extend(response['response'][0].get('h2h', []))
+    return h2h_matches
+
+def clear_statistics_cache(redis_client, fixture_ids):
+    pipeline = redis_client.pipeline(transaction=False)
+    for fixture_id in fixture_ids:
+        pipeline.delete(f"match_statistics:{fixture_id}")
+        pipeline.delete(f"api_cache:fixtures/statistics:{json.dumps({'fixture': fixture_id}, sort_keys=True)}")
+    pipeline.execute()
+
+def measure(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prefetchu statystyk H2H")
+    parser.add_argument("--fixtures", type=int, default=20, help="Liczba meczów, dla których pobieramy listę H2H")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=int, default=80)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), "api_stub_server.py"),
+         "--port", str(args.port), "--latency-ms", str(args.latency_ms)],
+        stdout=subprocess.DEVNULL
+    )
+    time.sleep(1)
+    os.environ.update({
+        "BASE_URL": f"http://127.0.0.1:{args.port}/",
+        "BASE_HOST": "127.0.0.1",
+        "API_KEY": os.environ.get("API_KEY", "benchmark"),
+        "REQUESTS_PER_MINUTE": "60000",
+        "DAILY_LIMIT": "10000000",
+    })
+
+    try:
+        from api.api_requests import get_data
+        from config.db_connection import get_redis_connection
+        from utils.match_statistics_utils import fetch_match_statistics, prefetch_match_statistics
+
+        redis_client = get_redis_connection()
+        h2h_matches = build_h2h_list(get_data, args.fixtures)
+        fixture_ids = [match['fixture']['id'] for match in h2h_matches]
+        print(f"H2H list: {len(fixture_ids)} fixtures")
+
+        results = {}
+        for label in ("cold", "warm"):
+            if label == "cold":
+                clear_statistics_cache(redis_client, fixture_ids)
+            results[f"sequential_{label}"] = measure(lambda: [fetch_match_statistics(fixture_id) for fixture_id in fixture_ids])
+            if label == "cold":
+                clear_statistics_cache(redis_client, fixture_ids)
+            results[f"prefetch_{label}"] = measure(lambda: prefetch_match_statistics(fixture_ids, max_workers=args.workers))
+
+        for name, seconds in results.items():
+            print(f"{name:<18} {seconds:8.3f}s")
+        print(f"speedup cold: {results['sequential_cold'] / results['prefetch_cold']:.2f}x, "
+              f"warm: {results['sequential_warm'] / results['prefetch_warm']:.2f}x")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = os.path.join(RESULTS_DIR, f"h2h_prefetch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump({"latency_ms": args.latency_ms, "fixtures": len(fixture_ids),
+                   "results": {name: round(seconds, 4) for name, seconds in results.items()}}, f, indent=2)
+    print(f"Wyniki zapisane w {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark kolejki zadań (Redis Streams): czas opróżnienia kolejki przez 1, 2, 4 i 8 workerów.
+Uruchamia lokalny zamiennik API (api_stub_server.py), dla każdego przebiegu wrzuca zadania
+(`worker.py enqueue`) i startuje N procesów `worker.py run --drain`. Wymaga MySQL i Redis z .env.
+
+    python benchmarks/bench_job_queue.py --workers 1 2 4 8 --types statistics predictions --flush-redis
+
+UWAGA: --flush-redis czyści bazę Redis wskazaną przez REDIS_DB (używaj osobnej bazy do benchmarków).
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import subprocess
+
+from datetime import datetime
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'logs', 'benchmarks')
+WORKER = os.path.join(BACKEND_DIR, "worker.py")
+
+def flush_redis():
+    from config.db_connection import get_redis_connection
+    get_redis_connection().flushdb()
+
+def run_once(workers, job_types, env):
+    subprocess.run([sys.executable, WORKER, "enqueue", "--types", *job_types], cwd=BACKEND_DIR, env=env, check=False,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    start = time.perf_counter()
+    processes = [
+        subprocess.Popen([sys.executable, WORKER, "run", "--drain", "--types", *job_types, "--consumer", f"bench-{i}"],
+                         cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.wait()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark workerów kolejki zadań")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--types", nargs="+", default=["statistics", "predictions"])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=int, default=80)
+    parser.add_argument("--flush-redis", action="store_true", help="Czyść Redis przed każdym przebiegiem")
+    args = parser.parse_args()
+
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), "api_stub_server.py"),
+         "--port", str(args.port), "--latency-ms", str(args.latency_ms)],
+        stdout=subprocess.DEVNULL
+    )
+    time.sleep(1)
+
+    env = dict(os.environ)
+    env.update({
+        "BASE_URL": f"http://127.0.0.1:{args.port}/",
+        "BASE_HOST": "127.0.0.1",
+        "API_KEY": env.get("API_KEY", "benchmark"),
+        "REQUESTS_PER_MINUTE": "60000",
+        "DAILY_LIMIT": "10000000",
+        "SHARED_RATE_LIMIT": "1",
+        "JOB_CLAIM_IDLE_MS": "600000",
+    })
+
+    results = []
+    try:
+        for workers in args.workers:
+            if args.flush_redis:
+                flush_redis()
+            elapsed = run_once(workers, args.types, env)
+            results.append({"workers": workers, "wall_seconds": round(elapsed, 2)})
+            print(f"workers={workers:<3} wall={elapsed:8.2f}s speedup={results[0]['wall_seconds'] / elapsed:5.2f}x")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = os.path.join(RESULTS_DIR, f"job_queue_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump({"latency_ms": args.latency_ms, "types": args.types, "results": results}, f, indent=2)
+    print(f"Wyniki zapisane w {output}")
+
+if __name__ == "__main__":
+    main()
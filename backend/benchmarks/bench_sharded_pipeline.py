@@ -0,0 +1,84 @@
+"""
+Benchmark skalowania trybu shardowanego `update_data.py --workers N`.
+Uruchamia lokalny zamiennik API (api_stub_server.py) i mierzy czas całego procesu
+dla 1, 2, 4 i 8 workerów. Wymaga działającego MySQL i Redis z .env.
+
+    python benchmarks/bench_sharded_pipeline.py --workers 1 2 4 8 --flush-redis
+
+UWAGA: --flush-redis czyści bazę Redis wskazaną przez REDIS_DB (używaj osobnej bazy do benchmarków),
+inaczej kolejne przebiegi korzystają z cache poprzednich.
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import subprocess
+
+from datetime import datetime
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'logs', 'benchmarks')
+
+def flush_redis():
+    from config.db_connection import get_redis_connection
+    get_redis_connection().flushdb()
+
+def run_once(workers, env):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(BACKEND_DIR, "update_data.py"), "--workers", str(workers), "--delay", "0"],
+        cwd=BACKEND_DIR, env=env, check=False,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark skalowania update_data.py --workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=int, default=80)
+    parser.add_argument("--leagues", default='{"PL": 39, "L1": 61, "BL": 78, "SA": 135, "LL": 140, "ERE": 88, "PPL": 94, "CH": 40}')
+    parser.add_argument("--flush-redis", action="store_true", help="Czyść Redis przed każdym przebiegiem")
+    args = parser.parse_args()
+
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), "api_stub_server.py"),
+         "--port", str(args.port), "--latency-ms", str(args.latency_ms)],
+        stdout=subprocess.DEVNULL
+    )
+    time.sleep(1)
+
+    env = dict(os.environ)
+    env.update({
+        "BASE_URL": f"http://127.0.0.1:{args.port}/",
+        "BASE_HOST": "127.0.0.1",
+        "API_KEY": env.get("API_KEY", "benchmark"),
+        "LEAGUES": args.leagues,
+        "REQUESTS_PER_MINUTE": "60000",
+        "DAILY_LIMIT": "10000000",
+    })
+
+    results = []
+    try:
+        for workers in args.workers:
+            if args.flush_redis:
+                flush_redis()
+            elapsed = run_once(workers, env)
+            results.append({"workers": workers, "wall_seconds": round(elapsed, 2)})
+            print(f"workers={workers:<3} wall={elapsed:8.2f}s speedup={results[0]['wall_seconds'] / elapsed:5.2f}x")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = os.path.join(RESULTS_DIR, f"sharded_pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump({"latency_ms": args.latency_ms, "leagues": json.loads(args.leagues), "results": results}, f, indent=2)
+    print(f"Wyniki zapisane w {output}")
+
+if __name__ == "__main__":
+    main()
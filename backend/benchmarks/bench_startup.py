@@ -0,0 +1,121 @@
+"""
+Benchmark czasu startu punktów wejścia (import modułu bez uruchamiania pracy) na podstawie
+`python -X importtime`. Każdy import mierzony jest w świeżym procesie; wynik to mediana z kilku prób.
+Z `--ref` ten sam pomiar wykonywany jest dla kopii backendu z podanej rewizji git (np. sprzed zmian),
+co daje porównanie "przed / po". Wymaga pliku .env w katalogu głównym repozytorium.
+
+    python benchmarks/bench_startup.py --ref HEAD~1 --repeat 5
+"""
+import sys
+import os
+import json
+import shutil
+import argparse
+import tarfile
+import tempfile
+import statistics
+import subprocess
+
+from datetime import datetime
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+REPO_DIR = os.path.abspath(os.path.join(BACKEND_DIR, '..'))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'logs', 'benchmarks')
+
+# Punkty wejścia: codzienny proces ETL, worker kolejki zadań i aplikacja Flask
+ENTRY_POINTS = ("update_data", "worker", "app")
+
+def parse_importtime(stderr: str):
+    """
+    Zwraca (łączny czas importu w ms, lista (moduł, cumulative ms)) z wyjścia -X importtime.
+    Łączny czas to suma pozycji najwyższego poziomu (bez wcięcia w nazwie modułu).
+    """
+    total_us = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        cumulative_us = int(parts[1])
+        name = parts[2].rstrip()
+        module = name.strip()
+        modules.append((module, cumulative_us / 1000))
+        if name == " " + module:
+            total_us += cumulative_us
+    return total_us / 1000, modules
+
+def measure_entry_point(backend_dir: str, module: str):
+    code = f"import sys; sys.path.insert(0, {backend_dir!r}); import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=backend_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Import {module} failed in {backend_dir}:\n{result.stderr.splitlines()[-1] if result.stderr else ''}")
+    return parse_importtime(result.stderr)
+
+def measure_tree(backend_dir: str, repeat: int, top: int) -> dict:
+    results = {}
+    for module in ENTRY_POINTS:
+        totals = []
+        slowest = []
+        for _ in range(repeat):
+            total_ms, modules = measure_entry_point(backend_dir, module)
+            totals.append(total_ms)
+            slowest = sorted(modules, key=lambda item: item[1], reverse=True)[:top]
+        results[module] = {
+            "median_ms": round(statistics.median(totals), 1),
+            "min_ms": round(min(totals), 1),
+            "slowest_imports": [{"module": name, "cumulative_ms": round(ms, 1)} for name, ms in slowest],
+        }
+    return results
+
+def export_ref(ref: str, target_dir: str) -> str:
+    """Kopia katalogu backend z rewizji `ref` (git archive) w `target_dir`; obok trafia .env."""
+    archive = os.path.join(target_dir, "backend.tar")
+    with open(archive, "wb") as f:
+        subprocess.run(["git", "archive", ref, "backend"], cwd=REPO_DIR, stdout=f, check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(target_dir)
+    env_path = os.path.join(REPO_DIR, ".env")
+    if os.path.exists(env_path):
+        shutil.copy(env_path, os.path.join(target_dir, ".env"))
+    return os.path.join(target_dir, "backend")
+
+def print_results(current: dict, baseline: dict = None, ref: str = None):
+    if baseline:
+        print(f"{'entry point':<14} {ref + ' (ms)':>16} {'current (ms)':>14} {'speedup':>9}")
+        for module, result in current.items():
+            before = baseline[module]["median_ms"]
+            print(f"{module:<14} {before:>16.1f} {result['median_ms']:>14.1f} {before / result['median_ms']:>8.2f}x")
+    else:
+        print(f"{'entry point':<14} {'median (ms)':>12} {'min (ms)':>10}")
+        for module, result in current.items():
+            print(f"{module:<14} {result['median_ms']:>12.1f} {result['min_ms']:>10.1f}")
+    for module, result in current.items():
+        print(f"\n{module} - najwolniejsze importy (cumulative):")
+        for entry in result["slowest_imports"]:
+            print(f"  {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark czasu startu punktów wejścia (python -X importtime)")
+    parser.add_argument("--ref", default=None, help="Rewizja git do porównania (np. HEAD~1)")
+    parser.add_argument("--repeat", type=int, default=5, help="Liczba prób na punkt wejścia")
+    parser.add_argument("--top", type=int, default=10, help="Liczba najwolniejszych importów w raporcie")
+    args = parser.parse_args()
+
+    current = measure_tree(BACKEND_DIR, args.repeat, args.top)
+    baseline = None
+    if args.ref:
+        with tempfile.TemporaryDirectory(prefix="bench_startup_") as tmp_dir:
+            baseline = measure_tree(export_ref(args.ref, tmp_dir), args.repeat, args.top)
+    print_results(current, baseline, args.ref)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = os.path.join(RESULTS_DIR, f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump({"repeat": args.repeat, "current": current, "ref": args.ref, "baseline": baseline}, f, indent=2)
+    print(f"\nWyniki zapisane w {output}")
+
+if __name__ == "__main__":
+    main()
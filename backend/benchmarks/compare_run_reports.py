@@ -0,0 +1,62 @@
+"""
+Porównanie dwóch raportów profilowania (logs/profiles/*.json) etap po etapie.
+
+    python benchmarks/compare_run_reports.py logs/profiles/update_data_A.json logs/profiles/update_data_B.json
+"""
+import sys
+import os
+import json
+import argparse
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.profiling_utils import diff_reports
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+def format_value(value, suffix=""):
+    return "-" if value is None else f"{value:.2f}{suffix}"
+
+def format_delta(value, suffix=""):
+    return "-" if value is None else f"{value:+.2f}{suffix}"
+
+def print_diff(rows, show_timings=True):
+    print(f"{'stage':<45} {'wall old':>10} {'wall new':>10} {'Δ wall':>10} {'Δ cpu':>9} {'Δ peak':>10}")
+    print("-" * 98)
+    for row in rows:
+        if row.get("removed"):
+            print(f"{row['stage']:<45} {format_value(row['wall_seconds']['old'], 's'):>10} {'(removed)':>10}")
+            continue
+        wall, cpu, peak = row["wall_seconds"], row["cpu_seconds"], row["peak_memory_mb"]
+        print(f"{row['stage']:<45} {format_value(wall['old'], 's'):>10} {format_value(wall['new'], 's'):>10} "
+              f"{format_delta(wall['delta'], 's'):>10} {format_delta(cpu['delta'], 's'):>9} {format_delta(peak['delta'], 'MB'):>10}")
+        if show_timings:
+            for category, values in row["timings"].items():
+                old, new = values["old"], values["new"]
+                delta = new - old if old is not None and new is not None else None
+                print(f"    {category:<41} {format_value(old, 's'):>10} {format_value(new, 's'):>10} {format_delta(delta, 's'):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Porównanie dwóch raportów profilowania")
+    parser.add_argument("old", help="Raport bazowy (JSON)")
+    parser.add_argument("new", help="Raport porównywany (JSON)")
+    parser.add_argument("--no-timings", action="store_true", help="Pomiń rozbicie na kategorie (api_wait, mysql, redis...)")
+    parser.add_argument("--json", action="store_true", help="Wypisz różnice jako JSON")
+    args = parser.parse_args()
+
+    old, new = load_report(args.old), load_report(args.new)
+    rows = diff_reports(old, new)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{old.get('run')} ({old.get('started_at')}) → {new.get('run')} ({new.get('started_at')})")
+    print_diff(rows, show_timings=not args.no_timings)
+    old_total, new_total = old.get("total_wall_seconds", 0), new.get("total_wall_seconds", 0)
+    print(f"\nTotal wall: {old_total:.2f}s → {new_total:.2f}s ({new_total - old_total:+.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,228 @@
 import os
 import redis
 import time
+import socket
+import threading
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+from typing import TYPE_CHECKING
+from sqlalchemy import event, text
 from sqlalchemy.exc import OperationalError
+from redis.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 
-from dotenv import load_dotenv
+from config.settings import load_env
 from utils.progress_utils import create_progress_bar
 from utils.logging_utils import setup_logger, log_error, log_info, log_warning
+from utils.profiling_utils import is_profiling_enabled, record_timing
 
-# Load environment variables from .env file
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+# Load environment variables from .env file (once per process)
+load_env()
 
 # Global Redis connection
 _redis_connection = None
 
-# SQLAlchemy configuration
-host = os.getenv("DB_HOST")
-user = os.getenv("DB_USER")
-password = os.getenv("DB_PASSWORD")
-database = os.getenv("DB_NAME")
-port = os.getenv("DB_PORT", 3306)
-
-DATABASE_URL = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=10,
-    max_overflow=5,
-    pool_timeout=30,
-    pool_recycle=1800,
-    echo=False
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Redis: jedna pula blokująca na proces, współdzielona przez wątki ETL (pule do 10 wątków + etapy potoku)
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 32))
+# Ile sekund wątek czeka na wolne połączenie, zanim zgłosi błąd
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 10))
+# Dłuższy niż najdłuższa komenda blokująca (XREADGROUP w job_queue_utils czeka do 5 s)
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 10))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 2))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", 3))
+# redis-py sam używa hiredis, gdy pakiet jest zainstalowany; REDIS_PARSER=python wymusza parser w Pythonie
+REDIS_PARSER = os.getenv("REDIS_PARSER", "auto").strip().lower()
+
+# SQLAlchemy: silnik i fabryka sesji powstają przy pierwszym użyciu, nie przy imporcie modułu
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+# Pomiar czasu zapytań MySQL dla raportów profilowania (PROFILE_STAGES) - listenery rejestrowane
+# tylko przy włączonym profilowaniu; zapytanie zakończone błędem zdejmuje swój wpis w handle_error
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start_time")
+    if starts:
+        record_timing("mysql", time.perf_counter() - starts.pop())
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    starts = conn.info.get("query_start_time") if conn is not None else None
+    if starts and exception_context.cursor is not None:
+        record_timing("mysql", time.perf_counter() - starts.pop())
+
+def get_engine():
+    """
+    Returns the singleton SQLAlchemy engine, created on first use.
+    """
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+                from sqlalchemy.orm import sessionmaker
+                from sqlalchemy.pool import QueuePool
+
+                host = os.getenv("DB_HOST")
+                user = os.getenv("DB_USER")
+                password = os.getenv("DB_PASSWORD")
+                database = os.getenv("DB_NAME")
+                port = os.getenv("DB_PORT", 3306)
+
+                engine = create_engine(
+                    f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}",
+                    poolclass=QueuePool,
+                    pool_size=10,
+                    max_overflow=5,
+                    pool_timeout=30,
+                    pool_recycle=1800,
+                    echo=False
+                )
+                if is_profiling_enabled():
+                    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+                    event.listen(engine, "handle_error", _handle_error)
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                _engine = engine
+    return _engine
+
+class _LazySessionLocal:
+    """Zamiennik `sessionmaker`: `SessionLocal()` tworzy silnik przy pierwszym wywołaniu."""
+    def __call__(self, **kwargs) -> "Session":
+        get_engine()
+        return _session_factory(**kwargs)
+
+SessionLocal = _LazySessionLocal()
+
+class ProfiledRedis(redis.Redis):
+    """Klient Redis mierzący czas każdej komendy (używany tylko przy włączonym profilowaniu)."""
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            record_timing("redis", time.perf_counter() - start)
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """
+    Pula blokująca z licznikami wykorzystania: szczytowa liczba zajętych połączeń oraz liczba
+    i czas oczekiwań na wolne połączenie (przy profilowaniu także kategoria `redis_pool_wait`).
+    """
+    def __init__(self, *args, **kwargs):
+        self._stats_lock = threading.Lock()
+        self.peak_in_use = 0
+        self.acquired = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        super().__init__(*args, **kwargs)
+
+    def _in_use(self) -> int:
+        # Kolejka puli trzyma wolne połączenia i miejsca `None` na jeszcze nieutworzone
+        idle = sum(1 for connection in list(self.pool.queue) if connection is not None)
+        return max(len(self._connections) - idle, 0)
+
+    def get_connection(self, *args, **kwargs):
+        waiting = self.pool.empty()
+        start = time.perf_counter()
+        connection = super().get_connection(*args, **kwargs)
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.acquired += 1
+            self.peak_in_use = max(self.peak_in_use, self._in_use())
+            if waiting:
+                self.waits += 1
+                self.wait_seconds += waited
+        if waiting:
+            record_timing("redis_pool_wait", waited)
+        return connection
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "max_connections": self.max_connections,
+                "created": len(self._connections),
+                "in_use": self._in_use(),
+                "peak_in_use": self.peak_in_use,
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 4),
+            }
 
 # Logger initialization
 logger = setup_logger("db_connections")
 
+def _redis_parser_options() -> dict:
+    """
+    Domyślnie parser wybiera redis-py (hiredis, jeśli zainstalowany). Tylko REDIS_PARSER=python
+    wymusza parser w Pythonie - jego moduł jest prywatny i zmienia się między wersjami redis-py.
+    """
+    if REDIS_PARSER != "python":
+        return {}
+    try:
+        from redis._parsers import _RESP2Parser as python_parser
+    except ImportError:
+        try:
+            from redis.connection import PythonParser as python_parser
+        except ImportError:
+            log_warning(logger, "REDIS_PARSER=python, but this redis-py version has no known Python parser. Using the default.")
+            return {}
+    return {"parser_class": python_parser}
+
+def _keepalive_options() -> dict:
+    """Parametry TCP keepalive (tylko tam, gdzie system je udostępnia - np. Linux)."""
+    options = {}
+    for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        if hasattr(socket, name):
+            options[getattr(socket, name)] = value
+    return options
+
+def create_redis_client(max_connections: int = None):
+    """
+    Tworzy klienta Redis z własną pulą blokującą (InstrumentedConnectionPool): limity czasu gniazda,
+    keepalive, health check połączeń bezczynnych, ponawianie z wykładniczym odstępem przy błędach
+    połączenia (parser wybiera redis-py, zob. _redis_parser_options).
+    """
+    pool = InstrumentedConnectionPool(
+        max_connections=max_connections or REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", 6379)),
+        db=int(os.getenv("REDIS_DB", 0)),
+        decode_responses=True,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_keepalive=True,
+        socket_keepalive_options=_keepalive_options(),
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        retry=Retry(ExponentialBackoff(cap=1, base=0.05), REDIS_RETRIES),
+        retry_on_error=[RedisConnectionError, RedisTimeoutError],
+        **_redis_parser_options(),
+    )
+    redis_class = ProfiledRedis if is_profiling_enabled() else redis.Redis
+    return redis_class(connection_pool=pool)
+
 def get_redis_connection():
     """
     Returns a singleton Redis connection.
     """
     global _redis_connection
     if _redis_connection is None:
-        _redis_connection = redis.Redis(
-            host=os.getenv("REDIS_HOST", "localhost"),
-            port=int(os.getenv("REDIS_PORT", 6379)),
-            db=int(os.getenv("REDIS_DB", 0)),
-            decode_responses=True
-        )
+        _redis_connection = create_redis_client()
     return _redis_connection
 
+def get_redis_pool_stats() -> dict:
+    """Wykorzystanie puli połączeń Redis bieżącego procesu (pusty słownik, jeśli klient nie powstał)."""
+    if _redis_connection is None:
+        return {}
+    return _redis_connection.connection_pool.stats()
+
 def execute_query(query, params=None, retries=3, delay=5):
     """
     Execute a SQL query using SQLAlchemy and connection pooling.
@@ -152,6 +319,8 @@ def close_connections():
     global _redis_connection
 
     if _redis_connection:
+        log_info(logger, f"Redis pool usage: {get_redis_pool_stats()}")
         _redis_connection.close()
+        _redis_connection.connection_pool.disconnect()
         _redis_connection = None
         log_info(logger, "Redis connection closed.")
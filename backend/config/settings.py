@@ -0,0 +1,34 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+# Plik .env w katalogu głównym repozytorium (wspólny dla backendu, ETL i skryptów)
+ENV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
+
+_loaded = False
+_lock = threading.Lock()
+
+def load_env(env_path: str = ENV_PATH):
+    """
+    Wczytuje .env raz na proces - kolejne wywołania (z każdego modułu) nic nie robią.
+    Zmienne ustawione wcześniej w środowisku mają pierwszeństwo, jak przy load_dotenv.
+    """
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        if not os.path.exists(env_path):
+            raise FileNotFoundError(f".env file not found at: {env_path}")
+        load_dotenv(env_path)
+        _loaded = True
+
+def get_setting(name: str, default=None, required: bool = False):
+    """Wartość zmiennej środowiskowej (po wczytaniu .env); `required` - błąd, gdy jej brak."""
+    load_env()
+    value = os.getenv(name, default)
+    if required and not value:
+        raise ValueError(f"{name} is not set in the .env file.")
+    return value
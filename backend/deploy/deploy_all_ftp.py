@@ -4,15 +4,12 @@ import sys
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from dotenv import load_dotenv
+from config.settings import load_env
 from utils.logging_utils import setup_logger, log_error, log_info
 from utils.ftp_utils import open_ftp_connection, upload_directory, clean_ftp_folder, close_ftp_connection
 
-# Load environment variables
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+# Load environment variables from .env file (once per process)
+load_env()
 
 # Set up logging
 logger = setup_logger("deploy_all_ftp")
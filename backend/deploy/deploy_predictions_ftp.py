@@ -2,16 +2,13 @@ from ftplib import FTP
 import sys
 import os
 
-from dotenv import load_dotenv
-
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Add the necessary directories to the Python path
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+from config.settings import load_env
+
+# Load environment variables from .env file (once per process)
+load_env()
 
 # FTP connection details
 ftp_host=os.getenv("FTP_HOST", "localhost")
@@ -1,27 +1,42 @@
 import sys
 import os
 import json
-
-from dotenv import load_dotenv
+import time
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from config.settings import load_env
 from utils.logging_utils import setup_logger, log_info, log_error, log_warning
 from utils.notification_utils import send_batch_notifications
 from utils.progress_utils import create_progress_bar
-from utils.predictions_utils import fetch_predictions_for_match
+from utils.predictions_utils import ingest_predictions
 from utils.future_utils import fetch_and_insert_future_matches_hset
+from utils.shard_utils import filter_league_ids
+from config.db_connection import get_redis_connection
 
-# Load environment variables from .env file
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+# Load environment variables from .env file (once per process)
+load_env()
 
 # Set up logging
 logger = setup_logger("etl_future_matches")
 
+# Global Redis connection
+redis_client = get_redis_connection()
+
+# Liczba równoległych zapytań `predictions` (limit zapytań na minutę i tak pilnuje api_requests)
+PREDICTIONS_WORKERS = int(os.getenv("PREDICTIONS_WORKERS", 4))
+
+def report_stage_wall_time(stage: str, wall: float, items: int):
+    """Loguje czas etapu razem z czasem z poprzedniego uruchomienia (porównanie przed/po zmianach)."""
+    key = f"stage_wall:etl_future_matches:{stage}"
+    previous = redis_client.getset(key, json.dumps({"wall": round(wall, 3), "items": items}))
+    message = f"Stage {stage}: {wall:.2f}s for {items} matches"
+    if previous:
+        previous = json.loads(previous)
+        message += f" (previous run: {previous['wall']:.2f}s for {previous['items']} matches)"
+    log_info(logger, message)
+
 def run():
     """
     Main entry point for the script.
@@ -40,23 +55,21 @@ def run():
         raise ValueError(f"Invalid JSON in LEAGUES: {e}")
 
     # Log loaded league IDs
-    league_ids = list(predefined_leagues.values())
+    league_ids = filter_league_ids(predefined_leagues.values())
     if not league_ids:
         log_error(logger, "No league IDs found in LEAGUES. Exiting.")
         return  # Exit the script if no leagues are defined
 
     # Step 2: Fetch and process future matches
     try:
-        unique_matches = fetch_and_insert_future_matches_hset(league_ids)
-        progress_bar_matches = create_progress_bar(total=len(unique_matches), desc="Sprawdzanie predykcji...", unit="match")
-        for match in unique_matches:
-            try:
-                fetch_predictions_for_match(match['match_id'], progress_bar_matches)
-            except Exception as e:
-                log_error(logger, f"Error fetching predictions for match ID {match['match_id']}: {e}")
+        unique_matches = fetch_and_insert_future_matches_hset(league_ids) or []
+        match_ids = [match['match_id'] for match in unique_matches]
 
-		# Close progress bar
-        progress_bar_matches.close()
+        # Predykcje wszystkich meczów: równoległe pobieranie i jeden zbiorczy upsert
+        start = time.perf_counter()
+        with create_progress_bar(total=len(match_ids), desc="Sprawdzanie predykcji...", unit="match") as progress_bar_matches:
+            ingest_predictions(match_ids, max_workers=PREDICTIONS_WORKERS, progress_bar=progress_bar_matches)
+        report_stage_wall_time("predictions", time.perf_counter() - start, len(match_ids))
 
     except Exception as e:
         log_error(logger, f"Error during fetch_and_insert_future_matches_hset: {e}")
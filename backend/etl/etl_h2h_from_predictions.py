@@ -2,8 +2,6 @@ import sys
 import os
 import json
 
-from dotenv import load_dotenv
-
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
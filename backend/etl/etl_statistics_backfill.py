@@ -0,0 +1,48 @@
+import sys
+import os
+import argparse
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.checkpoint_utils import StageCheckpoint
+from utils.logging_utils import setup_logger, log_info
+from utils.match_statistics_utils import filter_fixtures_without_statistics, backfill_match_statistics
+from utils.match_utils import get_fixture_ids_for_future_pairs
+
+# Ustawienie logowania
+logger = setup_logger("etl_statistics_backfill")
+
+# Źródła meczów par drużyn z future_matches, dla których uzupełniamy statystyki
+STATISTICS_SOURCES = ("h2h_matches", "matches")
+
+def collect_fixture_ids(sources=STATISTICS_SOURCES):
+    """Suma (bez duplikatów) meczów par drużyn z future_matches ze wskazanych tabel."""
+    fixture_ids = []
+    for source in sources:
+        fixture_ids.extend(row["fixture_id"] for row in get_fixture_ids_for_future_pairs(source))
+    return list(dict.fromkeys(fixture_ids))
+
+def run_statistics_backfill(sources=STATISTICS_SOURCES, stage="etl_statistics_backfill", resume=False):
+    """
+    Wspólny silnik statystyk: suma meczów ze źródeł, odfiltrowanie meczów, które mają już statystyki
+    (jeden anti-join), współbieżne pobranie reszty i zbiorczy zapis. Postęp zapisywany w checkpoincie.
+    """
+    checkpoint = StageCheckpoint(stage)
+    candidates = filter_fixtures_without_statistics(collect_fixture_ids(sources))
+    fixture_ids = checkpoint.start(candidates, resume=resume)
+    log_info(logger, f"[{stage}] Matches to process: {len(fixture_ids)}")
+
+    saved_rows = backfill_match_statistics(fixture_ids, checkpoint=checkpoint, desc=f"Procesowanie statystyk ({stage})...")
+    checkpoint.finish()
+    log_info(logger, f"[{stage}] Zapisano {saved_rows} wierszy statystyk.")
+
+def run(resume=False):
+    run_statistics_backfill(resume=resume)
+
+# Uruchomienie programu
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Uzupełnianie statystyk meczów par drużyn z przyszłych spotkań")
+    parser.add_argument("--resume", action="store_true", help="Kontynuuj od ostatniego checkpointu")
+    args = parser.parse_args()
+    run(resume=args.resume)
@@ -8,9 +8,11 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from utils.progress_utils import create_progress_bar
 from utils.logging_utils import setup_logger, log_error
-from utils.teams_utils import fetch_and_insert_team, get_latest_team_season
+from utils.teams_utils import fetch_and_insert_team
+from utils.team_form_utils import compute_team_forms
 from utils.players_utils import fetch_and_insert_players
-from utils.future_utils import fetch_future_away_team, fetch_future_home_team
+from utils.future_utils import fetch_future_team_ids
+from utils.team_queue_utils import TeamWorkQueue, get_team_season_for_run, prefetch_team_seasons_for_run
 from maintenance.clear_teams_redis import clear_team_from_redis
 
 # Set up the logger
@@ -20,12 +22,12 @@ logger = setup_logger("etl_teams_data_future_matches")
 progress_lock = threading.Lock()
 
 
-def process_team(team_id, progress_bar):
+def process_team(team_id, forms, progress_bar):
     """Pobiera i zapisuje dane dla jednej drużyny."""
     try:
-        season = get_latest_team_season(team_id)
+        season = get_team_season_for_run(team_id)
         clear_team_from_redis(team_id, season)
-        fetch_and_insert_team(team_id, season)
+        fetch_and_insert_team(team_id, season, forms=forms)
         fetch_and_insert_players(team_id, season)
     except Exception as e:
         log_error(logger, f"Błąd podczas przetwarzania team_id={team_id}: {e}")
@@ -35,19 +37,21 @@ def process_team(team_id, progress_bar):
 
 def run():
     try:
-        home_teams = fetch_future_home_team()
-        away_teams = fetch_future_away_team()
-        all_teams = home_teams + away_teams
+        # Każda drużyna tylko raz na uruchomienie, nawet jeśli ma kilka nadchodzących meczów
+        all_teams = TeamWorkQueue("etl_teams_data_future_matches").add_many(fetch_future_team_ids())
+        prefetch_team_seasons_for_run(all_teams)
+        # Forma wszystkich drużyn z tabeli matches jednym zapytaniem
+        forms = compute_team_forms(all_teams)
 
         # Przetwarzaj zawodników dla każdej drużyny
         progress_bar = create_progress_bar(len(all_teams), desc="Odświeżanie danych drużyn...", unit=" teams")
         num_teams = len(all_teams)
-        max_workers = min(10, num_teams // 2)
+        max_workers = max(1, min(10, num_teams // 2))
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = []
             for team_id in all_teams:
                 try:
-                    future = executor.submit(process_team, team_id, progress_bar)
+                    future = executor.submit(process_team, team_id, forms, progress_bar)
                     futures.append(future)
                 except Exception as e:
                     log_error(logger, f"Błąd przy tworzeniu wątku dla Team ID {team_id}: {e}")
@@ -7,10 +7,10 @@ import threading
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from utils.progress_utils import create_progress_bar
-from utils.logging_utils import setup_logger, log_error, log_warning
-from utils.teams_standing import fetch_team_standing, insert_team_standing_to_db
-from utils.teams_utils import get_latest_team_season
-from utils.future_utils import fetch_future_away_team, fetch_future_home_team
+from utils.logging_utils import setup_logger, log_error, log_warning, log_info
+from utils.teams_standing import fetch_team_standing, insert_team_standing_to_db, load_league_standings
+from utils.future_utils import fetch_future_team_ids, fetch_future_league_teams
+from utils.team_queue_utils import TeamWorkQueue, get_team_season_for_run, prefetch_team_seasons_for_run
 from maintenance.clear_teams_standing_redis import clear_team_standing_from_redis
 
 # Set up the logger
@@ -22,7 +22,7 @@ progress_lock = threading.Lock()
 def process_team(team_id, progress_bar):
     """Pobiera i zapisuje dane dla jednej drużyny."""
     try:
-        season = get_latest_team_season(team_id)
+        season = get_team_season_for_run(team_id)
         clear_team_standing_from_redis(team_id, season)
         data_standing = fetch_team_standing(team_id, season)
         if data_standing:
@@ -35,15 +35,35 @@ def process_team(team_id, progress_bar):
         with progress_lock:
             progress_bar.update(1)
 
+def refresh_league_tables(team_ids):
+    """Odświeża tabele lig przyszłych meczów (jedno zapytanie na ligę); zwraca drużyny już zapisane."""
+    queued = set(team_ids)
+    league_teams = {}
+    for league_id, league in fetch_future_league_teams().items():
+        league_team_ids = league["team_ids"] & queued
+        if league_team_ids:
+            league_teams[league_id] = {"season": league["season"], "team_ids": league_team_ids}
+
+    with create_progress_bar(len(league_teams), desc="Odświeżanie tabel lig...", unit=" leagues") as progress_bar:
+        return load_league_standings(league_teams, refresh=True, progress_bar=progress_bar)
+
 def run():
+    progress_bar = None
     try:
-        home_teams = fetch_future_home_team()
-        away_teams = fetch_future_away_team()
-        all_teams = home_teams + away_teams
+        # Każda drużyna tylko raz na uruchomienie, nawet jeśli ma kilka nadchodzących meczów
+        all_teams = TeamWorkQueue("etl_teams_standing_future_matches").add_many(fetch_future_team_ids())
+
+        # Tabele lig pokrywają większość drużyn; zapytania per drużyna tylko dla pozostałych
+        covered = refresh_league_tables(all_teams)
+        all_teams = [team_id for team_id in all_teams if team_id not in covered]
+        prefetch_team_seasons_for_run(all_teams)
+        log_info(logger, f"Drużyny bez tabeli ligi (zapytanie per drużyna): {len(all_teams)}")
+        if not all_teams:
+            return
 
         progress_bar = create_progress_bar(len(all_teams), desc="Odświeżanie wyników drużyn...", unit=" teams")
         num_teams = len(all_teams)
-        max_workers = min(10, num_teams // 2)
+        max_workers = max(1, min(10, num_teams // 2))
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = []
             for team_id in all_teams:
@@ -61,7 +81,8 @@ def run():
     except Exception as e:
         log_error(logger, f"❌ Nieoczekiwany błąd w run(): {e}")
     finally:
-        progress_bar.close()
+        if progress_bar:
+            progress_bar.close()
 
 if __name__ == "__main__":
     run()
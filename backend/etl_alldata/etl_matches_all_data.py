@@ -1,23 +1,130 @@
 import os
 import sys
+import argparse
+import threading
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from utils.logging_utils import setup_logger, log_info, log_warning
-from utils.progress_utils import create_progress_bar
+from utils.checkpoint_utils import StageCheckpoint
+from utils.pipeline_utils import Pipeline, PipelineStage, StopPipeline
 from utils.notification_utils import send_batch_notifications
 from utils.special_football_functions import fetch_team_ids_from_db, fetch_available_matches
 from utils.match_statistics_utils import fetch_match_statistics, parse_match_statistics, insert_match_statistics_to_db
-from utils.match_utils import fetch_matches_for_team, insert_matches_to_db, match_id_exists
-from utils.teams_utils import get_teams_name, get_latest_team_season
-from utils.match_events_utils import run_all_proccess_event_match
-from utils.players_utils import fetch_and_insert_players
+from utils.match_utils import fetch_matches_for_team, insert_matches_to_db
+from utils.match_events_utils import fetch_match_events, parse_match_events, resolve_event_players, insert_match_events_to_db
+from utils.h2h_utils import batch_match_id_exists
+from utils.teams_utils import get_teams_name
+from api.api_requests import is_daily_limit_reached
 
 # Initialize logger
 logger = setup_logger("etl_matches_all_data")
 
-def run():
+# Współbieżność etapów pipeline'u: API (mecze, szczegóły), parsowanie, zapis zbiorczy
+FIXTURE_WORKERS = int(os.getenv("MATCHES_PIPELINE_FIXTURE_WORKERS", 4))
+DETAIL_WORKERS = int(os.getenv("MATCHES_PIPELINE_DETAIL_WORKERS", 8))
+PARSE_BATCH_SIZE = 20
+WRITE_BATCH_SIZE = 50
+LAST_MATCHES = 10
+
+class TeamProgress:
+    """Śledzi, ile meczów drużyny czeka jeszcze na zapis; po zapisaniu wszystkich drużyna jest `done` w checkpoincie."""
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+        self.remaining = {}
+        self.failed = set()
+        self.lock = threading.Lock()
+
+    def expect(self, team_id, count):
+        with self.lock:
+            self.remaining[team_id] = count
+        if count == 0:
+            self.checkpoint.mark_done(team_id)
+
+    def complete(self, team_id):
+        with self.lock:
+            self.remaining[team_id] -= 1
+            finished = self.remaining[team_id] == 0 and team_id not in self.failed
+        if finished:
+            self.checkpoint.mark_done(team_id)
+
+    def fail(self, team_id, error):
+        with self.lock:
+            if team_id in self.failed:
+                return
+            self.failed.add(team_id)
+        self.checkpoint.mark_failed(team_id, error)
+
+def stop_on_daily_limit():
+    if is_daily_limit_reached():
+        raise StopPipeline("Dzienny limit API wyczerpany.")
+
+def build_pipeline(progress, team_names):
+    """Etapy: ostatnie mecze drużyny -> zdarzenia i statystyki z API -> parsowanie -> zapis zbiorczy."""
+
+    def fetch_fixtures(team_id):
+        stop_on_daily_limit()
+        log_info(logger, f"ID: {team_id}, Nazwa: {team_names.get(team_id)}")
+        last_matches = fetch_matches_for_team(team_id, LAST_MATCHES) or []
+        # Limit wyczerpany w trakcie pobierania - pusta lista nie oznacza braku meczów, drużyna zostaje pending
+        stop_on_daily_limit()
+        progress.expect(team_id, len(last_matches))
+        return [{"team_id": team_id, "match": match} for match in last_matches]
+
+    def fetch_details(item):
+        stop_on_daily_limit()
+        match_id = item["match"]["fixture"]["id"]
+        item["events"] = fetch_match_events(match_id)
+        item["statistics"] = fetch_match_statistics(match_id)
+        # Szczegóły mogły być niepełne - mecz nie trafia do zapisu, więc drużyna nie zostanie oznaczona jako done
+        stop_on_daily_limit()
+        return [item]
+
+    def parse_batch(items):
+        # Zawodnicy ze zdarzeń całej paczki rozwiązywani razem (jedno zapytanie IN, jeden skład na drużynę)
+        known_players = resolve_event_players([
+            (item["match"]["fixture"]["id"], item["match"]["league"]["season"], item["events"]) for item in items
+        ])
+        for item in items:
+            match_id = item["match"]["fixture"]["id"]
+            item["events"] = parse_match_events(match_id, item["events"], known_players) if item["events"] else []
+            item["statistics"] = parse_match_statistics(match_id, item["statistics"]) if item["statistics"] else []
+        return items
+
+    def write_batch(items):
+        unique_matches = list({item["match"]["fixture"]["id"]: item["match"] for item in items}.values())
+        insert_matches_to_db(unique_matches)
+        existing = batch_match_id_exists([match["fixture"]["id"] for match in unique_matches])
+
+        events, statistics = [], []
+        for item in items:
+            if item["match"]["fixture"]["id"] in existing:
+                events.extend(item["events"])
+                statistics.extend(item["statistics"])
+            else:
+                log_warning(logger, f"Mecz {item['match']['fixture']['id']} nie istnieje w tabeli `matches`. Pomijanie zdarzeń i statystyk.")
+        if events:
+            insert_match_events_to_db(events)
+        if statistics:
+            insert_match_statistics_to_db(statistics)
+        for item in items:
+            progress.complete(item["team_id"])
+
+    def on_error(stage_name, batch, error):
+        for item in batch:
+            progress.fail(item if stage_name == "fixtures" else item["team_id"], error)
+
+    stages = [
+        PipelineStage("fixtures", fetch_fixtures, workers=FIXTURE_WORKERS, queue_size=50),
+        PipelineStage("details", fetch_details, workers=DETAIL_WORKERS, queue_size=200),
+        PipelineStage("parse", parse_batch, workers=2, queue_size=200, batch_size=PARSE_BATCH_SIZE, drain_on_stop=True),
+        PipelineStage("write", write_batch, workers=1, queue_size=200, batch_size=WRITE_BATCH_SIZE, drain_on_stop=True),
+    ]
+    return Pipeline(stages, on_error=on_error)
+
+def run(resume=False):
+    checkpoint = StageCheckpoint("etl_matches_all_data")
     while True:
         retry = False
 
@@ -38,7 +145,8 @@ def run():
             away_team_name = team_mapping.get(match['away_team_id'], f"Unknown Team ({match['away_team_id']})")
             print(f"{idx + 1}. ID Meczu: {match['match_id']} | {home_team_name} vs {away_team_name} | Data meczu: {match['match_date']}")
 
-        # Przetwarzaj każdy mecz
+        # Zbierz drużyny ze wszystkich meczów - drużyna jest elementem pracy checkpointu
+        teams_to_process = {}
         for selected_match in available_matches:
             match_id = selected_match['match_id']
             # Pobierz drużyny powiązane z meczem
@@ -47,42 +155,18 @@ def run():
                 log_warning(logger, f"Nie znaleziono drużyn dla meczu {match_id}. Nieznane drużyny: {team_data['missing_teams']}")
                 # Tutaj wstawic pobieranie druzyn jesli nie znajdzie ich w bazie
                 continue
-            else:
-                # Wyświetl drużyny dla analizy
-                print(f"Przetwarzanie meczu {match_id}:")
-                for team in team_data['teams']:
-                    print(f"ID: {team['team_id']}, Nazwa: {team['name']}")
-                    log_info(logger, f"ID: {team['team_id']}, Nazwa: {team['name']}")
-                    # Pobierz i wstaw ostatnie mecze drużyny
-                    last_matches = fetch_matches_for_team(team['team_id'], 10)
-                    # last_season = get_latest_team_season(team['team_id'])
-                    # fetch_and_insert_players(team['team_id'], last_season)
-
-                    if last_matches:
-                        try:
-                            insert_matches_to_db(last_matches)
-                        except Exception as e:
-                            log_warning(logger, f"Błąd podczas wstawiania meczu: {e}")
-
-                        # Pobierz szczegółowe statystyki dla meczu
-                        progress_bar = create_progress_bar(len(last_matches), "Przetwarzanie meczów...", unit="mecz")
-                        for match in last_matches:
-                            match_id = match['fixture']['id']
-                            run_all_proccess_event_match(match_id)
-                            if match_id_exists(match_id):
-                                match_statistics = fetch_match_statistics(match_id)
-                                if match_statistics:
-                                    parsed_statistics = parse_match_statistics(match_id, match_statistics)
-                                    insert_match_statistics_to_db(parsed_statistics)
-                                    log_info(logger, f"Statystyki meczu {match_id} zostały zapisane w bazie.")
-                                else:
-                                    log_warning(logger, f"Nie udało się pobrać szczegółowych statystyk dla meczu {match_id}.")
-                            else:
-                                log_warning(logger, f"Mecz {match_id} nie istnieje w tabeli `matches`. Pomijanie statystyk.")
-                            # Zwiększamy progress bar
-                            progress_bar.update(1)
-                        # Zamykamy progress bar po zakończeniu pętli
-                        progress_bar.close()
+            for team in team_data['teams']:
+                teams_to_process.setdefault(team['team_id'], team)
+
+        team_ids = checkpoint.start(list(teams_to_process.keys()), resume=resume)
+        team_names = {team_id: (teams_to_process.get(team_id) or {}).get('name', team_mapping.get(team_id, f"Unknown Team ({team_id})")) for team_id in team_ids}
+
+        # Pipeline z ograniczonymi kolejkami: opóźnienia API i bazy nakładają się zamiast sumować
+        pipeline = build_pipeline(TeamProgress(checkpoint), team_names)
+        result = pipeline.run(team_ids)
+        if result["stopped"]:
+            log_warning(logger, "Dzienny limit API wyczerpany. Przerwano etap, uruchom ponownie z --resume.")
+        checkpoint.finish()
 
         if not retry:
             break  # Zakończ pętlę, jeśli nie trzeba ponownie uruchamiać procesu
@@ -91,4 +175,7 @@ def run():
     send_batch_notifications()
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Ostatnie mecze, zdarzenia i statystyki drużyn z przyszłych meczów")
+    parser.add_argument("--resume", action="store_true", help="Kontynuuj od ostatniego checkpointu")
+    args = parser.parse_args()
+    run(resume=args.resume)
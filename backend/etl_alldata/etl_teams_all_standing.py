@@ -9,7 +9,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.progress_utils import create_progress_bar
 from utils.logging_utils import setup_logger, log_error, log_warning
 from utils.teams_standing import fetch_team_standing, insert_team_standing_to_db
-from utils.teams_utils import get_all_teams_from_db, get_latest_team_season
+from utils.teams_utils import get_all_teams_from_db
+from utils.team_season_utils import resolve_team_seasons
 
 # Set up the logger
 logger = setup_logger("etl_teams_all_standing")
@@ -17,10 +18,9 @@ logger = setup_logger("etl_teams_all_standing")
 # Globalny lock do aktualizacji paska postępu
 progress_lock = threading.Lock()
 
-def process_team(team_id, progress_bar):
+def process_team(team_id, season, progress_bar):
     """Pobiera i zapisuje dane dla jednej drużyny."""
     try:
-        season = get_latest_team_season(team_id)
         data_standing = fetch_team_standing(team_id, season)
         if data_standing:
             insert_team_standing_to_db(data_standing)
@@ -35,6 +35,7 @@ def process_team(team_id, progress_bar):
 def run():
     try:
         all_teams = get_all_teams_from_db()
+        seasons = resolve_team_seasons(all_teams)
         progress_bar = create_progress_bar(len(all_teams), desc="Processing Teams", unit=" teams")
 
         num_teams = len(all_teams)
@@ -44,7 +45,7 @@ def run():
             futures = []
             for team_id in all_teams:
                 try:
-                    future = executor.submit(process_team, team_id, progress_bar)
+                    future = executor.submit(process_team, team_id, seasons.get(team_id), progress_bar)
                     futures.append(future)
                 except Exception as e:
                     log_error(logger, f"Błąd przy tworzeniu wątku dla Team ID {team_id}: {e}")
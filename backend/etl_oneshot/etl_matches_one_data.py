@@ -11,7 +11,7 @@ from utils.special_football_functions import fetch_team_ids_from_db, fetch_avail
 from utils.match_statistics_utils import fetch_match_statistics, parse_match_statistics, insert_match_statistics_to_db
 from utils.match_utils import fetch_matches_for_team, insert_matches_to_db, match_id_exists
 from utils.teams_utils import get_teams_name, get_latest_team_season
-from utils.match_events_utils import run_all_proccess_event_match
+from utils.match_events_utils import process_match_events_batch
 from utils.players_utils import fetch_and_insert_players
 
 # Initialize logger
@@ -73,11 +73,13 @@ def run():
                         insert_matches_to_db(last_matches)
                     except Exception as e:
                         log_warning(logger, f"Błąd podczas wstawiania meczu: {e}")
+                    # Zdarzenia wszystkich meczów naraz - zawodnicy rozwiązywani jednym zapytaniem i jednym składem na drużynę
+                    process_match_events_batch({match['fixture']['id']: match['league']['season'] for match in last_matches})
+
                     # Pobierz szczegółowe statystyki dla meczu
                     progress_bar = create_progress_bar(len(last_matches), "Przetwarzanie meczów...", unit="mecz")
                     for match in last_matches:
                         match_id = match['fixture']['id']
-                        run_all_proccess_event_match(match_id)
                         if match_id_exists(match_id):
                             match_statistics = fetch_match_statistics(match_id)
                             if match_statistics:
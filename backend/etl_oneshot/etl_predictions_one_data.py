@@ -2,20 +2,16 @@ import sys
 import os
 import json
 
-from dotenv import load_dotenv
-
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from config.settings import load_env
 from utils.logging_utils import setup_logger, log_error, log_warning
 from utils.notification_utils import send_batch_notifications
 from utils.predictions_utils import fetch_predictions_for_match
 
-# Load environment variables from .env file
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+# Load environment variables from .env file (once per process)
+load_env()
 
 # Set up logging
 logger = setup_logger("etl_prediction_match")
@@ -4,21 +4,20 @@ import sys
 import time
 
 from html import escape
-from dotenv import load_dotenv
 from datetime import date, datetime
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Load environment variables
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+from config.settings import load_env
+
+# Load environment variables from .env file (once per process)
+load_env()
 
 from utils.logging_utils import setup_logger, log_info, log_warning, log_error
 from maintenance.clean_folder import clean_folder
 from generators.team_raport_generate_v2 import generate_team_report
+from utils.profiling_utils import timed
 
 # Set up logging
 logger = setup_logger("all_html_generate")
@@ -705,13 +704,15 @@ def save_html_file(content, output_dir, file_name):
 
 
 def run():
-    matches = fetch_data(PREDICTIONS_API_URL)
+    with timed("api_wait"):
+        matches = fetch_data(PREDICTIONS_API_URL)
     if not matches:
         log_error(logger, "No match data fetched from API.")
         return
 
     clean_folder(OUTPUT_DIR)
-    html_content = generate_html(matches)
+    with timed("html_render"):
+        html_content = generate_html(matches)
     save_html_file(html_content, OUTPUT_DIR, HTML_FILE_NAME)
 
 # if __name__ == "__main__":
@@ -5,17 +5,15 @@ import time
 import json
 
 from html import escape
-from dotenv import load_dotenv
 from datetime import datetime
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Load environment variables
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+from config.settings import load_env
+
+# Load environment variables from .env file (once per process)
+load_env()
 
 from utils.logging_utils import setup_logger, log_info, log_error, log_warning
 
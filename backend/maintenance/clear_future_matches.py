@@ -1,6 +1,6 @@
 import sys
 import os
-import json
+import argparse
 
 # Add the project root directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -12,6 +12,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from config.db_connection import SessionLocal, get_redis_connection
 from utils.logging_utils import setup_logger, log_error, log_info
 from utils.validation_utils import parse_date_to_local
+from utils.redis_index_utils import expire_started_fixtures, scan_delete
 
 # Initialize redis
 redis_client = get_redis_connection()
@@ -36,72 +37,52 @@ def is_match_outdated_or_in_progress(match_date: str, match_status: str) -> bool
         log_error(logger, f"Error parsing match date {match_date}: {e}")
         return False
 
-def clear_redis_keys(key_pattern: str, date_field: str):
+def _nested_value(data, path: str):
+    for field in path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(field)
+    return data
+
+def clear_redis_keys(key_pattern: str, date_field: str) -> int:
     """
-    Clears outdated keys from Redis based on the key pattern and date field.
+    Fallback dla doraźnych porządków (np. klucze zapisane przed indeksem `fixture_expiry`):
+    SCAN po wzorcu, wartości czytane MGET-em paczkami, usuwanie pipeline'em.
     Args:
         key_pattern (str): The Redis key pattern to match (e.g., "future_match:*").
         date_field (str): The JSON field containing the match date (e.g., "fixture.date").
     """
-    try:
-        keys = redis_client.keys(key_pattern)
-        total_keys = len(keys)
-        deleted_keys = 0
-
-        for key in keys:
-            match_data_str = redis_client.get(key)
-            if match_data_str:
-                try:
-                    match_data = json.loads(match_data_str)
-                    fields = date_field.split('.')
-                    match_date = match_data
-                    for field in fields:
-                        if isinstance(match_date, dict):
-                            match_date = match_date.get(field, None)
-                        else:
-                            log_error(logger, f"Unexpected data structure for key {key}: {match_data}")
-                            match_date = None
-                            break
+    def is_outdated(match_data):
+        match_date = _nested_value(match_data, date_field)
+        match_status = _nested_value(match_data, "fixture.status.short") or _nested_value(match_data, "status") or ""
+        return bool(match_date) and bool(is_match_outdated_or_in_progress(match_date, match_status))
 
-                    match_status = match_data.get("fixture", {}).get("status", {}).get("short", "")
-
-                    if match_date and is_match_outdated_or_in_progress(match_date, match_status):
-                        redis_client.delete(key)
-                        deleted_keys += 1
-                        log_info(logger, f"Deleted outdated or in-progress match key: {key}")
-                except (ValueError, json.JSONDecodeError) as e:
-                    log_error(logger, f"Invalid JSON or date format for key {key}: {e}")
-
-        log_info(logger, f"Checked {total_keys} keys. Deleted {deleted_keys} outdated or in-progress match keys.")
+    try:
+        deleted_keys = scan_delete(key_pattern, predicate=is_outdated)
+        log_info(logger, f"Deleted {deleted_keys} outdated or in-progress match keys matching {key_pattern}.")
+        return deleted_keys
     except Exception as e:
         log_error(logger, f"Error clearing keys with pattern {key_pattern}: {e}")
+        return 0
 
-def clear_unmatched_predictions_h2h():
-    """Usuwa klucze predictions_h2h:* z Redis, które nie mają odpowiadającego klucza w predictions:*."""
-
+def clear_legacy_predictions_keys():
+    """
+    Usuwa dawne kopie odpowiedzi `predictions` - `predictions_h2h:*` i `api_cache:predictions:*`.
+    Jedyną kopią jest teraz `predictions:{fixture_id}` (wygasa o północy).
+    """
     try:
-        h2h_keys = redis_client.keys("predictions_h2h:*")
-        total_keys = len(h2h_keys)
-        deleted_keys = 0
-        for key in h2h_keys:
-            match_id = key.split(":")[1]  # Pobieramy ID meczu
-            predictions_key = f"predictions:{match_id}"
-
-            if not redis_client.exists(predictions_key):
-                redis_client.delete(key)
-                deleted_keys += 1
-                log_info(logger, f"Deleted unmatched predictions_h2h key: {key}")
-
-        log_info(logger, f"Checked {total_keys} predictions_h2h keys. Deleted {deleted_keys} unmatched keys.")
+        deleted_keys = sum(scan_delete(key_pattern) for key_pattern in ("predictions_h2h:*", "api_cache:predictions:*"))
+        log_info(logger, f"Deleted {deleted_keys} legacy predictions keys.")
     except Exception as e:
-        log_error(logger, f"Error clearing unmatched predictions_h2h keys: {e}")
+        log_error(logger, f"Error clearing legacy predictions keys: {e}")
 
-def clear_future_matches():
+def clear_future_matches(full_scan: bool = False):
     """Clears outdated `future_matches` data from Redis and the database."""
-    # Clear outdated matches in Redis
-    clear_redis_keys("future_match:*", "fixture.date")
-    clear_redis_keys("future_match_db:*", "match_date")
-    clear_redis_keys("predictions:*", "match_date")
+    # Mecze, które już się rozpoczęły: zakres z indeksu `fixture_expiry` + usuwanie pipeline'em
+    expire_started_fixtures()
+    if full_scan:
+        clear_redis_keys("future_match:*", "fixture.date")
+        clear_redis_keys("future_match_db:*", "match_date")
 
     # Clear outdated matches in the database
     del_future_matches = text("DELETE FROM future_matches WHERE match_date < NOW() OR status IN ('1H', '2H', 'FT', 'PST', 'PEW');")
@@ -117,13 +98,16 @@ def clear_future_matches():
     except SQLAlchemyError as e:
         log_error(logger, f"Error clearing table `future_matches`: {e}")
 
-def run():
+def run(full_scan: bool = False):
     """
     Entry point function for the script.
     This function is used to integrate with the main ETL pipeline.
     """
-    clear_future_matches()
-    clear_unmatched_predictions_h2h()
+    clear_future_matches(full_scan=full_scan)
+    clear_legacy_predictions_keys()
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Czyszczenie nieaktualnych przyszłych meczów (Redis i baza)")
+    parser.add_argument("--scan", action="store_true", help="Dodatkowo przejrzyj klucze SCAN-em (klucze spoza indeksu fixture_expiry)")
+    args = parser.parse_args()
+    run(full_scan=args.scan)
@@ -16,9 +16,8 @@ logger = setup_logger("clear_teams_standing_redis")
 def clear_team_standing_from_redis(team_id, season):
     """ Usuwa klucze team_standing_data:{team_id}:{season} z Redis przed aktualizacją. """
     try:
-        team_key = redis_client.keys(f"team_standing_data:{team_id}:{season}")  # Pobieramy pasujące klucze
-        if team_key:  # Jeśli są jakieś klucze do usunięcia
-            redis_client.delete(*team_key)  # Usuwamy wszystkie znalezione klucze
+        team_key = f"team_standing_data:{team_id}:{season}"  # Dokładny klucz - bez przeszukiwania Redis (KEYS)
+        if redis_client.delete(team_key):
             log_info(logger, f"Deleted team data from Redis: {team_key}")
         else:
             log_info(logger, f"No keys found for team {team_id} in season {season}")
@@ -1,10 +1,6 @@
 import os
 import sys
 
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import text
 
@@ -15,6 +11,8 @@ from config.db_connection import SessionLocal
 
 # Load data from database to create a prediction model
 def load_match_data():
+    import pandas as pd
+
     query = text("SELECT home_team_id, away_team_id, score_home, score_away FROM matches")
     try:
         with SessionLocal() as session:
@@ -35,6 +33,7 @@ def prepare_data(df):
     df['target'] = (df['score_home'] > df['score_away']).astype(int)
     X = df[['home_team_id', 'away_team_id']]  # Features
     y = df['target']  # Target variable
+    from sklearn.model_selection import train_test_split
     return train_test_split(X, y, test_size=0.2, random_state=42)
 
 # Train and evaluate a simple prediction model
@@ -42,6 +41,9 @@ def train_and_evaluate_model(X_train, X_test, y_train, y_test):
     """
     Trains a logistic regression model and evaluates its accuracy.
     """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score
+
     model = LogisticRegression()
     model.fit(X_train, y_train)
     y_pred = model.predict(X_test)
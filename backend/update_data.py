@@ -1,43 +1,76 @@
 import sys
 import os
+import json
 import time
+import uuid
+import inspect
+import argparse
 import importlib
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from utils.logging_utils import setup_logger, log_info, log_error
+from config.settings import load_env
+from utils.logging_utils import setup_logger, log_info, log_warning, log_error
 from utils.progress_utils import create_progress_bar
+from utils.shard_utils import SHARD_ENV, split_leagues
+from utils.profiling_utils import PROFILE_ENV, PROFILE_MODES, RunReport
+
+# Load environment variables from .env file (once per process)
+load_env()
 
 # Set up logging
 logger = setup_logger("main")
 
-# Lista skryptów do uruchomienia
-etl_scripts = [
+# Etapy globalne - uruchamiane raz, przed podziałem pracy na shardy lig
+global_scripts = [
     "maintenance.clear_future_matches",
-    "maintenance.reset_api_request_counter",
+    "maintenance.reset_api_request_counter"
+]
+
+# Etapy, które można dzielić per liga (shard)
+sharded_scripts = [
     "etl.etl_future_matches",
     "etl_alldata.etl_matches_all_data",
     "etl.etl_h2h_from_predictions",
     "etl.etl_h2h_all_to_matches_data",
-    "etl.etl_statistics_for_h2h",
-    "etl.etl_statistics_for_matches",
+    "etl.etl_statistics_backfill",
     "etl.etl_teams_data_future_matches",
     "etl.etl_teams_standing_future_matches"
 ]
 
-def run_etl_with_delay(script_list, delay=5):
+# Lista skryptów do uruchomienia
+etl_scripts = global_scripts + sharded_scripts
+
+# Bariera trybu wielu maszyn: shard 0 ustawia flagę po etapach globalnych, pozostałe czekają na nią
+GLOBAL_DONE_KEY = "global_stages_done:{run_id}"
+GLOBAL_DONE_TTL = 24 * 3600
+GLOBAL_WAIT_TIMEOUT = int(os.getenv("GLOBAL_STAGES_WAIT_TIMEOUT", 3600))
+GLOBAL_WAIT_POLL = 10
+
+def run_etl_with_delay(script_list, delay=5, resume=False, run_name="update_data"):
     """
     Run a list of ETL scripts with a delay between each and show a progress bar.
+    With `resume=True` the stages that keep checkpoints continue where the last run stopped.
+    With PROFILE_STAGES set, every stage is measured and a JSON run report is written.
     """
+    report = RunReport(run_name)
     # Tworzenie paska postępu
     progress_bar = create_progress_bar(total=len(script_list), desc="Running ETL scripts", unit="script")
 
     for script_name in script_list:
         try:
             log_info(logger, f"Uruchamianie skryptu: {script_name}")
-            module = importlib.import_module(script_name)
-            module.run()  # Funkcja 'run()' w każdym skrypcie musi być zaimplementowana
+            with report.stage(script_name):
+                module = importlib.import_module(script_name)
+                # Funkcja 'run()' w każdym skrypcie musi być zaimplementowana
+                if "resume" in inspect.signature(module.run).parameters:
+                    module.run(resume=resume)
+                else:
+                    module.run()
             log_info(logger, f"Zakończono: {script_name}")
         except Exception as e:
             log_error(logger, f"Błąd podczas uruchamiania {script_name}: {e}")
@@ -45,8 +78,99 @@ def run_etl_with_delay(script_list, delay=5):
         progress_bar.update(1)  # Zaktualizowanie paska postępu
 
     progress_bar.close()  # Zamknięcie paska postępu po zakończeniu
+    report.save()
+
+    # Wykorzystanie puli Redis w tym procesie (import po etapach - moduł jest już załadowany przez ETL)
+    from config.db_connection import get_redis_pool_stats
+    log_info(logger, f"[{run_name}] Redis pool usage: {get_redis_pool_stats()}")
+
+def mark_global_stages_done(run_id: str):
+    """Flaga w Redis: etapy globalne uruchomienia `run_id` zakończone (shard 0)."""
+    from config.db_connection import get_redis_connection
+    get_redis_connection().setex(GLOBAL_DONE_KEY.format(run_id=run_id), GLOBAL_DONE_TTL, 1)
+
+def wait_for_global_stages(run_id: str, timeout: int = GLOBAL_WAIT_TIMEOUT) -> bool:
+    """Czeka (polling), aż shard 0 zakończy etapy globalne; po `timeout` sekundach kontynuuje z ostrzeżeniem."""
+    from config.db_connection import get_redis_connection
+    redis_client = get_redis_connection()
+    key = GLOBAL_DONE_KEY.format(run_id=run_id)
+    deadline = time.time() + timeout
+    log_info(logger, f"Oczekiwanie na etapy globalne (shard 0), klucz {key}...")
+    while not redis_client.exists(key):
+        if time.time() >= deadline:
+            log_warning(logger, f"Etapy globalne nie zakończyły się w ciągu {timeout}s - kontynuowanie bez nich.")
+            return False
+        time.sleep(GLOBAL_WAIT_POLL)
+    log_info(logger, "Etapy globalne zakończone, start sharda.")
+    return True
+
+def get_configured_league_ids():
+    """Zwraca ID lig zdefiniowanych w LEAGUES (.env)."""
+    return [int(league_id) for league_id in json.loads(os.getenv("LEAGUES", "{}")).values()]
+
+def run_shard(league_ids, script_list, delay=5, resume=False):
+    """
+    Uruchamia etapy ETL dla jednego sharda lig.
+    Ustawia zmienne środowiskowe przed importem modułów ETL, więc musi działać w osobnym procesie.
+    """
+    os.environ[SHARD_ENV] = json.dumps(league_ids)
+    os.environ["SHARED_RATE_LIMIT"] = "1"  # Wspólny limiter zapytań API dla wszystkich procesów
+    log_info(logger, f"Shard {league_ids}: start ({os.getpid()})")
+    shard_name = "update_data_shard_" + "_".join(str(league_id) for league_id in league_ids)
+    run_etl_with_delay(script_list, delay=delay, resume=resume, run_name=shard_name)
+    return league_ids
+
+def run_sharded(workers, delay=5, resume=False):
+    """
+    Dzieli ligi z LEAGUES na `workers` shardów i uruchamia etapy w puli procesów.
+    Limit dzienny, limiter zapytań i cache są wspólne, bo żyją w Redis.
+    """
+    run_etl_with_delay(global_scripts, delay=delay, resume=resume, run_name="update_data_global")
+
+    shards = split_leagues(get_configured_league_ids(), workers)
+    log_info(logger, f"Uruchamianie {len(shards)} shardów: {shards}")
+    # 'spawn' - każdy worker tworzy własne połączenia do MySQL i Redis
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+        futures = {executor.submit(run_shard, shard, sharded_scripts, delay, resume): shard for shard in shards}
+        for future in as_completed(futures):
+            try:
+                log_info(logger, f"Shard {future.result()} zakończony.")
+            except Exception as e:
+                log_error(logger, f"Błąd w shardzie {futures[future]}: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Codzienny proces pobierania danych")
+    parser.add_argument("--resume", action="store_true", help="Wznów etapy z checkpointem od miejsca przerwania")
+    parser.add_argument("--workers", type=int, default=1, help="Liczba procesów; ligi są dzielone między procesy")
+    parser.add_argument("--shard-count", type=int, default=None, help="Liczba maszyn, na które dzielone są ligi")
+    parser.add_argument("--shard-index", type=int, default=0, help="Numer sharda tej maszyny (0..shard-count-1)")
+    parser.add_argument("--delay", type=int, default=5, help="Przerwa między etapami w sekundach")
+    parser.add_argument("--profile", nargs="?", const="basic", choices=PROFILE_MODES, help="Profilowanie etapów z raportem JSON (logs/profiles)")
+    args = parser.parse_args()
+    if args.shard_count and not os.getenv("PIPELINE_RUN_ID"):
+        parser.error("--shard-count wymaga wspólnego PIPELINE_RUN_ID na wszystkich maszynach")
+    if args.profile:
+        os.environ[PROFILE_ENV] = args.profile
+    # Wspólny identyfikator uruchomienia (dziedziczony przez shardy) - kolejki drużyn i pamięć sezonów w Redis.
+    # Przy --shard-count na wielu maszynach PIPELINE_RUN_ID trzeba ustawić ręcznie (kolejka i bariera etapów globalnych).
+    os.environ.setdefault("PIPELINE_RUN_ID", uuid.uuid4().hex[:12])
+
     log_info(logger, "Rozpoczynanie procesu pobierania danych!")
-    run_etl_with_delay(etl_scripts, delay=5)
+    if args.shard_count:
+        # Tryb wielu maszyn: każda maszyna obsługuje swoją część lig, etapy globalne robi shard 0,
+        # a pozostałe maszyny startują dopiero po nich (flaga w Redis dla PIPELINE_RUN_ID)
+        shards = split_leagues(get_configured_league_ids(), args.shard_count)
+        run_id = os.environ["PIPELINE_RUN_ID"]
+        if args.shard_index == 0:
+            run_etl_with_delay(global_scripts, delay=args.delay, resume=args.resume, run_name="update_data_global")
+            mark_global_stages_done(run_id)
+        elif args.shard_index < len(shards):
+            wait_for_global_stages(run_id)
+        if args.shard_index < len(shards):
+            run_shard(shards[args.shard_index], sharded_scripts, delay=args.delay, resume=args.resume)
+    elif args.workers > 1:
+        run_sharded(args.workers, delay=args.delay, resume=args.resume)
+    else:
+        run_etl_with_delay(etl_scripts, delay=args.delay, resume=args.resume)
     log_info(logger, "Proces zakończony")
@@ -0,0 +1,49 @@
+import sys
+import os
+import json
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from typing import Dict, Iterable
+
+from config.db_connection import get_redis_connection
+from utils.logging_utils import setup_logger, log_error
+
+# Setup logger for batch cache helpers
+logger = setup_logger("cache_utils")
+
+# Global Redis connection
+redis_client = get_redis_connection()
+
+# Liczba kluczy w jednym MGET / jednym wykonaniu pipeline'u
+CACHE_BATCH_SIZE = 1000
+
+def cache_get_many(prefix: str, ids: Iterable, batch_size: int = CACHE_BATCH_SIZE) -> Dict:
+    """
+    Odczyt wartości JSON z kluczy `{prefix}:{id}` - jeden MGET na paczkę zamiast GET na każde ID.
+    Zwraca słownik id -> wartość; brakujące klucze i niepoprawny JSON są pomijane (traktowane jak brak w cache).
+    """
+    ids = list(dict.fromkeys(ids))
+    values = {}
+    for i in range(0, len(ids), batch_size):
+        chunk = ids[i:i + batch_size]
+        for item_id, raw in zip(chunk, redis_client.mget([f"{prefix}:{item_id}" for item_id in chunk])):
+            if raw is None:
+                continue
+            try:
+                values[item_id] = json.loads(raw)
+            except json.JSONDecodeError:
+                log_error(logger, f"Invalid JSON in Redis key {prefix}:{item_id}")
+    return values
+
+def cache_set_many(prefix: str, mapping: Dict, ttl: int, batch_size: int = CACHE_BATCH_SIZE) -> int:
+    """Zapis wartości (JSON) do kluczy `{prefix}:{id}` z TTL - SETEX w pipeline, jedno wykonanie na paczkę."""
+    items = list(mapping.items())
+    ttl = max(int(ttl), 1)
+    for i in range(0, len(items), batch_size):
+        pipeline = redis_client.pipeline(transaction=False)
+        for item_id, value in items[i:i + batch_size]:
+            pipeline.setex(f"{prefix}:{item_id}", ttl, json.dumps(value))
+        pipeline.execute()
+    return len(items)
@@ -0,0 +1,148 @@
+import sys
+import os
+import json
+import time
+import threading
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+
+from api.api_requests import is_daily_limit_reached
+from config.db_connection import get_redis_connection
+from utils.shard_utils import shard_key_suffix
+from utils.logging_utils import setup_logger, log_info, log_warning, log_error
+
+# Setup logger for checkpoints
+logger = setup_logger("checkpoint_utils")
+
+# Global Redis connection
+redis_client = get_redis_connection()
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Ile razy ponawiamy element oznaczony jako failed i bazowe opóźnienie (sekundy) dla backoffu
+MAX_ATTEMPTS = int(os.getenv("CHECKPOINT_MAX_ATTEMPTS", 3))
+BACKOFF_BASE = int(os.getenv("CHECKPOINT_BACKOFF_SECONDS", 5))
+BACKOFF_MAX = int(os.getenv("CHECKPOINT_BACKOFF_MAX_SECONDS", 300))
+
+class DailyLimitReached(Exception):
+    """Zgłaszany, gdy w trakcie etapu wyczerpano dzienny limit API."""
+
+class StageCheckpoint:
+    """
+    Trwały checkpoint etapu ETL trzymany w Redis.
+    Hash `checkpoint:{stage}` przechowuje dla każdego elementu pracy jego status
+    (pending/done/failed), liczbę prób, ostatni błąd i pozycję na liście.
+    W trybie shardowanym klucz ma sufiks sharda (`checkpoint:{stage}:shard_39_140`),
+    więc równoległe shardy nie resetują ani nie usuwają swoich checkpointów nawzajem.
+    """
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.key = f"checkpoint:{stage}{shard_key_suffix()}"
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def _save_item(self, item_key: str):
+        redis_client.hset(self.key, item_key, json.dumps(self._state[item_key]))
+
+    def start(self, items: list, resume: bool = False) -> list:
+        """
+        Rozpoczyna etap. Przy `resume=True` wczytuje zapisany checkpoint i zwraca
+        tylko elementy niezakończone (pending + failed z limitem prób), w oryginalnej kolejności.
+        Bez `resume` checkpoint jest resetowany i zwracana jest cała lista `items`.
+        """
+        if resume:
+            stored = redis_client.hgetall(self.key)
+            if stored:
+                self._state = {key: json.loads(value) for key, value in stored.items()}
+                ordered = sorted(self._state.items(), key=lambda entry: entry[1].get("order", 0))
+                todo = [
+                    entry["item"] for _, entry in ordered
+                    if entry["status"] == STATUS_PENDING
+                    or (entry["status"] == STATUS_FAILED and entry.get("attempts", 0) < MAX_ATTEMPTS)
+                ]
+                log_info(logger, f"[{self.stage}] Wznawianie z checkpointu: {len(todo)}/{len(ordered)} elementów do przetworzenia. {self.summary()}")
+                return todo
+            log_info(logger, f"[{self.stage}] Brak zapisanego checkpointu, start od zera.")
+
+        unique_items = list(dict.fromkeys(items))
+        self._state = {
+            str(item): {"item": item, "status": STATUS_PENDING, "attempts": 0, "error": None, "order": order}
+            for order, item in enumerate(unique_items)
+        }
+        pipe = redis_client.pipeline()
+        pipe.delete(self.key)
+        if self._state:
+            pipe.hset(self.key, mapping={key: json.dumps(value) for key, value in self._state.items()})
+        pipe.execute()
+        return unique_items
+
+    def mark_done(self, item):
+        with self._lock:
+            entry = self._state.setdefault(str(item), {"item": item, "attempts": 0, "order": len(self._state)})
+            entry.update({"status": STATUS_DONE, "error": None, "finished_at": datetime.now().isoformat()})
+            self._save_item(str(item))
+
+    def mark_failed(self, item, error):
+        with self._lock:
+            entry = self._state.setdefault(str(item), {"item": item, "attempts": 0, "order": len(self._state)})
+            entry.update({"status": STATUS_FAILED, "attempts": entry.get("attempts", 0) + 1, "error": str(error)})
+            self._save_item(str(item))
+
+    def mark_pending(self, item):
+        with self._lock:
+            entry = self._state.setdefault(str(item), {"item": item, "attempts": 0, "order": len(self._state)})
+            entry.update({"status": STATUS_PENDING})
+            self._save_item(str(item))
+
+    def wait_before_retry(self, item):
+        """Exponential backoff dla elementów, które wcześniej zakończyły się błędem."""
+        attempts = self._state.get(str(item), {}).get("attempts", 0)
+        if attempts > 0:
+            delay = min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+            log_info(logger, f"[{self.stage}] Ponawianie elementu {item} (próba {attempts + 1}) za {delay}s.")
+            time.sleep(delay)
+
+    def run_item(self, item, func, *args, complete: bool = True, **kwargs):
+        """
+        Wykonuje `func` dla elementu i zapisuje wynik w checkpoincie.
+        Jeżeli po wykonaniu dzienny limit API jest wyczerpany, element wraca do `pending`
+        (wynik mógł być niepełny) i zgłaszany jest `DailyLimitReached`.
+        Z `complete=False` udany element zostaje `pending` - wywołujący oznacza go jako done
+        dopiero po zapisaniu wyniku (np. po commicie paczki do bazy).
+        """
+        self.wait_before_retry(item)
+        try:
+            result = func(item, *args, **kwargs)
+        except Exception as e:
+            log_error(logger, f"[{self.stage}] Błąd dla elementu {item}: {e}")
+            self.mark_failed(item, e)
+            return None
+
+        if is_daily_limit_reached():
+            self.mark_pending(item)
+            raise DailyLimitReached(f"Dzienny limit API wyczerpany podczas etapu {self.stage}.")
+
+        if complete:
+            self.mark_done(item)
+        return result
+
+    def summary(self) -> dict:
+        counts = {STATUS_PENDING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for entry in self._state.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+    def finish(self):
+        """Loguje podsumowanie etapu; w pełni zakończony checkpoint jest usuwany z Redis."""
+        summary = self.summary()
+        if summary[STATUS_PENDING] == 0 and summary[STATUS_FAILED] == 0:
+            redis_client.delete(self.key)
+            log_info(logger, f"[{self.stage}] Etap zakończony, checkpoint usunięty. {summary}")
+        else:
+            log_warning(logger, f"[{self.stage}] Etap niezakończony, użyj --resume aby kontynuować. {summary}")
+        return summary
@@ -1,5 +1,3 @@
-import pandas as pd
-
 def clean_dataframe(df):
     """
     Cleans a pandas DataFrame by removing duplicates and filling missing values.
@@ -2,11 +2,11 @@ import os
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
+from config.settings import load_env
 from utils.logging_utils import log_error, setup_logger
 
 # Load environment variables
-load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+load_env()
 
 def send_email_alert(subject, body, body_type="plain", recipients=None):
     """
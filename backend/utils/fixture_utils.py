@@ -0,0 +1,92 @@
+import sys
+import os
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from api.api_requests import get_data, get_ttl_to_midnight
+from config.db_connection import get_redis_connection
+from utils.logging_utils import setup_logger, log_info, log_warning, log_error
+from utils.cache_utils import cache_get_many, cache_set_many
+
+# Setup logger for fixtures
+logger = setup_logger("fixture_utils")
+
+# Global Redis connection
+redis_client = get_redis_connection()
+
+# API-Football przyjmuje do 20 ID rozdzielonych myślnikiem w parametrze `ids`
+FIXTURE_IDS_PER_REQUEST = 20
+# Dzienny licznik zaoszczędzonych zapytań (ile zapytań `fixtures?id=` zastąpiły zapytania `ids=`)
+SAVED_REQUESTS_KEY = "api_requests_saved_daily:fixtures"
+
+def _fetch_fixture_chunk(chunk: List[int]) -> List[Dict]:
+    response = get_data("fixtures", params={"ids": "-".join(str(fixture_id) for fixture_id in chunk)})
+    if not response or 'response' not in response:
+        return []
+    return [fixture for fixture in response['response'] if isinstance(fixture, dict)]
+
+def record_saved_requests(fixture_count: int, request_count: int):
+    """Zapisuje liczbę zapytań zaoszczędzonych dzięki zapytaniom zbiorczym."""
+    saved = fixture_count - request_count
+    if saved <= 0:
+        return
+    pipeline = redis_client.pipeline()
+    pipeline.incrby(SAVED_REQUESTS_KEY, saved)
+    pipeline.expire(SAVED_REQUESTS_KEY, max(get_ttl_to_midnight(), 1))
+    total_saved = pipeline.execute()[0]
+    log_info(logger, f"Fixtures: {fixture_count} fixtures fetched with {request_count} requests "
+                     f"(saved {saved}, today {total_saved}).")
+
+def load_fixtures(fixture_ids: List[int], cache_prefix: str = "match", cache_ttl: int = 15552000,
+                  max_workers: int = 2, progress_bar=None) -> Dict[int, Dict]:
+    """
+    Pobiera pełne dane meczów dla listy ID.
+    Trafienia czytane są z cache `{cache_prefix}:{id}` (cache_get_many - MGET); braki pobierane są z API
+    paczkami po 20 ID (`fixtures?ids=`), a każdy mecz z odpowiedzi trafia do swojego klucza w cache.
+    Zwraca słownik fixture_id -> dane meczu (brak klucza = mecz nieznaleziony).
+    """
+    fixture_ids = list(dict.fromkeys(int(fixture_id) for fixture_id in fixture_ids if fixture_id))
+    if not fixture_ids:
+        return {}
+
+    fixtures = cache_get_many(cache_prefix, fixture_ids)
+    if progress_bar:
+        progress_bar.update(len(fixtures))
+
+    missing_ids = [fixture_id for fixture_id in fixture_ids if fixture_id not in fixtures]
+    if not missing_ids:
+        return fixtures
+
+    chunks = [missing_ids[i:i + FIXTURE_IDS_PER_REQUEST] for i in range(0, len(missing_ids), FIXTURE_IDS_PER_REQUEST)]
+    # Oszczędność liczona tylko dla paczek, które zwróciły dane (bez błędów i zapytań odciętych limitem)
+    fetched_count = 0
+    successful_requests = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tasks = {executor.submit(_fetch_fixture_chunk, chunk): chunk for chunk in chunks}
+        for future in as_completed(tasks):
+            chunk = tasks[future]
+            try:
+                fetched = future.result()
+            except Exception as e:
+                log_error(logger, f"Error fetching fixtures {chunk}: {e}")
+                fetched = []
+
+            fetched = {fixture['fixture']['id']: fixture for fixture in fetched if fixture.get('fixture', {}).get('id') is not None}
+            fixtures.update(fetched)
+            if fetched:
+                fetched_count += len(fetched)
+                successful_requests += 1
+            cache_set_many(cache_prefix, fetched, cache_ttl)
+
+            not_found = [fixture_id for fixture_id in chunk if fixture_id not in fixtures]
+            if not_found:
+                log_warning(logger, f"No fixture data found for IDs: {not_found}")
+            if progress_bar:
+                progress_bar.update(len(chunk))
+
+    record_saved_requests(fetched_count, successful_requests)
+    return fixtures
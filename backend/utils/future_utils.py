@@ -1,64 +1,98 @@
 import sys
 import os
-import json
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from config.settings import load_env
 from typing import List, Dict
-from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
 from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import text
 
-from api.api_requests import get_data, get_ttl_to_midnight
-from config.db_connection import get_redis_connection, SessionLocal
+from api.api_requests import get_data, get_ttl_to_midnight, is_daily_limit_reached
+from config.db_connection import SessionLocal
 from utils.progress_utils import create_progress_bar
 from utils.logging_utils import setup_logger, log_info, log_error, log_warning
 from utils.validation_utils import is_table_empty, parse_date_to_local
 from utils.special_football_functions import get_current_season
+from utils.shard_utils import shard_condition
+from utils.fixture_utils import load_fixtures
+from utils.redis_index_utils import register_fixtures, scan_values
+from utils.cache_utils import cache_get_many, cache_set_many
 
-# Load environment variables from .env file
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+# Load environment variables from .env file (once per process)
+load_env()
 
 # Import leagues from config
 fetch_days_config = os.getenv("FETCH_DAYS", "0")
 fetch_days = list(map(int, fetch_days_config.split(",")))
+# Tryb wyszukiwania meczów: "date" - jedno zapytanie `fixtures?date=` na dzień (filtr lig lokalnie),
+# "league" - zapytanie na każdą parę liga x dzień (dla planów API stronicujących wyniki dla daty)
+FIXTURE_DISCOVERY_MODE = os.getenv("FIXTURE_DISCOVERY_MODE", "date").strip().lower()
 
 # Setup logger for notifications
 logger = setup_logger("future_utils")
 
-# Global Redis connection
-redis_client = get_redis_connection()
+# Wiersze `future_match_db:*` (wykrywanie zmian meczów) wygasają o północy
 cache_ttl = get_ttl_to_midnight()
 
-def fetch_future_away_team() -> List[Dict]:
-    """Fetch a list of predictions matches from DB."""
+def fetch_future_team_ids() -> List[int]:
+    """Fetch unique team IDs (home and away) of future matches in a single query."""
 
-    query = text("SELECT away_team_id FROM future_matches")
+    params = {}
+    condition = shard_condition('league_id', params)
+    query = text(f"""
+        SELECT home_team_id AS team_id FROM future_matches WHERE {condition}
+        UNION
+        SELECT away_team_id AS team_id FROM future_matches WHERE {condition}
+    """)
     try:
         with SessionLocal() as session:
-            matches = session.execute(query).fetchall()
-            return [row[0] for row in matches]
+            teams = session.execute(query, params).fetchall()
+            return [row[0] for row in teams]
     except SQLAlchemyError as e:
-        log_error(logger, f"Error fetching available matches: {e}")
+        log_error(logger, f"Error fetching future teams: {e}")
         return []
 
-def fetch_future_home_team() -> List[Dict]:
-    """Fetch a list of predictions matches from DB."""
+def fetch_future_league_teams() -> Dict[int, Dict]:
+    """
+    Group teams of future matches by league.
+    Returns league_id -> {"season": leagues.current_season, "team_ids": set of team IDs}.
+    """
+    params = {}
+    query = text(f"""
+        SELECT fm.league_id, l.current_season, fm.home_team_id, fm.away_team_id
+        FROM future_matches fm
+        LEFT JOIN leagues l ON l.league_id = fm.league_id
+        WHERE {shard_condition('fm.league_id', params)}
+    """)
+    try:
+        with SessionLocal() as session:
+            rows = session.execute(query, params).fetchall()
+    except SQLAlchemyError as e:
+        log_error(logger, f"Error fetching future teams by league: {e}")
+        return {}
+
+    league_teams = {}
+    for league_id, season, home_team_id, away_team_id in rows:
+        league = league_teams.setdefault(league_id, {"season": season, "team_ids": set()})
+        league["team_ids"].update(team_id for team_id in (home_team_id, away_team_id) if team_id is not None)
+    return league_teams
 
-    query = text("SELECT home_team_id FROM future_matches")
+def fetch_future_match_ids() -> List[int]:
+    """Fetch IDs of future matches (limited to the current shard)."""
+
+    params = {}
+    query = text(f"SELECT match_id FROM future_matches WHERE {shard_condition('league_id', params)}")
     try:
         with SessionLocal() as session:
-            matches = session.execute(query).fetchall()
+            matches = session.execute(query, params).fetchall()
             return [row[0] for row in matches]
     except SQLAlchemyError as e:
-        log_error(logger, f"Error fetching available matches: {e}")
+        log_error(logger, f"Error fetching future matches: {e}")
         return []
 
 def fetch_match_ids(league_id: int, match_date: str) -> List[int]:
@@ -86,56 +120,135 @@ def fetch_match_ids(league_id: int, match_date: str) -> List[int]:
         log_error(logger, f"Error fetching match IDs for league {league_id} on {match_date}: {e}")
         return []
 
+def fetch_fixtures_for_date(match_date: str, league_ids: List[int]) -> List[Dict]:
+    """
+    Fetch all not-started fixtures for a date with a single `fixtures?date=` request
+    and keep only the configured leagues. Full fixture objects are cached in `future_match:{id}`.
+    Returns None when the request failed, the response is invalid or paged (caller falls back
+    to the per-league mode for that date); [] for a valid response without fixtures and when the
+    daily API limit is reached (the per-league grid would fail the same way).
+    The request skips `api_cache`, so the raw payload tells an empty day apart from a failed call.
+    """
+    try:
+        response = get_data("fixtures", params={"date": match_date, "status": "NS"}, cache=False)
+        if response is None and is_daily_limit_reached():
+            log_warning(logger, f"Daily API limit reached, fixtures for {match_date} not fetched.")
+            return []
+        if not isinstance(response, dict) or not isinstance(response.get('response'), list) or response.get('errors'):
+            log_warning(logger, f"Invalid API response for fixtures on {match_date}, using per-league mode.")
+            return None
+        if not response['response']:
+            log_info(logger, f"No fixtures on {match_date}.")
+            return []
+        if response.get('paging', {}).get('total', 1) > 1:
+            log_warning(logger, f"Fixtures for {match_date} are paged ({response['paging']['total']} pages), using per-league mode.")
+            return None
+
+        league_set = set(league_ids)
+        fixtures = [
+            match for match in response['response']
+            if isinstance(match, dict) and match.get('league', {}).get('id') in league_set
+            and match.get('fixture', {}).get('id') is not None
+        ]
+        cache_set_many("future_match", {match['fixture']['id']: match for match in fixtures}, 86400)
+
+        log_info(logger, f"{match_date}: {len(fixtures)} of {len(response['response'])} fixtures in configured leagues.")
+        return fixtures
+    except Exception as e:
+        log_error(logger, f"Error fetching fixtures for {match_date}: {e}")
+        return None
+
+def fetch_match_ids_by_league(league_ids: List[int], dates: List[str]) -> List[int]:
+    """ Fetch match IDs with one request per (league, date) pair. """
+    all_match_ids = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with create_progress_bar(total=len(league_ids) * len(dates), desc="Sprawdzanie meczy...") as pbar:
+            futures = [
+                executor.submit(fetch_match_ids, league_id, match_date)
+                for league_id in league_ids
+                for match_date in dates
+            ]
+            for future in futures:
+                try:
+                    match_ids = future.result()
+                    if not match_ids:
+                        continue
+                    all_match_ids.extend(match_ids)
+                except Exception as e:
+                    log_error(logger, f"Error fetching match IDs: {e}")
+                finally:
+                    pbar.update(1)
+    return all_match_ids
+
+def discover_future_fixtures(league_ids: List[int], dates: List[str], mode: str = None) -> List[Dict]:
+    """
+    Find future fixtures for the configured leagues and dates.
+    In "date" mode the full fixture objects come straight from `fixtures?date=` (no detail requests);
+    dates with failed, invalid or paged results and the "league" mode use the league x date grid plus `fixtures?ids=`.
+    """
+    mode = mode or FIXTURE_DISCOVERY_MODE
+    all_matches = []
+    league_dates = dates
+    if mode == "date":
+        league_dates = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with create_progress_bar(total=len(dates), desc="Sprawdzanie meczy (daty)...") as pbar:
+                futures = {executor.submit(fetch_fixtures_for_date, match_date, league_ids): match_date for match_date in dates}
+                for future, match_date in futures.items():
+                    try:
+                        fixtures = future.result()
+                        if fixtures is None:
+                            league_dates.append(match_date)
+                        else:
+                            all_matches.extend(fixtures)
+                    except Exception as e:
+                        log_error(logger, f"Error fetching fixtures for {match_date}: {e}")
+                        league_dates.append(match_date)
+                    finally:
+                        pbar.update(1)
+        log_info(logger, f"Date discovery: {len(dates)} requests instead of {len(league_ids) * len(dates)}, {len(all_matches)} fixtures.")
+    elif mode != "league":
+        log_warning(logger, f"Unknown FIXTURE_DISCOVERY_MODE '{mode}', using per-league mode.")
+
+    if league_dates and is_daily_limit_reached():
+        log_warning(logger, f"Daily API limit reached, skipping per-league discovery for {len(league_dates)} dates.")
+        league_dates = []
+    if league_dates:
+        all_match_ids = fetch_match_ids_by_league(league_ids, league_dates)
+        # Szczegóły meczów: cache future_match:{id} + zbiorcze zapytania `fixtures?ids=` (do 20 ID na zapytanie)
+        with create_progress_bar(total=len(set(all_match_ids)), desc="Sprawdzanie szczegolow...") as pbar:
+            fixtures = load_fixtures(all_match_ids, cache_prefix="future_match", cache_ttl=86400, progress_bar=pbar)
+        all_matches.extend(fixtures.values())
+    return all_matches
+
 def fetch_matches_by_ids(match_ids: List[int]) -> List[Dict]:
-    """ Fetch match data based on a list of match IDs. """
-    matches = []
-    for match_id in match_ids:
-        redis_key = f"future_match:{match_id}"
-        cached_data = redis_client.get(redis_key)
-        if cached_data:
-            matches.append(json.loads(cached_data))
-        else:
-            try:
-                response = get_data("fixtures", params={"id": match_id})
-                if response and 'response' in response:
-                    match = response['response'][0]
-                    redis_client.setex(redis_key, 86400, json.dumps(match))  # Cache for a day
-                    matches.append(match)
-            except Exception as e:
-                log_error(logger, f"Error fetching match data for match ID {match_id}: {e}")
-    return matches
+    """ Fetch match data based on a list of match IDs (one `fixtures?ids=` request per 20 IDs). """
+    fixtures = load_fixtures(match_ids, cache_prefix="future_match", cache_ttl=86400)  # Cache for a day
+    return [fixtures[match_id] for match_id in match_ids if match_id in fixtures]
 
 def fetch_and_insert_future_matches_hset(league_ids: list):
     """
     Fetch and insert future matches for a list of league IDs into the database.
     """
-    all_match_ids = []
-
     # Check if the table is empty and load data from Redis if so
     if is_table_empty("future_matches"):
         log_info(logger, "Table 'future_matches' is empty. Check data from Redis.")
-        redis_keys = redis_client.keys("future_match_db:*")
         rows = []
-        for key in redis_keys:
-            raw_match = redis_client.get(key)
-            if raw_match:
-                match = json.loads(raw_match)
-                if isinstance(match, dict) and "match_id" in match:
-                    rows.append({
-                        "match_id": match['match_id'],
-                        "league_id": match.get('league_id'),
-                        "home_team_id": match.get('home_team_id'),
-                        "away_team_id": match.get('away_team_id'),
-                        "match_date": match.get('match_date'),
-                        "stadium": match.get('stadium'),
-                        "referee": match.get('referee'),
-                        "status": match.get('status'),
-                        "last_data_insert": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                else:
-                    log_error(logger, f"Invalid match format from Redis: {match}")
+        for key, match in scan_values("future_match_db:*"):
+            if isinstance(match, dict) and "match_id" in match:
+                rows.append({
+                    "match_id": match['match_id'],
+                    "league_id": match.get('league_id'),
+                    "home_team_id": match.get('home_team_id'),
+                    "away_team_id": match.get('away_team_id'),
+                    "match_date": match.get('match_date'),
+                    "stadium": match.get('stadium'),
+                    "referee": match.get('referee'),
+                    "status": match.get('status'),
+                    "last_data_insert": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
             else:
-                log_error(logger, f"Empty match data in Redis for key: {key}")
+                log_error(logger, f"Invalid match format from Redis key {key}: {match}")
 
         if rows:
             try:
@@ -163,36 +276,9 @@ def fetch_and_insert_future_matches_hset(league_ids: list):
     today = datetime.now()
     dates_to_fetch = [(today + timedelta(days=day)).strftime("%Y-%m-%d") for day in fetch_days]
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        with create_progress_bar(total=len(league_ids) * len(dates_to_fetch), desc="Sprawdzanie meczy...") as pbar:
-            futures = [
-                executor.submit(fetch_match_ids, league_id, match_date)
-                for league_id in league_ids
-                for match_date in dates_to_fetch
-            ]
-            for future in futures:
-                try:
-                    match_ids = future.result()
-                    if not match_ids:
-                        continue
-                    all_match_ids.extend(match_ids)
-                except Exception as e:
-                    log_error(logger, f"Error fetching match IDs: {e}")
-                finally:
-                    pbar.update(1)
-
-    all_matches = []
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        with create_progress_bar(total=len(all_match_ids) // 20 + 1, desc="Sprawdzanie szczegolow...") as pbar:
-            futures = [executor.submit(fetch_matches_by_ids, all_match_ids[i:i + 20]) for i in range(0, len(all_match_ids), 20)]
-            for future in futures:
-                try:
-                    matches = future.result()
-                    all_matches.extend(matches)
-                except Exception as e:
-                    log_error(logger, f"Error fetching match details: {e}")
-                finally:
-                    pbar.update(1)
+    all_matches = discover_future_fixtures(league_ids, dates_to_fetch)
+    # Indeks wygasania - clear_future_matches usuwa klucze rozpoczętych meczów bez przeglądania Redis
+    register_fixtures(all_matches)
 
     unique_matches = {}
     for match in all_matches:
@@ -210,18 +296,16 @@ def fetch_and_insert_future_matches_hset(league_ids: list):
         else:
             log_error(logger, f"Invalid match format: {match}")
 
-    unique_matches = unique_matches.values()
+    unique_matches = list(unique_matches.values())
+
+    # Wiersze zapamiętane przy poprzednim przebiegu - jeden MGET zamiast GET na każdy mecz
+    cached_rows = cache_get_many("future_match_db", [match['match_id'] for match in unique_matches])
+    changed_matches = [match for match in unique_matches if cached_rows.get(match['match_id']) != match]
+    log_info(logger, f"No changes detected for {len(unique_matches) - len(changed_matches)} matches, skipping DB update.")
 
     try:
         with SessionLocal() as session:
-            for match in unique_matches:
-                redis_key = f"future_match_db:{match['match_id']}"
-                cached_row = redis_client.get(redis_key)
-                if cached_row and json.loads(cached_row) == match:
-                    log_info(logger, f"No changes detected for match ID {match['match_id']}, skipping DB update.")
-                    continue
-                redis_client.setex(redis_key, cache_ttl, json.dumps(match))
-
+            if changed_matches:
                 query = text("""
                     INSERT INTO future_matches (
                         match_id, league_id, home_team_id, away_team_id, match_date, stadium, referee, status, last_data_insert
@@ -232,9 +316,10 @@ def fetch_and_insert_future_matches_hset(league_ids: list):
                         away_team_id=VALUES(away_team_id), match_date=VALUES(match_date),
                         stadium=VALUES(stadium), referee=VALUES(referee), status=VALUES(status), last_data_insert=NOW()
                 """)
-                session.execute(query, match)
-            session.commit()
-            log_info(logger, f"Inserted/updated {len(unique_matches)} matches into the database.")
+                session.execute(query, changed_matches)
+                session.commit()
+            cache_set_many("future_match_db", {match['match_id']: match for match in changed_matches}, cache_ttl)
+            log_info(logger, f"Inserted/updated {len(changed_matches)} matches into the database.")
 
             return unique_matches
     except SQLAlchemyError as e:
@@ -5,7 +5,7 @@ import json
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from dotenv import load_dotenv
+from config.settings import load_env
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import text
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -14,13 +14,10 @@ from utils.progress_utils import create_progress_bar
 from config.db_connection import get_redis_connection, SessionLocal
 from utils.logging_utils import setup_logger, log_info, log_error, log_warning
 from utils.validation_utils import parse_date_to_local
-from utils.match_statistics_utils import fetch_match_statistics
+from utils.match_statistics_utils import prefetch_match_statistics
 
-# Load environment variables from .env file
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+# Load environment variables from .env file (once per process)
+load_env()
 
 # Setup logger for notifications
 logger = setup_logger("h2h_utils")
@@ -59,15 +56,23 @@ def filter_new_matches(h2h_matches, max_workers=8):
                     pbar.update(1)
     return new_matches
 
-def store_h2h_matches(h2h_data: list) -> None:
-    """Store head-to-head (H2H) match data and their statistics in the database."""
+def store_h2h_matches(h2h_data: list) -> bool:
+    """
+    Store head-to-head (H2H) match data and their statistics in the database.
+    Returns False when the database write failed.
+    """
 
     if not h2h_data:
         log_warning(logger, "Brak danych H2H do przetworzenia.")
-        return
+        return True
 
     log_info(logger, f"🔄 Rozpoczynamy przetwarzanie {len(h2h_data)} meczów H2H...")
 
+    # Statystyki całej paczki pobierane z góry: MGET z Redis + współbieżne zapytania do API dla braków
+    statistics_by_fixture = prefetch_match_statistics(
+        [match.get('fixture', {}).get('id') for match in h2h_data]
+    )
+
     records = []
     pbar = create_progress_bar(len(h2h_data), "Przetwarzanie H2H...", "mecz")
 
@@ -77,8 +82,8 @@ def store_h2h_matches(h2h_data: list) -> None:
             home_team_id = match['teams']['home']['id']
             away_team_id = match['teams']['away']['id']
 
-            # Pobranie statystyk dla danego meczu
-            stats = fetch_match_statistics(fixture_id)
+            # Statystyki meczu z wcześniej pobranej paczki
+            stats = statistics_by_fixture.get(fixture_id)
             if not stats:
                 # log_info(logger, f"No statistics available for fixture ID {fixture_id}.")
                 pbar.update(1)
@@ -202,4 +207,6 @@ def store_h2h_matches(h2h_data: list) -> None:
                 session.commit()
                 log_info(logger, f"Inserted/updated {len(records)} H2H matches into the database.")
         except SQLAlchemyError as e:
-            log_error(logger, f"Error inserting H2H matches into database: {e}")
\ No newline at end of file
+            log_error(logger, f"Error inserting H2H matches into database: {e}")
+            return False
+    return True
\ No newline at end of file
@@ -0,0 +1,178 @@
+import sys
+import os
+import json
+import time
+import socket
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from redis.exceptions import ResponseError
+
+from api.api_requests import is_daily_limit_reached
+from config.db_connection import get_redis_connection
+from utils.logging_utils import setup_logger, log_info, log_warning, log_error
+
+# Setup logger for job queue
+logger = setup_logger("job_queue_utils")
+
+# Global Redis connection
+redis_client = get_redis_connection()
+
+# Każdy rodzaj pracy ma własny strumień: jobs:{job_type}; wspólna grupa konsumentów i strumień martwych zadań
+JOB_TYPES = ("statistics", "events", "h2h", "predictions", "players")
+STREAM_PREFIX = "jobs"
+CONSUMER_GROUP = "fixture_workers"
+DEAD_LETTER_STREAM = "jobs:dead_letter"
+
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+STREAM_MAXLEN = int(os.getenv("JOB_STREAM_MAXLEN", 100000))
+# Po jakim czasie (ms) zadanie pobrane przez martwego workera może przejąć inny worker
+CLAIM_IDLE_MS = int(os.getenv("JOB_CLAIM_IDLE_MS", 10 * 60 * 1000))
+
+def stream_key(job_type: str) -> str:
+    return f"{STREAM_PREFIX}:{job_type}"
+
+def default_consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def ensure_consumer_groups(job_types=JOB_TYPES):
+    """Tworzy strumienie i grupę konsumentów (idempotentnie)."""
+    for job_type in job_types:
+        try:
+            redis_client.xgroup_create(stream_key(job_type), CONSUMER_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+def enqueue_jobs(job_type: str, payloads: list, attempts: int = 0) -> int:
+    """Dodaje zadania danego typu do strumienia (pipeline, jedno przejście do Redis)."""
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Unknown job type: {job_type}")
+    if not payloads:
+        return 0
+    ensure_consumer_groups([job_type])
+    pipeline = redis_client.pipeline(transaction=False)
+    for payload in payloads:
+        pipeline.xadd(stream_key(job_type), {"payload": json.dumps(payload), "attempts": attempts},
+                      maxlen=STREAM_MAXLEN, approximate=True)
+    pipeline.execute()
+    log_info(logger, f"Enqueued {len(payloads)} '{job_type}' jobs.")
+    return len(payloads)
+
+def queue_stats(job_types=JOB_TYPES) -> dict:
+    """Zwraca długość strumienia i liczbę niepotwierdzonych zadań dla każdego typu."""
+    stats = {}
+    for job_type in job_types:
+        key = stream_key(job_type)
+        try:
+            pending = redis_client.xpending(key, CONSUMER_GROUP)["pending"]
+        except ResponseError:
+            pending = 0
+        stats[job_type] = {"length": redis_client.xlen(key), "pending": pending}
+    stats["dead_letter"] = {"length": redis_client.xlen(DEAD_LETTER_STREAM), "pending": 0}
+    return stats
+
+class JobWorker:
+    """
+    Worker przetwarzający zadania ze strumieni Redis w grupie konsumentów.
+    Zadanie jest potwierdzane (XACK) po obsłudze; nieudane wraca do strumienia z licznikiem prób,
+    a po MAX_ATTEMPTS trafia do strumienia martwych zadań. Zadania pobrane przez worker,
+    który przestał działać, są przejmowane po CLAIM_IDLE_MS (XAUTOCLAIM).
+    """
+    def __init__(self, handlers: dict, job_types=JOB_TYPES, consumer: str = None, batch_size: int = 10, block_ms: int = 5000):
+        self.handlers = handlers
+        self.job_types = [job_type for job_type in job_types if job_type in handlers]
+        self.consumer = consumer or default_consumer_name()
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.processed = 0
+        self.failed = 0
+        ensure_consumer_groups(self.job_types)
+
+    def _finish(self, job_type: str, message_id: str, fields: dict, error: Exception = None):
+        key = stream_key(job_type)
+        pipeline = redis_client.pipeline()
+        if error is not None:
+            attempts = int(fields.get("attempts", 0)) + 1
+            if attempts >= MAX_ATTEMPTS:
+                pipeline.xadd(DEAD_LETTER_STREAM, {"job_type": job_type, "payload": fields.get("payload", ""),
+                                                   "attempts": attempts, "error": str(error)[:500],
+                                                   "consumer": self.consumer, "failed_at": int(time.time())})
+                log_error(logger, f"Job {job_type} {fields.get('payload')} moved to dead letter: {error}")
+            else:
+                pipeline.xadd(key, {"payload": fields.get("payload", ""), "attempts": attempts},
+                              maxlen=STREAM_MAXLEN, approximate=True)
+                log_warning(logger, f"Job {job_type} {fields.get('payload')} failed (attempt {attempts}): {error}")
+        pipeline.xack(key, CONSUMER_GROUP, message_id)
+        pipeline.xdel(key, message_id)
+        pipeline.execute()
+
+    def _requeue(self, job_type: str, message_id: str, fields: dict):
+        """Oddaje zadanie do kolejki bez zwiększania licznika prób (np. po wyczerpaniu limitu API)."""
+        key = stream_key(job_type)
+        pipeline = redis_client.pipeline()
+        pipeline.xadd(key, {"payload": fields.get("payload", ""), "attempts": fields.get("attempts", 0)})
+        pipeline.xack(key, CONSUMER_GROUP, message_id)
+        pipeline.xdel(key, message_id)
+        pipeline.execute()
+
+    def handle(self, job_type: str, message_id: str, fields: dict) -> bool:
+        """Obsługuje jedno zadanie. Zwraca False, gdy worker powinien się zatrzymać."""
+        if is_daily_limit_reached():
+            self._requeue(job_type, message_id, fields)
+            log_warning(logger, "Daily API limit reached - worker stops, job returned to queue.")
+            return False
+        try:
+            payload = json.loads(fields.get("payload", "{}"))
+            self.handlers[job_type](**payload)
+            self._finish(job_type, message_id, fields)
+            self.processed += 1
+        except Exception as e:
+            self._finish(job_type, message_id, fields, error=e)
+            self.failed += 1
+        return True
+
+    def _claim_stale(self) -> list:
+        claimed = []
+        for job_type in self.job_types:
+            try:
+                result = redis_client.xautoclaim(stream_key(job_type), CONSUMER_GROUP, self.consumer,
+                                                 min_idle_time=CLAIM_IDLE_MS, count=self.batch_size)
+            except ResponseError:
+                continue
+            messages = result[1] if len(result) > 1 else []
+            claimed.extend((job_type, message_id, fields) for message_id, fields in messages if fields)
+        return claimed
+
+    def read_batch(self) -> list:
+        streams = {stream_key(job_type): ">" for job_type in self.job_types}
+        response = redis_client.xreadgroup(CONSUMER_GROUP, self.consumer, streams, count=self.batch_size, block=self.block_ms)
+        batch = []
+        for key, messages in response or []:
+            job_type = key.split(":", 1)[1]
+            batch.extend((job_type, message_id, fields) for message_id, fields in messages)
+        return batch
+
+    def run(self, drain: bool = False):
+        """
+        Pętla workera. Przy `drain=True` kończy, gdy w strumieniach nie ma już zadań
+        (tryb używany przez benchmark i jednorazowe uruchomienia).
+        """
+        log_info(logger, f"Worker {self.consumer} started for {self.job_types}")
+        running = True
+        while running:
+            batch = self._claim_stale() or self.read_batch()
+            if not batch:
+                if drain:
+                    break
+                continue
+            for position, (job_type, message_id, fields) in enumerate(batch):
+                if not self.handle(job_type, message_id, fields):
+                    # Pozostałe pobrane zadania wracają do kolejki dla kolejnego uruchomienia
+                    for rest_type, rest_id, rest_fields in batch[position + 1:]:
+                        self._requeue(rest_type, rest_id, rest_fields)
+                    running = False
+                    break
+        log_info(logger, f"Worker {self.consumer} finished: processed={self.processed}, failed={self.failed}")
+        return {"processed": self.processed, "failed": self.failed}
@@ -0,0 +1,100 @@
+import sys
+import os
+import json
+import time
+import threading
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import date
+from sqlalchemy.sql import text
+
+from config.db_connection import get_redis_connection, SessionLocal
+from utils.logging_utils import setup_logger, log_info, log_error
+
+# Setup logger for league metadata
+logger = setup_logger("league_cache_utils")
+
+# Global Redis connection
+redis_client = get_redis_connection()
+
+# Hash league_id -> {"current_season", "start_date", "end_date"} współdzielony przez procesy
+LEAGUE_META_KEY = "leagues_meta"
+LEAGUE_META_TTL = int(os.getenv("LEAGUE_META_TTL", 3600))
+# Jak długo proces korzysta z własnej kopii bez zaglądania do Redis
+LOCAL_TTL = int(os.getenv("LEAGUE_META_LOCAL_TTL", 300))
+
+_leagues = {}
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+def _parse_entry(raw: str) -> dict:
+    entry = json.loads(raw)
+    for field in ("start_date", "end_date"):
+        if entry.get(field):
+            entry[field] = date.fromisoformat(entry[field])
+    return entry
+
+def _load_from_db() -> dict:
+    """Jedno zapytanie o metadane wszystkich lig; wynik trafia też do hasha Redis."""
+    query = text("SELECT league_id, current_season, start_date, end_date FROM leagues")
+    with SessionLocal() as session:
+        rows = session.execute(query).fetchall()
+
+    leagues = {
+        int(row[0]): {"current_season": row[1], "start_date": row[2], "end_date": row[3]}
+        for row in rows
+    }
+    if leagues:
+        mapping = {
+            league_id: json.dumps({
+                "current_season": entry["current_season"],
+                "start_date": entry["start_date"].isoformat() if entry["start_date"] else None,
+                "end_date": entry["end_date"].isoformat() if entry["end_date"] else None,
+            })
+            for league_id, entry in leagues.items()
+        }
+        pipeline = redis_client.pipeline()
+        pipeline.delete(LEAGUE_META_KEY)
+        pipeline.hset(LEAGUE_META_KEY, mapping=mapping)
+        pipeline.expire(LEAGUE_META_KEY, LEAGUE_META_TTL)
+        pipeline.execute()
+    log_info(logger, f"League metadata loaded from database: {len(leagues)} leagues.")
+    return leagues
+
+def load_league_metadata(force: bool = False) -> dict:
+    """
+    Zwraca league_id -> {"current_season", "start_date", "end_date"}.
+    Kolejność: kopia w procesie (LOCAL_TTL) -> hash Redis `leagues_meta` (LEAGUE_META_TTL) -> tabela leagues.
+    """
+    global _leagues, _loaded_at
+    if not force and _leagues and time.monotonic() - _loaded_at < LOCAL_TTL:
+        return _leagues
+
+    with _lock:
+        if not force and _leagues and time.monotonic() - _loaded_at < LOCAL_TTL:
+            return _leagues
+        cached = {} if force else redis_client.hgetall(LEAGUE_META_KEY)
+        if cached:
+            leagues = {int(league_id): _parse_entry(raw) for league_id, raw in cached.items()}
+        else:
+            leagues = _load_from_db()
+        _leagues, _loaded_at = leagues, time.monotonic()
+        return _leagues
+
+def invalidate_league_metadata():
+    """Wywoływane po zapisie tabeli leagues - kolejne odczyty wczytają świeże dane z bazy."""
+    global _leagues, _loaded_at
+    with _lock:
+        _leagues, _loaded_at = {}, 0.0
+        try:
+            redis_client.delete(LEAGUE_META_KEY)
+        except Exception as e:
+            log_error(logger, f"Error invalidating league metadata: {e}")
+
+def get_league_metadata(league_id: int):
+    """Metadane jednej ligi (None, jeśli liga nie istnieje w tabeli leagues)."""
+    if league_id is None:
+        return None
+    return load_league_metadata().get(int(league_id))
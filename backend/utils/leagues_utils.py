@@ -1,7 +1,6 @@
 import sys
 import os
 import json
-import pandas as pd
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -14,6 +13,7 @@ from api.api_requests import get_data
 from utils.progress_utils import create_progress_bar
 from config.db_connection import get_redis_connection, SessionLocal
 from utils.logging_utils import setup_logger, log_error, log_info
+from utils.league_cache_utils import invalidate_league_metadata
 
 # Setup logger for notifications
 logger = setup_logger("leagues_utils")
@@ -75,7 +75,8 @@ def fetch_and_insert_leagues():
     # Remove invalid entries
     processed_leagues = [league for league in processed_leagues if league]
 
-    # Convert to DataFrame
+    # Convert to DataFrame (pandas ładowany dopiero tutaj - import modułu go nie wymaga)
+    import pandas as pd
     df = pd.DataFrame(processed_leagues)
 
     # Manual cleaning and validation
@@ -125,6 +126,7 @@ def fetch_and_insert_leagues():
             result = session.execute(query, rows)
             session.commit()
             rows_affected = result.rowcount
+            invalidate_league_metadata()
             log_info(logger, f"{rows_affected} rows actually inserted/updated in the database.")
             if rows_affected == 0:
                 log_info(logger, "No changes detected. The database is up-to-date.")
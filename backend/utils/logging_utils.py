@@ -1,22 +1,19 @@
 import logging
 import os
 from datetime import datetime
-from dotenv import load_dotenv
 from logging.handlers import MemoryHandler
 
-# Load environment variables from .env file
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.env'))
-if not os.path.exists(env_path):
-    raise FileNotFoundError(f".env file not found at: {env_path}")
-load_dotenv(env_path)
+from config.settings import load_env
+
+# Load environment variables from .env file (once per process)
+load_env()
 
 # Pobranie poziomu logowania z ENV (domyślnie WARNING)
 log_level = os.getenv("LOG_LEVEL", "WARNING").upper()
 log_level_numeric = getattr(logging, log_level, logging.INFO)
 
-# Ensure the logs directory exists
+# Katalog logów tworzony dopiero przy pierwszym zapisie (DelayedFileHandler)
 LOGS_DIR = os.path.join(os.path.dirname(__file__), '..', 'logs')
-os.makedirs(LOGS_DIR, exist_ok=True)
 
 class DelayedFileHandler(logging.Handler):
     """
@@ -29,7 +26,8 @@ class DelayedFileHandler(logging.Handler):
 
     def emit(self, record):
         if not self.file_handler:
-            # Twórz FileHandler dopiero przy pierwszym logu
+            # Twórz katalog i FileHandler dopiero przy pierwszym logu
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
             self.file_handler = logging.FileHandler(self.filename)
             self.file_handler.setFormatter(self.formatter)  # Użyj tego samego formattera
             self.file_handler.setLevel(self.level)
@@ -7,14 +7,16 @@ import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.sql import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from api.api_requests import get_data
 from config.db_connection import get_redis_connection, SessionLocal
 from utils.logging_utils import setup_logger, log_error, log_info, log_warning
-from utils.players_utils import fetch_and_insert_player
+from utils.players_utils import fetch_and_insert_player, fetch_and_insert_players
 from utils.progress_utils import create_progress_bar
+from utils.cache_utils import cache_get_many, cache_set_many
 
 # Setup logger for match events
 logger = setup_logger("match_events_utils")
@@ -22,18 +24,39 @@ logger = setup_logger("match_events_utils")
 # Global Redis connection
 redis_client = get_redis_connection()
 cache_ttl = 15552000
+EVENTS_CACHE_PREFIX = "match_events"
 
 VALID_EVENT_TYPES = {'goal','yellow_card','second_yellow_card','red_card','penalty_goal'}
+# Liczba zdarzeń w jednym wielowierszowym INSERT
+EVENTS_CHUNK_SIZE = 1000
+
+def get_valid_season(player_id: int, fallback_season: int = None):
+    """
+    Determine the most recent valid season of a player.
+    The result is kept in Redis (`player_season:{player_id}`, long TTL), so the API
+    is probed season by season only once per player - and not at all when a fallback is given.
+    """
+    season_key = f"player_season:{player_id}"
+    cached_season = redis_client.get(season_key)
+    if cached_season:
+        return int(cached_season)
+    if fallback_season is not None:
+        return fallback_season
 
-def get_valid_season(player_id: int):
-    """Determine the most recent valid season by checking API responses."""
     current_year = datetime.datetime.now().year
     for year in range(current_year, current_year - 10, -1):
         response = get_data("players", params={"id": player_id, "season": year})
         if response and 'response' in response and response['response']:
+            redis_client.setex(season_key, cache_ttl, year)
             return year
     return current_year  # Fallback to the current year if nothing is found
 
+def remember_player_seasons(player_ids, season: int):
+    """Zapisuje sezon dla zawodników ze składu drużyny (pipeline, jedno przejście do Redis)."""
+    if not player_ids or season is None:
+        return
+    cache_set_many("player_season", dict.fromkeys(player_ids, season), cache_ttl)
+
 def player_exists(session: SessionLocal, player_id: int) -> bool:
     """Check if player_id exists in the players table."""
     if player_id is None:
@@ -43,133 +66,267 @@ def player_exists(session: SessionLocal, player_id: int) -> bool:
                              {"player_id": player_id}).fetchone()
     return result is not None
 
-def fetch_match_events(match_id: int) -> List[Dict]:
-    """Fetch match events (goals, cards, substitutions) from the API."""
-    endpoint = "fixtures/events"
-    redis_key = f"match_events:{match_id}"
+def get_existing_player_ids(session: SessionLocal, player_ids) -> set:
+    """Return the subset of player_ids present in the players table (single IN query)."""
+    player_ids = [player_id for player_id in player_ids if player_id]
+    if not player_ids:
+        return set()
+    result = session.execute(text("SELECT player_id FROM players WHERE player_id IN :player_ids"),
+                             {"player_ids": tuple(player_ids)}).fetchall()
+    return {row[0] for row in result}
 
-    if (cached_data := redis_client.get(redis_key)):
-        log_info(logger, f"Match events for match ID {match_id} retrieved from Redis.")
-        return json.loads(cached_data)
+def get_fixture_seasons(match_ids: List[int]) -> Dict[int, int]:
+    """
+    Sezony meczów: z cache `match:{id}` (league.season, jeden MGET), a dla pozostałych
+    z daty meczu w bazie (jedno zapytanie IN). Mecze bez sezonu nie trafiają do wyniku.
+    """
+    seasons = {}
+    for match_id, match in cache_get_many("match", match_ids).items():
+        season = match.get('league', {}).get('season') if isinstance(match, dict) else None
+        if season:
+            seasons[match_id] = season
+
+    missing_ids = [match_id for match_id in match_ids if match_id not in seasons]
+    if missing_ids:
+        with SessionLocal() as session:
+            rows = session.execute(text("SELECT match_id, date FROM matches WHERE match_id IN :match_ids"),
+                                   {"match_ids": tuple(missing_ids)}).fetchall()
+        for match_id, match_date in rows:
+            if match_date:
+                seasons[match_id] = match_date.year if match_date.month >= 7 else match_date.year - 1
+    return seasons
+
+def get_fixture_season(match_id: int):
+    """Sezon meczu: z cache `match:{id}` (league.season), a w drugiej kolejności z daty meczu w bazie."""
+    return get_fixture_seasons([match_id]).get(match_id)
+
+def resolve_event_players(matches: List[tuple]) -> set:
+    """
+    Resolve all players referenced by events of a batch of matches.
+    `matches` is a list of (match_id, season, events). Known players are found with one IN query;
+    for the rest one roster fetch per (team, season) is made, and only players still missing
+    after that are fetched individually (with the fixture season - no season probing).
+    Returns the set of player IDs present in the players table.
+    """
+    references = {}
+    for _, season, events in matches:
+        for event in events or []:
+            # Zawodnicy potrzebni są tylko dla zdarzeń zapisywanych w bazie (gole i kartki)
+            if (event.get('type') or '').lower() not in ('goal', 'card'):
+                continue
+            team_id = event.get('team', {}).get('id')
+            for player_id in (event.get('player', {}).get('id'), (event.get('assist') or {}).get('id')):
+                if player_id:
+                    references.setdefault(player_id, (team_id, season))
+    if not references:
+        return set()
+
+    with SessionLocal() as session:
+        existing = get_existing_player_ids(session, references)
+    missing = {player_id: reference for player_id, reference in references.items() if player_id not in existing}
+    if not missing:
+        return existing
+
+    rosters = {reference for reference in missing.values() if reference[0] and reference[1]}
+    log_info(logger, f"Resolving {len(missing)} missing players with {len(rosters)} roster fetches.")
+    for team_id, season in rosters:
+        roster_ids = fetch_and_insert_players(team_id, season)
+        remember_player_seasons(roster_ids, season)
+
+    with SessionLocal() as session:
+        existing |= get_existing_player_ids(session, missing)
 
+    for player_id, (_, season) in missing.items():
+        if player_id in existing:
+            continue
+        fetch_and_insert_player(player_id, get_valid_season(player_id, fallback_season=season))
+        with SessionLocal() as session:
+            if player_exists(session, player_id):
+                existing.add(player_id)
+    return existing
+
+def _fetch_events_from_api(match_id: int) -> List[Dict]:
+    """Match events straight from the API (no cache); empty list when there is no data."""
     try:
-        response = get_data(endpoint, params={"fixture": match_id})
+        response = get_data("fixtures/events", params={"fixture": match_id})
         if not response or 'response' not in response or not isinstance(response['response'], list):
             log_warning(logger, f"Unexpected API response structure for match ID {match_id}: {response}")
             return []
-        match_events = response['response']
-
-        # Cache in Redis
-        try:
-            if match_events:
-                redis_client.setex(redis_key, cache_ttl, json.dumps(match_events))
-                log_info(logger, f"Match events for match ID {match_id} cached in Redis.")
-        except Exception as e:
-            log_error(logger, f"Error saving match events to Redis for match ID {match_id}: {str(e)}")
-
-        return match_events
+        return response['response']
     except Exception as e:
         log_error(logger, f"Error fetching match events for match ID {match_id}: {str(e)}")
         return []
 
-def parse_match_events(match_id: int, response: List[Dict]) -> List[Dict]:
-    """Parse match events response for database insertion."""
+def fetch_match_events(match_id: int) -> List[Dict]:
+    """Fetch match events (goals, cards, substitutions) from the API."""
+    redis_key = f"{EVENTS_CACHE_PREFIX}:{match_id}"
+
+    if (cached_data := redis_client.get(redis_key)):
+        log_info(logger, f"Match events for match ID {match_id} retrieved from Redis.")
+        return json.loads(cached_data)
+
+    match_events = _fetch_events_from_api(match_id)
+
+    # Cache in Redis
+    try:
+        if match_events:
+            redis_client.setex(redis_key, cache_ttl, json.dumps(match_events))
+            log_info(logger, f"Match events for match ID {match_id} cached in Redis.")
+    except Exception as e:
+        log_error(logger, f"Error saving match events to Redis for match ID {match_id}: {str(e)}")
+    return match_events
+
+def load_match_events(match_ids: List[int], max_workers=4) -> Dict[int, List[Dict]]:
+    """
+    Events of many matches: cache hits with one MGET (cache_get_many), missing matches fetched
+    concurrently from the API and cached with one pipeline. Returns match_id -> events.
+    """
+    match_events = cache_get_many(EVENTS_CACHE_PREFIX, match_ids)
+    missing_ids = [match_id for match_id in match_ids if match_id not in match_events]
+    if missing_ids:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = dict(zip(missing_ids, executor.map(_fetch_events_from_api, missing_ids)))
+        match_events.update(fetched)
+        cache_set_many(EVENTS_CACHE_PREFIX, {match_id: events for match_id, events in fetched.items() if events}, cache_ttl)
+    return match_events
+
+def parse_match_events(match_id: int, response: List[Dict], known_players: set = None) -> List[Dict]:
+    """
+    Parse match events response for database insertion.
+    `known_players` comes from resolve_event_players (batch mode); without it players are resolved for this match only.
+    """
     if not response:
         log_warning(logger, f"No event data to parse for match ID {match_id}. Skipping.")
         return []
 
+    if known_players is None:
+        known_players = resolve_event_players([(match_id, get_fixture_season(match_id), response)])
+
     events = []
-    with SessionLocal() as session:
-        for event in response:
-            team_id = event.get('team', {}).get('id')
-            player_id = event.get('player', {}).get('id')
-            assist_player_id = event.get('assist', {}).get('id')
-            event_type = event.get('type').lower()
-            event_detail = event.get('detail', '') or ''
-            event_time = event.get('time', {}).get('elapsed')
-            extra_time = event.get('time', {}).get('extra')
-            is_penalty = 1 if event_detail and "Penalty" in event_detail else 0
-
-            if event_time is not None and event_time < 0:
-                log_info(logger, f"Invalid event_time ({event_time}) detected for match {match_id}. Setting to 0.")
-                event_time = 0
-
-            if extra_time is not None and extra_time < 0:
-                log_info(logger, f"Invalid extra_time ({extra_time}) detected for match {match_id}. Setting to NULL.")
-                extra_time = None  # Ustawiamy na NULL zamiast ujemnej wartości
-
-            if player_id and not player_exists(session, player_id):
-                season = get_valid_season(player_id)
-                fetch_and_insert_player(player_id, season)
-                if not player_exists(session, player_id):
-                    log_warning(logger, f"Player {player_id} not found even after insertion. Setting to NULL.")
-                    player_id = None  # Ustawiamy NULL zamiast pomijać event
-
-            if assist_player_id and not player_exists(session, assist_player_id):
-                season = get_valid_season(assist_player_id)
-                fetch_and_insert_player(assist_player_id, season)
-                if not player_exists(session, assist_player_id):
-                    log_warning(logger, f"Assist player {assist_player_id} not found even after insertion. Setting to NULL.")
-                    assist_player_id = None  # Ustawiamy NULL zamiast pomijać event
-
-            # Convert event_type to match database ENUM values
-            if event_type == "goal" and is_penalty:
-                event_type = "penalty_goal"
-            elif event_type == "card":
-                if "Yellow Card" in event_detail:
-                    event_type = "yellow_card"
-                elif "Red Card" in event_detail:
-                    event_type = "red_card"
-                elif "Second Yellow Card" in event_detail:
-                    event_type = "second_yellow_card"
-                else:
-                    log_warning(logger, f"Unknown card type: {event_detail}")
-                    continue
-
-            if event_type not in VALID_EVENT_TYPES:
-                log_info(logger, f"Invalid event_type detected: {event_type}. Skipping event.")
+    # Numer kolejny zdarzeń o tym samym kluczu naturalnym - ten sam przy każdym ponownym przetworzeniu
+    key_counts = {}
+    for event in response:
+        team_id = event.get('team', {}).get('id')
+        player_id = event.get('player', {}).get('id')
+        # Surowe ID z API - część klucza naturalnego, niezależna od tego, czy zawodnik jest w tabeli players
+        api_player_id = player_id
+        assist_player_id = event.get('assist', {}).get('id')
+        event_type = event.get('type').lower()
+        event_detail = event.get('detail', '') or ''
+        event_time = event.get('time', {}).get('elapsed')
+        extra_time = event.get('time', {}).get('extra')
+        is_penalty = 1 if event_detail and "Penalty" in event_detail else 0
+
+        if event_time is not None and event_time < 0:
+            log_info(logger, f"Invalid event_time ({event_time}) detected for match {match_id}. Setting to 0.")
+            event_time = 0
+
+        if extra_time is not None and extra_time < 0:
+            log_info(logger, f"Invalid extra_time ({extra_time}) detected for match {match_id}. Setting to NULL.")
+            extra_time = None  # Ustawiamy na NULL zamiast ujemnej wartości
+
+        # Convert event_type to match database ENUM values
+        if event_type == "goal" and is_penalty:
+            event_type = "penalty_goal"
+        elif event_type == "card":
+            if "Yellow Card" in event_detail:
+                event_type = "yellow_card"
+            elif "Red Card" in event_detail:
+                event_type = "red_card"
+            elif "Second Yellow Card" in event_detail:
+                event_type = "second_yellow_card"
+            else:
+                log_warning(logger, f"Unknown card type: {event_detail}")
                 continue
 
-            events.append({
-                "match_id": match_id,
-                "team_id": team_id,
-                "player_id": player_id,
-                "assist_player_id": assist_player_id,
-                "event_type": event_type,
-                "event_time": event_time,
-                "extra_time": extra_time,
-                "event_detail": event_detail,
-                "is_penalty": is_penalty,
-            })
+        if event_type not in VALID_EVENT_TYPES:
+            log_info(logger, f"Invalid event_type detected: {event_type}. Skipping event.")
+            continue
+
+        if player_id and player_id not in known_players:
+            log_warning(logger, f"Player {player_id} not found even after insertion. Setting to NULL.")
+            player_id = None  # Ustawiamy NULL zamiast pomijać event
+
+        if assist_player_id and assist_player_id not in known_players:
+            log_warning(logger, f"Assist player {assist_player_id} not found even after insertion. Setting to NULL.")
+            assist_player_id = None  # Ustawiamy NULL zamiast pomijać event
+
+        event_key = (team_id, api_player_id or 0, event_type, event_time, extra_time or 0)
+        event_seq = key_counts.get(event_key, 0)
+        key_counts[event_key] = event_seq + 1
+
+        events.append({
+            "match_id": match_id,
+            "team_id": team_id,
+            "player_id": player_id,
+            "api_player_id": api_player_id,
+            "assist_player_id": assist_player_id,
+            "event_type": event_type,
+            "event_time": event_time,
+            "extra_time": extra_time,
+            "event_detail": event_detail,
+            "is_penalty": is_penalty,
+            "event_seq": event_seq,
+        })
     return events
 
 def insert_match_events_to_db(events: List[Dict]):
-    """Insert parsed match events into the database."""
+    """
+    Insert parsed match events into the database.
+    Idempotent: the unique key (match, team, API player id, type, minute, extra time, event_seq) makes a re-run
+    update existing rows (including a player resolved since) instead of adding duplicates. Events of many matches go in one statement per chunk.
+    Returns False when the insert failed.
+    """
     if not events:
-        return log_warning(logger, "No match events to insert into the database.")
+        log_warning(logger, "No match events to insert into the database.")
+        return True
 
     query = text("""
         INSERT INTO match_events (
-            match_id, team_id, player_id, assist_player_id, event_type, event_time, extra_time, event_detail, is_penalty
+            match_id, team_id, player_id, api_player_id, assist_player_id, event_type, event_time, extra_time, event_detail, is_penalty, event_seq
         ) VALUES (
-            :match_id, :team_id, :player_id, :assist_player_id, :event_type, :event_time, :extra_time, :event_detail, :is_penalty
+            :match_id, :team_id, :player_id, :api_player_id, :assist_player_id, :event_type, :event_time, :extra_time, :event_detail, :is_penalty, :event_seq
         )
         ON DUPLICATE KEY UPDATE
-            event_type = VALUES(event_type),
-            event_time = VALUES(event_time),
-            extra_time = VALUES(extra_time),
+            player_id = VALUES(player_id),
+            assist_player_id = VALUES(assist_player_id),
             event_detail = VALUES(event_detail),
             is_penalty = VALUES(is_penalty);
     """)
 
+    rows = [dict(row) for row in events]
     try:
         with SessionLocal() as session:
-            session.execute(query, [dict(row) for row in events])
+            for i in range(0, len(rows), EVENTS_CHUNK_SIZE):
+                session.execute(query, rows[i:i + EVENTS_CHUNK_SIZE])
             session.commit()
             log_info(logger, f"Successfully inserted/updated {len(events)} match events.")
+        return True
     except SQLAlchemyError as e:
         log_error(logger, f"Error inserting match events into database: {e}")
-        session.rollback()
+        return False
+
+def process_match_events_batch(match_seasons: Dict[int, int]):
+    """
+    Fetch, parse and insert events for a batch of matches.
+    `match_seasons` maps match_id to its season (None - season taken from the fixture).
+    Players of all matches are resolved together, so every team roster is fetched at most once.
+    """
+    if not match_seasons:
+        return
+    match_events = load_match_events(list(match_seasons))
+    fixture_seasons = get_fixture_seasons([match_id for match_id, season in match_seasons.items() if season is None])
+
+    batch = [
+        (match_id, season if season is not None else fixture_seasons.get(match_id), match_events.get(match_id))
+        for match_id, season in match_seasons.items()
+    ]
+    known_players = resolve_event_players(batch)
+
+    parsed_events = []
+    for match_id, _, events in batch:
+        parsed_events.extend(parse_match_events(match_id, events, known_players))
+    insert_match_events_to_db(parsed_events)
 
 def run_all_proccess_event_match_with_progress_bar(match_id: int):
     total_steps = 3  # Total number of steps in the ETL process
@@ -184,10 +341,14 @@ def run_all_proccess_event_match_with_progress_bar(match_id: int):
     except Exception as e:
         log_error(logger, f"Unexpected error while processing match {match_id}: {str(e)}")
 
-def run_all_proccess_event_match(match_id: int):
+def run_all_proccess_event_match(match_id: int) -> bool:
+    """Zdarzenia jednego meczu: pobranie, parsowanie i zapis. Zwraca False, gdy brak zdarzeń albo zapis się nie udał."""
     try:
         events_data = fetch_match_events(match_id)
+        if not events_data:
+            return False
         parsed_events = parse_match_events(match_id, events_data)
-        insert_match_events_to_db(parsed_events)
+        return insert_match_events_to_db(parsed_events)
     except ValueError:
-        log_error(logger, "Invalid input. Please provide a numeric value for Match ID.")
\ No newline at end of file
+        log_error(logger, "Invalid input. Please provide a numeric value for Match ID.")
+        return False
\ No newline at end of file
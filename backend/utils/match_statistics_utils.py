@@ -6,12 +6,16 @@ import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from sqlalchemy.sql import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from api.api_requests import get_data
 from config.db_connection import get_redis_connection, SessionLocal
 from utils.logging_utils import setup_logger, log_error, log_info, log_warning
+from utils.progress_utils import create_progress_bar
+from utils.checkpoint_utils import DailyLimitReached
+from utils.cache_utils import CACHE_BATCH_SIZE, cache_get_many, cache_set_many
 
 # Setup logger for notifications
 logger = setup_logger("match_statitics_utils")
@@ -19,6 +23,11 @@ logger = setup_logger("match_statitics_utils")
 # Global Redis connection
 redis_client = get_redis_connection()
 cache_ttl = 15552000
+STATISTICS_CACHE_PREFIX = "match_statistics"
+
+# Rozmiar paczek: lista ID w zapytaniu IN oraz wiersze w jednym INSERT
+ID_CHUNK_SIZE = 1000
+INSERT_CHUNK_SIZE = 500
 
 def parse_percentage(value: str) -> float:
     if not value or value in ["-", "N/A"]:
@@ -28,32 +37,55 @@ def parse_percentage(value: str) -> float:
     except ValueError:
         return 0.0
 
+def _fetch_statistics_from_api(match_id: int) -> List[Dict]:
+    """Statystyki meczu prosto z API (bez cache); pusta lista, gdy brak danych."""
+    try:
+        response = get_data("fixtures/statistics", params={"fixture": match_id})
+        if not response or 'response' not in response or not response['response']:
+            log_warning(logger, f"Unexpected API response structure for match ID {match_id}: {response}")
+            return []
+        return response['response']
+    except Exception as e:
+        log_error(logger, f"Error fetching detailed statistics for match ID {match_id}: {str(e)}")
+        return []
+
 def fetch_match_statistics(match_id: int) -> List[Dict]:
     """Fetch detailed match statistics from the API."""
 
-    endpoint = "fixtures/statistics"
-    redis_key = f"match_statistics:{match_id}"
+    redis_key = f"{STATISTICS_CACHE_PREFIX}:{match_id}"
     if (cached_data := redis_client.get(redis_key)):
         log_info(logger, f"Match statistics for match ID {match_id} retrieved from Redis.")
         return json.loads(cached_data)
+
+    match_stats = _fetch_statistics_from_api(match_id)
+     # Zapis do Redis tylko jeśli mamy poprawne dane
     try:
-        response = get_data(endpoint, params={"fixture": match_id})
-        if not response or 'response' not in response or not response['response']:
-            log_warning(logger, f"Unexpected API response structure for match ID {match_id}: {response}")
-            return []
-        match_stats = response['response']
-         # Zapis do Redis tylko jeśli mamy poprawne dane
-        try:
-            if match_stats:
-                redis_client.setex(redis_key, cache_ttl, json.dumps(match_stats))
-                log_info(logger, f"Match statistics for match ID {match_id} cached in Redis.")
-        except Exception as e:
-            log_error(logger, f"Error saving match statistics to Redis for match ID {match_id}: {str(e)}")
-
-        return match_stats
+        if match_stats:
+            redis_client.setex(redis_key, cache_ttl, json.dumps(match_stats))
+            log_info(logger, f"Match statistics for match ID {match_id} cached in Redis.")
     except Exception as e:
-        log_error(logger, f"Error fetching detailed statistics for match ID {match_id}: {str(e)}")
-        return []
+        log_error(logger, f"Error saving match statistics to Redis for match ID {match_id}: {str(e)}")
+    return match_stats
+
+def prefetch_match_statistics(match_ids: List[int], max_workers=8) -> Dict[int, List[Dict]]:
+    """
+    Pobiera statystyki wielu meczów naraz: trafienia z cache Redis (cache_get_many - MGET),
+    brakujące mecze współbieżnie z API, a wyniki zapisuje w cache jednym pipeline'em.
+    Zwraca słownik match_id -> statystyki (pusta lista, gdy brak danych).
+    """
+    match_ids = list(dict.fromkeys(match_id for match_id in match_ids if match_id))
+    if not match_ids:
+        return {}
+
+    statistics = cache_get_many(STATISTICS_CACHE_PREFIX, match_ids)
+    missing_ids = [match_id for match_id in match_ids if match_id not in statistics]
+    log_info(logger, f"Match statistics prefetch: {len(statistics)} cache hits, {len(missing_ids)} to fetch.")
+    if missing_ids:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = dict(zip(missing_ids, executor.map(_fetch_statistics_from_api, missing_ids)))
+        statistics.update(fetched)
+        cache_set_many(STATISTICS_CACHE_PREFIX, {match_id: stats for match_id, stats in fetched.items() if stats}, cache_ttl)
+    return statistics
 
 def parse_match_statistics(match_id: int, response: List[Dict]) -> List[Dict]:
     """Parse match statistics response for database insertion."""
@@ -101,11 +133,12 @@ def parse_match_statistics(match_id: int, response: List[Dict]) -> List[Dict]:
         })
     return statistics
 
-def insert_match_statistics_to_db(statistics: List[Dict]):
-    """Insert parsed match statistics into the database."""
+def insert_match_statistics_to_db(statistics: List[Dict]) -> bool:
+    """Insert parsed match statistics into the database. Returns False when the insert failed."""
 
     if not statistics:
-        return log_warning(logger, "No statistics to insert into the database.")
+        log_warning(logger, "No statistics to insert into the database.")
+        return True
 
     query = text("""
         INSERT INTO match_statistics (
@@ -137,6 +170,117 @@ def insert_match_statistics_to_db(statistics: List[Dict]):
             session.execute(query, [dict(row) for row in statistics])
             session.commit()
             log_info(logger, f"Successfully inserted/updated {len(statistics)} match statistics.")
+        return True
     except SQLAlchemyError as e:
-        session.rollback()
-        log_error(logger, f"Error inserting match statistics into database: {e}")
\ No newline at end of file
+        log_error(logger, f"Error inserting match statistics into database: {e}")
+        return False
+
+def filter_fixtures_without_statistics(fixture_ids: List[int]) -> List[int]:
+    """
+    Zostawia tylko mecze obecne w tabeli `matches`, które nie mają jeszcze statystyk
+    (anti-join z match_statistics). Kolejność wejściowa jest zachowana.
+    """
+    fixture_ids = list(dict.fromkeys(fixture_ids))
+    if not fixture_ids:
+        return []
+
+    query = text("""
+        SELECT m.match_id
+        FROM matches m
+        LEFT JOIN match_statistics s ON s.match_id = m.match_id
+        WHERE m.match_id IN :fixture_ids AND s.match_id IS NULL
+    """)
+    todo = set()
+    try:
+        with SessionLocal() as session:
+            for i in range(0, len(fixture_ids), ID_CHUNK_SIZE):
+                chunk = tuple(fixture_ids[i:i + ID_CHUNK_SIZE])
+                todo.update(row[0] for row in session.execute(query, {"fixture_ids": chunk}).fetchall())
+    except SQLAlchemyError as e:
+        log_error(logger, f"Error filtering fixtures without statistics: {e}")
+        return []
+    log_info(logger, f"Fixtures needing statistics: {len(todo)}/{len(fixture_ids)}")
+    return [fixture_id for fixture_id in fixture_ids if fixture_id in todo]
+
+def backfill_match_statistics(fixture_ids: List[int], checkpoint=None, max_workers=10, desc="Procesowanie statystyk...") -> int:
+    """
+    Pobiera statystyki meczów współbieżnie i zapisuje wiersze zbiorczo (INSERT w paczkach po INSERT_CHUNK_SIZE
+    wierszy, w trakcie pobierania). Trafienia w cache czytane są naraz (MGET), z API pobierane są tylko braki,
+    a pobrane statystyki trafiają do cache pipeline'em w paczkach po CACHE_BATCH_SIZE, na bieżąco. Z `checkpoint` (StageCheckpoint) mecz jest
+    oznaczany jako done dopiero po commicie paczki z jego wierszami - nieudany zapis oznacza mecze jako failed.
+    Po wyczerpaniu dziennego limitu API pozostałe zadania są anulowane, a zebrane wiersze i tak trafiają do bazy.
+    Zwraca liczbę zapisanych wierszy.
+    """
+    if not fixture_ids:
+        log_info(logger, "No matches to process.")
+        return 0
+
+    saved_rows = 0
+    pending_rows = []
+    pending_ids = []
+    fetched = {}
+
+    def flush():
+        nonlocal saved_rows
+        if not pending_ids:
+            return
+        inserted = insert_match_statistics_to_db(pending_rows)
+        if inserted:
+            saved_rows += len(pending_rows)
+        if checkpoint is not None:
+            for fixture_id in pending_ids:
+                if inserted:
+                    checkpoint.mark_done(fixture_id)
+                else:
+                    checkpoint.mark_failed(fixture_id, "match_statistics insert failed")
+        pending_rows.clear()
+        pending_ids.clear()
+
+    def collect(fixture_id, statistics):
+        # Wiersze meczu trafiają do jednej paczki, więc mecz jest zapisany w całości albo wcale
+        pending_rows.extend(parse_match_statistics(fixture_id, statistics) if statistics else [])
+        pending_ids.append(fixture_id)
+        if len(pending_rows) >= INSERT_CHUNK_SIZE:
+            flush()
+
+    with create_progress_bar(len(fixture_ids), desc, " matches") as pbar:
+        cached = cache_get_many(STATISTICS_CACHE_PREFIX, fixture_ids)
+        for fixture_id, statistics in cached.items():
+            collect(fixture_id, statistics)
+        pbar.update(len(cached))
+
+        missing_ids = [fixture_id for fixture_id in fixture_ids if fixture_id not in cached]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if checkpoint is not None:
+                futures = {executor.submit(checkpoint.run_item, fixture_id, _fetch_statistics_from_api, complete=False): fixture_id
+                           for fixture_id in missing_ids}
+            else:
+                futures = {executor.submit(_fetch_statistics_from_api, fixture_id): fixture_id for fixture_id in missing_ids}
+
+            for future in as_completed(futures):
+                fixture_id = futures[future]
+                try:
+                    if future.cancelled():
+                        continue
+                    statistics = future.result()
+                    # None - run_item oznaczył mecz jako failed, nie ma czego zapisywać
+                    if statistics is None:
+                        continue
+                    if statistics:
+                        fetched[fixture_id] = statistics
+                        if len(fetched) >= CACHE_BATCH_SIZE:
+                            cache_set_many(STATISTICS_CACHE_PREFIX, fetched, cache_ttl)
+                            fetched.clear()
+                    collect(fixture_id, statistics)
+                except DailyLimitReached as e:
+                    log_warning(logger, f"{e} Anulowanie pozostałych zadań.")
+                    for pending in futures:
+                        pending.cancel()
+                except Exception as e:
+                    log_error(logger, f"Error processing match {fixture_id}: {e}")
+                finally:
+                    pbar.update(1)
+
+    cache_set_many(STATISTICS_CACHE_PREFIX, fetched, cache_ttl)
+    flush()
+    return saved_rows
@@ -1,6 +1,5 @@
 import sys
 import os
-import json
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -8,22 +7,23 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from datetime import datetime
 from typing import List, Dict
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import text
 
 from api.api_requests import get_data
-from config.db_connection import get_redis_connection, SessionLocal
+from config.db_connection import SessionLocal
 from utils.progress_utils import create_progress_bar
 from utils.logging_utils import setup_logger, log_error, log_info, log_warning
 from utils.special_football_functions import get_current_season, calculate_match_duration, get_match_result
-from utils.teams_utils import check_missing_teams
+from utils.teams_utils import ensure_teams_exist
+from utils.h2h_utils import batch_match_id_exists
+from utils.shard_utils import is_sharded, shard_condition
+from utils.fixture_utils import load_fixtures
+from utils.cache_utils import cache_get_many, cache_set_many
 
 # Setup logger for notifications
 logger = setup_logger("match_utils")
 
-# Global Redis connection
-redis_client = get_redis_connection()
 cache_ttl = 15552000
 
 def get_unique_matches_ids():
@@ -32,31 +32,71 @@ def get_unique_matches_ids():
         results = session.execute(query).fetchall()
         return [row[0] for row in results]
 
-def get_unique_matches_ids_for_future_matches(home_id, away_id):
-    query = text("""
-    	SELECT match_id
-    	FROM matches
-    	WHERE (home_team_id = :home_id AND away_team_id = :away_id) OR (home_team_id = :away_id AND away_team_id = :home_id)
-    """)
-    with SessionLocal() as session:
-        results = session.execute(query, {"home_id": home_id, "away_id": away_id}).fetchall()
-        return [row[0] for row in results]
-
 def get_unique_fixture_ids():
-    query = text("SELECT DISTINCT fixture_id FROM h2h_matches")
+    params = {}
+    if is_sharded():
+        # Tylko mecze H2H par drużyn z przyszłych meczów lig bieżącego sharda
+        query = text(f"""
+            SELECT DISTINCT h.fixture_id
+            FROM h2h_matches h
+            JOIN future_matches fm
+              ON (h.home_team_id = fm.home_team_id AND h.away_team_id = fm.away_team_id)
+              OR (h.home_team_id = fm.away_team_id AND h.away_team_id = fm.home_team_id)
+            WHERE {shard_condition('fm.league_id', params)}
+        """)
+    else:
+        query = text("SELECT DISTINCT fixture_id FROM h2h_matches")
     with SessionLocal() as session:
-        results = session.execute(query).fetchall()
+        results = session.execute(query, params).fetchall()
         return [row[0] for row in results]
 
-def get_unique_fixture_ids_for_future_matches(home_id, away_id):
-    query = text("""
-    	SELECT fixture_id
-    	FROM h2h_matches
-    	WHERE (home_team_id = :home_id AND away_team_id = :away_id) OR (home_team_id = :away_id AND away_team_id = :home_id)
+# Tabele z historycznymi meczami, dla których szukamy par drużyn z future_matches
+FIXTURE_SOURCES = {
+    "matches": "match_id",
+    "h2h_matches": "fixture_id",
+}
+
+def get_fixture_ids_for_future_pairs(source: str) -> List[Dict]:
+    """
+    Zwraca jednym zapytaniem wszystkie mecze z tabeli `source` (matches / h2h_matches) rozegrane
+    przez pary drużyn z future_matches (w dowolnym układzie gospodarz/gość) - bez duplikatów,
+    posortowane według najbliższego przyszłego meczu pary.
+    Każdy wiersz: fixture_id, future_match_id, team_low_id, team_high_id.
+    """
+    id_column = FIXTURE_SOURCES[source]
+    params = {}
+    condition = shard_condition('fm.league_id', params)
+    query = text(f"""
+        SELECT pairs.fixture_id, MIN(pairs.future_match_id) AS future_match_id,
+               MIN(pairs.team_low_id) AS team_low_id, MIN(pairs.team_high_id) AS team_high_id,
+               MIN(pairs.match_date) AS first_future_date
+        FROM (
+            SELECT m.{id_column} AS fixture_id, fm.match_id AS future_match_id, fm.match_date,
+                   LEAST(fm.home_team_id, fm.away_team_id) AS team_low_id,
+                   GREATEST(fm.home_team_id, fm.away_team_id) AS team_high_id
+            FROM future_matches fm
+            JOIN {source} m ON m.home_team_id = fm.home_team_id AND m.away_team_id = fm.away_team_id
+            WHERE {condition}
+            UNION ALL
+            SELECT m.{id_column}, fm.match_id, fm.match_date,
+                   LEAST(fm.home_team_id, fm.away_team_id), GREATEST(fm.home_team_id, fm.away_team_id)
+            FROM future_matches fm
+            JOIN {source} m ON m.home_team_id = fm.away_team_id AND m.away_team_id = fm.home_team_id
+            WHERE {condition}
+        ) pairs
+        GROUP BY pairs.fixture_id
+        ORDER BY first_future_date, MIN(pairs.future_match_id), pairs.fixture_id
     """)
-    with SessionLocal() as session:
-        results = session.execute(query, {"home_id": home_id, "away_id": away_id}).fetchall()
-        return [row[0] for row in results]
+    try:
+        with SessionLocal() as session:
+            rows = session.execute(query, params).fetchall()
+            return [
+                {"fixture_id": row[0], "future_match_id": row[1], "team_low_id": row[2], "team_high_id": row[3]}
+                for row in rows
+            ]
+    except SQLAlchemyError as e:
+        log_error(logger, f"Error fetching fixtures for future pairs from {source}: {e}")
+        return []
 
 def match_id_exists(match_id):
     query = text("SELECT 1 FROM matches WHERE match_id = :match_id")
@@ -74,12 +114,9 @@ def fetch_matches_for_team(team_id: int, number_of_matches=10) -> List[Dict]:
             return []
 
         if response and 'response' in response:
-            for match in response['response']:
-                redis_key = f"match:{match['fixture']['id']}"
-                if redis_client.get(redis_key):
-                    logger.info(f"Match data for fixture ID {match['fixture']['id']} retrieved from Redis.")
-                    continue
-                redis_client.setex(redis_key, cache_ttl, json.dumps(match))
+            matches = {match['fixture']['id']: match for match in response['response']}
+            cached = cache_get_many("match", matches)
+            cache_set_many("match", {fixture_id: match for fixture_id, match in matches.items() if fixture_id not in cached}, cache_ttl)
             return response['response']
         log_warning(logger, f"No matches found for team ID {team_id}.")
         return []
@@ -88,75 +125,68 @@ def fetch_matches_for_team(team_id: int, number_of_matches=10) -> List[Dict]:
         return []
 
 def fetch_match_from_id(fixture_ids: List[int], max_workers=4) -> List[Dict]:
-    fetched_matches = []
-    tasks = {}
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Tworzymy pasek postępu z całkowitą liczbą zapytań
-        with create_progress_bar(total=len(fixture_ids), desc="Fetching match data", unit="matches") as pbar:
-            for fixture_id in fixture_ids:
-                redis_key = f"match:{fixture_id}"
-                cached_match = redis_client.get(redis_key)
-                if cached_match:
-                    fetched_matches.append(json.loads(cached_match))
-                    pbar.update(1)  # ✅ Aktualizacja progress bara dla cache hit
-                else:
-                    # Dodajemy zadanie do pobrania z API
-                    tasks[executor.submit(get_data, "fixtures", {"id": fixture_id})] = fixture_id
-            # Obsługa pobierania danych z API
-            for future in as_completed(tasks):
-                fixture_id = tasks[future]
-                try:
-                    response = future.result()
-                    if response and 'response' in response and response['response']:
-                        match = response['response'][0]
-                        if match:
-                            redis_client.setex(f"match:{fixture_id}", cache_ttl, json.dumps(match))
-                            fetched_matches.append(match)
-                    else:
-                        log_warning(logger, f"No match found for ID {fixture_id}.")
-                except Exception as e:
-                    log_error(logger, f"Error fetching data for fixture ID {fixture_id}: {e}")
-                finally:
-                    pbar.update(1)  # ✅ Aktualizacja progress bara dla danych z API
-    return fetched_matches
+    """Pobiera mecze po ID: cache `match:{id}` + zbiorcze zapytania `fixtures?ids=` (do 20 ID na zapytanie)."""
+    with create_progress_bar(total=len(set(fixture_ids)), desc="Fetching match data", unit="matches") as pbar:
+        fixtures = load_fixtures(fixture_ids, cache_prefix="match", cache_ttl=cache_ttl, max_workers=max_workers, progress_bar=pbar)
+    return list(fixtures.values())
+
+def resolve_match_teams(matches: List[Dict]) -> set:
+    """
+    Pre-pass przed zapisem meczów: zbiera (drużyna, liga, sezon) z całej paczki
+    i uzupełnia brakujące drużyny (jedno zapytanie, każda liga z brakami pobierana raz).
+    Sezon pochodzi z `league.season` meczu, a przy jego braku z `leagues.current_season`.
+    Zwraca zbiór drużyn obecnych w bazie.
+    """
+    league_seasons = {}
+    team_leagues = {}
+    for match in matches:
+        league = match.get('league', {})
+        league_id = league.get('id')
+        season = league.get('season')
+        if season is None and league_id is not None:
+            if league_id not in league_seasons:
+                league_seasons[league_id] = get_current_season(league_id)
+            season = league_seasons[league_id]
+        for side in ('home', 'away'):
+            team_id = match.get('teams', {}).get(side, {}).get('id')
+            if team_id is not None:
+                team_leagues.setdefault(team_id, (league_id, season))
+    return ensure_teams_exist(team_leagues)
 
 def insert_matches_to_db(matches: List[Dict]):
     rows = []
 
+    valid_matches = []
+    for match in matches:
+        if not match.get('fixture') or not match.get('league') or not match.get('teams'):
+            log_warning(logger, f"Skipping match due to missing data: {match}")
+            continue
+        valid_matches.append(match)
+
+    # ✅ Mecze już obecne w bazie - jedno zapytanie dla całej paczki
+    existing_matches = batch_match_id_exists([match['fixture']['id'] for match in valid_matches])
+    new_matches = [match for match in valid_matches if match['fixture']['id'] not in existing_matches]
+    if existing_matches:
+        log_info(logger, f"{len(existing_matches)} matches already exist in DB. Skipping...")
+
+    existing_teams = resolve_match_teams(new_matches)
+
     # Tworzymy pasek postępu dla przetwarzania meczów
-    with create_progress_bar(total=len(matches), desc="Processing matches", unit="match") as pbar:
-        for match in matches:
-            fixture = match.get('fixture', {})
-            league = match.get('league', {})
-            teams = match.get('teams', {})
+    with create_progress_bar(total=len(new_matches), desc="Processing matches", unit="match") as pbar:
+        for match in new_matches:
+            fixture = match['fixture']
+            league = match['league']
+            teams = match['teams']
             goals = match.get('goals', {})
             score = match.get('score', {})
 
-            if not fixture or not league or not teams:
-                log_warning(logger, f"Skipping match due to missing data: {match}")
-                pbar.update(1)  # ✅ Aktualizacja progress bara
-                continue
-
             match_id = fixture['id']
-
-            # ✅ Sprawdzamy, czy mecz już istnieje w bazie i pomijamy go
-            if match_id_exists(match_id):
-                log_info(logger, f"Match {match_id} already exists in DB. Skipping...")
-                pbar.update(1)  # ✅ Aktualizacja progress bara
-                continue
-
             match_duration = calculate_match_duration(fixture)
             league_id = league['id']
             home_team_id = teams['home']['id']
             away_team_id = teams['away']['id']
-            season = get_current_season(league_id)
-
-            existing_teams, missing_team_ids = check_missing_teams(
-                [home_team_id, away_team_id],
-                league_id=league_id,
-                season=season
-            )
 
+            missing_team_ids = [team_id for team_id in (home_team_id, away_team_id) if team_id not in existing_teams]
             if missing_team_ids:
                 log_error(logger, f"Cannot insert match {fixture['id']}. Missing teams: {missing_team_ids}")
                 pbar.update(1)  # ✅ Aktualizacja progress bara
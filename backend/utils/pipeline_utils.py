@@ -0,0 +1,147 @@
+import sys
+import os
+import time
+import queue
+import threading
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.logging_utils import setup_logger, log_info, log_warning, log_error
+
+# Setup logger for pipelines
+logger = setup_logger("pipeline_utils")
+
+_STOP = object()
+
+# Ile sekund etap wsadowy czeka na kolejne elementy, zanim przetworzy niepełną paczkę
+BATCH_WAIT_SECONDS = 0.5
+
+class StopPipeline(Exception):
+    """Zgłoszony w etapie zatrzymuje cały pipeline (np. po wyczerpaniu dziennego limitu API)."""
+
+class PipelineStage:
+    """
+    Etap pipeline'u: `func` dostaje element (albo listę elementów przy `batch_size > 1`)
+    i zwraca iterowalną kolekcję elementów dla kolejnego etapu (lub None).
+    Etap z `drain_on_stop=True` (np. zapis do bazy) po zatrzymaniu pipeline'u dalej przetwarza
+    to, co już do niego trafiło - pobrane dane nie są tracone.
+    """
+    def __init__(self, name: str, func, workers: int = 1, queue_size: int = 100, batch_size: int = 1, drain_on_stop: bool = False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.drain_on_stop = drain_on_stop
+
+class Pipeline:
+    """
+    Pipeline producent/konsument na wątkach: między etapami są ograniczone kolejki (backpressure),
+    każdy etap ma własną liczbę wątków, więc opóźnienia API i bazy się nakładają,
+    a całość działa w tempie najwolniejszego etapu. Zakończenie propagowane jest sentinelami.
+    """
+    def __init__(self, stages: list, on_error=None, stop_exceptions=(StopPipeline,)):
+        self.stages = stages
+        self.on_error = on_error
+        self.stop_exceptions = stop_exceptions
+        self.queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+        self.stop_event = threading.Event()
+        self.stats = {stage.name: {"items": 0, "errors": 0, "busy_seconds": 0.0} for stage in stages}
+        self._stats_lock = threading.Lock()
+
+    def stop(self):
+        self.stop_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+    def _accepts(self, index: int) -> bool:
+        return not self.stopped or self.stages[index].drain_on_stop
+
+    def _put(self, index: int, item):
+        """Wstawia element do kolejki etapu; po zatrzymaniu pipeline'u elementy są odrzucane (poza etapami drain_on_stop)."""
+        while self._accepts(index):
+            try:
+                self.queues[index].put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _next_batch(self, index: int):
+        """Pobiera paczkę elementów; zwraca (paczka, czy_odebrano_STOP)."""
+        stage, stage_queue = self.stages[index], self.queues[index]
+        item = stage_queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        while len(batch) < stage.batch_size:
+            try:
+                item = stage_queue.get(timeout=BATCH_WAIT_SECONDS)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _worker(self, index: int):
+        stage = self.stages[index]
+        has_next = index + 1 < len(self.stages)
+        while True:
+            batch, got_stop = self._next_batch(index)
+            if batch and self._accepts(index):
+                start = time.perf_counter()
+                try:
+                    outputs = stage.func(batch if stage.batch_size > 1 else batch[0])
+                    if has_next:
+                        for output in outputs or []:
+                            self._put(index + 1, output)
+                except self.stop_exceptions as e:
+                    log_warning(logger, f"[{stage.name}] Zatrzymanie pipeline'u: {e}")
+                    self.stop()
+                except Exception as e:
+                    with self._stats_lock:
+                        self.stats[stage.name]["errors"] += 1
+                    log_error(logger, f"[{stage.name}] Błąd przetwarzania: {e}")
+                    if self.on_error:
+                        self.on_error(stage.name, batch, e)
+                with self._stats_lock:
+                    self.stats[stage.name]["items"] += len(batch)
+                    self.stats[stage.name]["busy_seconds"] += time.perf_counter() - start
+            if got_stop:
+                # Sentinel wraca do kolejki dla pozostałych wątków tego etapu
+                self.queues[index].put(_STOP)
+                return
+
+    def run(self, items) -> dict:
+        """Przepuszcza `items` przez wszystkie etapy i czeka na zakończenie. Zwraca statystyki etapów."""
+        threads = []
+        for index, stage in enumerate(self.stages):
+            stage_threads = [
+                threading.Thread(target=self._worker, args=(index,), name=f"{stage.name}-{i}", daemon=True)
+                for i in range(stage.workers)
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        start = time.perf_counter()
+        for item in items:
+            if self.stopped:
+                break
+            self._put(0, item)
+
+        # Zamykanie etapów po kolei: STOP trafia do etapu dopiero, gdy poprzedni skończył pracę
+        for index, stage_threads in enumerate(threads):
+            self.queues[index].put(_STOP)
+            for thread in stage_threads:
+                thread.join()
+
+        wall = time.perf_counter() - start
+        for name, stats in self.stats.items():
+            stats["busy_seconds"] = round(stats["busy_seconds"], 3)
+            log_info(logger, f"[pipeline] {name}: items={stats['items']} errors={stats['errors']} busy={stats['busy_seconds']}s")
+        log_info(logger, f"[pipeline] wall={wall:.2f}s stopped={self.stopped}")
+        return {"wall_seconds": round(wall, 3), "stopped": self.stopped, "stages": self.stats}
@@ -0,0 +1,128 @@
+import sys
+import os
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from typing import List, Dict
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import text
+
+from config.db_connection import SessionLocal
+from utils.logging_utils import setup_logger, log_error, log_info
+from utils.teams_utils import get_existing_team_ids
+from utils.league_cache_utils import load_league_metadata
+
+# Setup logger for player statistics
+logger = setup_logger("player_statistics_utils")
+
+# Kolumna po pd.json_normalize (blok `statistics` odpowiedzi `players`) -> kolumna tabeli player_statistics
+STATISTICS_COLUMNS = {
+    "player.id": "player_id",
+    "team.id": "team_id",
+    "league.id": "league_id",
+    "league.season": "season",
+    "games.appearences": "appearances",
+    "games.lineups": "lineups",
+    "games.minutes": "minutes_played",
+    "games.position": "position",
+    "games.rating": "rating",
+    "goals.total": "goals_total",
+    "goals.assists": "goals_assists",
+    "shots.total": "shots_total",
+    "shots.on": "shots_on_target",
+    "passes.total": "passes_total",
+    "passes.key": "passes_key",
+    "passes.accuracy": "passes_accuracy",
+    "tackles.total": "tackles_total",
+    "tackles.blocks": "tackles_blocks",
+    "tackles.interceptions": "tackles_interceptions",
+    "duels.total": "duels_total",
+    "duels.won": "duels_won",
+    "dribbles.attempts": "dribbles_attempts",
+    "dribbles.success": "dribbles_success",
+    "fouls.committed": "fouls_committed",
+    "fouls.drawn": "fouls_drawn",
+    "cards.yellow": "yellow_cards",
+    "cards.red": "red_cards",
+    "penalty.scored": "penalties_scored",
+    "penalty.missed": "penalties_missed",
+}
+KEY_COLUMNS = ["player_id", "team_id", "league_id", "season"]
+DECIMAL_COLUMNS = ["rating", "passes_accuracy"]
+TEXT_COLUMNS = ["position"]
+INSERT_CHUNK_SIZE = 500
+
+def _to_python(value, isna):
+    """Wartość z DataFrame jako typ Pythona (NaN/NA -> None, typy numpy -> int/float)."""
+    if isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+def map_player_statistics(players_data: list) -> List[Dict]:
+    """
+    Mapuje odpowiedzi `players` (zawodnik + lista `statistics`) na wiersze tabeli player_statistics
+    jednym pd.json_normalize - bez dodatkowych zapytań do API. Wiersze bez klucza
+    (player, team, league, season) są pomijane, duplikaty klucza łączone (ostatni wygrywa).
+    """
+    import pandas as pd  # ładowany przy pierwszym użyciu, nie przy imporcie modułu
+
+    entries = [entry for entry in players_data if isinstance(entry.get("statistics"), list) and entry.get("player")]
+    if not entries:
+        return []
+
+    df = pd.json_normalize(entries, record_path="statistics", meta=[["player", "id"]], errors="ignore")
+    if df.empty:
+        return []
+    df = df.reindex(columns=list(STATISTICS_COLUMNS)).rename(columns=STATISTICS_COLUMNS)
+
+    for column in df.columns:
+        if column in TEXT_COLUMNS:
+            continue
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+        df[column] = df[column].round(2) if column in DECIMAL_COLUMNS else df[column].astype("Int64")
+
+    df = df.dropna(subset=KEY_COLUMNS).drop_duplicates(subset=KEY_COLUMNS, keep="last")
+    return [{column: _to_python(value, pd.isna) for column, value in row.items()} for row in df.to_dict(orient="records")]
+
+def filter_player_statistics_rows(rows: List[Dict], player_ids=None) -> List[Dict]:
+    """Odrzuca wiersze, których drużyna, liga lub zawodnik nie istnieją w bazie (klucze obce)."""
+    if not rows:
+        return []
+    existing_teams = get_existing_team_ids({row["team_id"] for row in rows})
+    existing_leagues = set(load_league_metadata())
+    filtered = [
+        row for row in rows
+        if row["team_id"] in existing_teams and row["league_id"] in existing_leagues
+        and (player_ids is None or row["player_id"] in player_ids)
+    ]
+    if len(filtered) < len(rows):
+        log_info(logger, f"Skipped {len(rows) - len(filtered)} player statistics rows without team/league/player in database.")
+    return filtered
+
+def upsert_player_statistics(rows: List[Dict]):
+    """Zbiorczy upsert po kluczu (player_id, team_id, league_id, season), paczkami po INSERT_CHUNK_SIZE."""
+    if not rows:
+        return
+    columns = list(STATISTICS_COLUMNS.values())
+    updates = ", ".join(f"{column}=VALUES({column})" for column in columns if column not in KEY_COLUMNS)
+    query = text(f"""
+        INSERT INTO player_statistics ({", ".join(columns)})
+        VALUES ({", ".join(f":{column}" for column in columns)})
+        ON DUPLICATE KEY UPDATE {updates}
+    """)
+    try:
+        with SessionLocal() as session:
+            for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+                session.execute(query, rows[i:i + INSERT_CHUNK_SIZE])
+            session.commit()
+        log_info(logger, f"Inserted/updated {len(rows)} player statistics rows.")
+    except SQLAlchemyError as e:
+        log_error(logger, f"Error inserting player statistics: {e}")
+        raise
+
+def store_player_statistics(players_data: list, player_ids=None) -> int:
+    """Mapuje, filtruje i zapisuje statystyki zawodników z już pobranych odpowiedzi `players`."""
+    rows = filter_player_statistics_rows(map_player_statistics(players_data), player_ids)
+    upsert_player_statistics(rows)
+    return len(rows)
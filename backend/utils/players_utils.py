@@ -13,6 +13,7 @@ from api.api_requests import get_data
 from utils.progress_utils import create_progress_bar
 from config.db_connection import get_redis_connection, SessionLocal
 from utils.logging_utils import setup_logger, log_error, log_info, log_warning
+from utils.player_statistics_utils import store_player_statistics
 
 # Setup logger for notifications
 logger = setup_logger("players_utils")
@@ -111,19 +112,22 @@ def fetch_and_insert_player(player_id: int, season: int) -> None:
             session.execute(query, row)
             session.commit()
             log_info(logger, f"Pomyślnie zapisano zawodnika {player_id} do bazy danych.")
+        # Statystyki z tej samej odpowiedzi - bez dodatkowego zapytania
+        store_player_statistics(player_data, player_ids={r["player_id"] for r in row})
     except SQLAlchemyError as e:
         log_error(logger, f"Error inserting data into database: {e}")
 
-def fetch_and_insert_players(team_id: int, season: int) -> None:
+def fetch_and_insert_players(team_id: int, season: int) -> list:
     """
     Fetches player data for a specific team and season, caches it in Redis, and inserts it into the database.
     :param team_id: ID of the team
     :param season: Season year (e.g., 2023)
+    :return: List of inserted player IDs (empty on failure)
     """
     # Validate inputs
     if not isinstance(team_id, int) or not isinstance(season, int):
         log_error(logger, f"Invalid input types: team_id={team_id}, season={season}. Expected integers.")
-        return
+        return []
 
     try:
         # Redis key generation
@@ -144,7 +148,7 @@ def fetch_and_insert_players(team_id: int, season: int) -> None:
 
             if not initial_response or 'response' not in initial_response:
                 log_error(logger, f"Invalid API response structure for team_id={team_id}, season={season}: {initial_response}")
-                return
+                return []
 
             total_pages = initial_response.get('paging', {}).get('total', 1)
             players_data = []
@@ -171,12 +175,12 @@ def fetch_and_insert_players(team_id: int, season: int) -> None:
                 log_info(logger, f"Dane zawodników zapisane w Redis dla klucza: {redis_key}")
             else:
                 log_error(logger, f"Nie udało się pobrać danych zawodników dla team_id={team_id}, season={season}")
-                return
+                return []
 
         # Prepare data for database insertion
         if not players_data:
             log_error(logger, f"No players data found for team_id={team_id}, season={season}")
-            return
+            return []
 
         log_info(logger, f"Preparing data for {len(players_data)} players...")
         rows = prepare_player_data(players_data)
@@ -209,5 +213,14 @@ def fetch_and_insert_players(team_id: int, season: int) -> None:
             log_error(logger, f"Error inserting data into database: {e}")
             raise
 
+        # Statystyki zawodników z tych samych odpowiedzi `players` (bez dodatkowych zapytań do API)
+        player_ids = [row["player_id"] for row in rows]
+        try:
+            store_player_statistics(players_data, player_ids=set(player_ids))
+        except SQLAlchemyError as e:
+            log_error(logger, f"Error inserting player statistics for team_id {team_id}, season {season}: {e}")
+        return player_ids
+
     except Exception as e:
-        log_error(logger, f"Błąd w fetch_and_insert_players: {e}")
\ No newline at end of file
+        log_error(logger, f"Błąd w fetch_and_insert_players: {e}")
+        return []
\ No newline at end of file
@@ -1,120 +1,231 @@
 import sys
 import os
-import json
+import time
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from typing import List, Dict
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import text
 
 from api.api_requests import get_data, get_ttl_to_midnight
-from config.db_connection import get_redis_connection, SessionLocal
+from config.db_connection import SessionLocal
 from utils.logging_utils import setup_logger, log_info, log_error, log_warning
+from utils.cache_utils import cache_get_many, cache_set_many
+from utils.shard_utils import is_sharded, shard_condition
+from utils.team_form_utils import remember_team_form
 
 # Setup logger for notifications
 logger = setup_logger("predictions_utils")
 
-# Global Redis connection
-redis_client = get_redis_connection()
-cache_ttl = get_ttl_to_midnight()
+# Kanoniczna kopia odpowiedzi `predictions?fixture=` - źródło predykcji, listy H2H i formy drużyn
+PREDICTIONS_KEY = "predictions"
+# Znacznik "API nie ma predykcji" w `predictions:{fixture_id}` - krótki TTL, żeby nie odpytywać API co przebieg
+PREDICTIONS_NO_DATA = "NO_DATA"
+PREDICTIONS_NO_DATA_TTL = int(os.getenv("PREDICTIONS_NO_DATA_TTL", 3 * 3600))
 
 def fetch_predictions_matches() -> List[Dict]:
     """Fetch a list of predictions matches from DB."""
 
-    query = text("SELECT p.fixture_id FROM predictions p LEFT JOIN h2h_matches h ON p.fixture_id = h.fixture_id WHERE h.fixture_id IS NULL;")
+    params = {}
+    if is_sharded():
+        query = text(f"""
+            SELECT p.fixture_id FROM predictions p
+            JOIN future_matches fm ON fm.match_id = p.fixture_id
+            LEFT JOIN h2h_matches h ON p.fixture_id = h.fixture_id
+            WHERE h.fixture_id IS NULL AND {shard_condition('fm.league_id', params)};
+        """)
+    else:
+        query = text("SELECT p.fixture_id FROM predictions p LEFT JOIN h2h_matches h ON p.fixture_id = h.fixture_id WHERE h.fixture_id IS NULL;")
     try:
         with SessionLocal() as session:
-            matches = session.execute(query).fetchall()
+            matches = session.execute(query, params).fetchall()
             return [row[0] for row in matches]
     except SQLAlchemyError as e:
         log_error(logger, f"Error fetching available matches: {e}")
         return []
 
+def _fetch_predictions_payload(match_id: int):
+    """
+    Zwraca response[0], PREDICTIONS_NO_DATA gdy API odpowiedziało pustą listą bez błędów,
+    albo None przy błędzie zapytania lub wyczerpanym limicie (taki brak nie jest zapamiętywany).
+    `get_data(cache=False)` zwraca surową odpowiedź, więc pusta lista jest odróżniona od błędu.
+    """
+    log_info(logger, f"Fetching predictions for match ID {match_id}")
+    response = get_data("predictions", {"fixture": match_id}, cache=False)
+    if not isinstance(response, dict) or not isinstance(response.get('response'), list) or response.get('errors'):
+        log_warning(logger, f"Predictions request failed for match ID {match_id}.")
+        return None
+    if not response['response']:
+        log_info(logger, f"No prediction data found for match ID {match_id}.")
+        return PREDICTIONS_NO_DATA
+    return response['response'][0]
+
+def load_predictions_payloads(match_ids: List[int], max_workers: int = 1, progress_bar=None) -> Dict[int, Dict]:
+    """
+    Zwraca pełne odpowiedzi `predictions?fixture=` (response[0]) dla listy meczów.
+    Kanoniczna kopia trzymana jest tylko w `predictions:{fixture_id}` (cache_get_many / cache_set_many);
+    braki pobierane są z API (równolegle przy `max_workers > 1`) z pominięciem cache `api_cache:predictions:*`.
+    Mecze bez predykcji w API dostają znacznik PREDICTIONS_NO_DATA (krótki TTL) i nie ma ich w wyniku.
+    """
+    match_ids = list(dict.fromkeys(match_ids))
+    if not match_ids:
+        return {}
+
+    cached = cache_get_many(PREDICTIONS_KEY, match_ids)
+    payloads = {match_id: payload for match_id, payload in cached.items() if isinstance(payload, dict)}
+    if progress_bar:
+        progress_bar.update(len(cached))
+
+    missing_ids = [match_id for match_id in match_ids if match_id not in cached]
+    if not missing_ids:
+        return payloads
+
+    fetched = {}
+    no_data = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        tasks = {executor.submit(_fetch_predictions_payload, match_id): match_id for match_id in missing_ids}
+        for future in as_completed(tasks):
+            match_id = tasks[future]
+            try:
+                payload = future.result()
+                if payload == PREDICTIONS_NO_DATA:
+                    no_data[match_id] = PREDICTIONS_NO_DATA
+                elif payload:
+                    fetched[match_id] = payload
+            except Exception as e:
+                log_error(logger, f"Error fetching predictions for match ID {match_id}: {e}")
+            finally:
+                if progress_bar:
+                    progress_bar.update(1)
+
+    payloads.update(fetched)
+    ttl_to_midnight = get_ttl_to_midnight()
+    cache_set_many(PREDICTIONS_KEY, fetched, ttl_to_midnight)
+    cache_set_many(PREDICTIONS_KEY, no_data, min(PREDICTIONS_NO_DATA_TTL, ttl_to_midnight))
+    return payloads
+
+def _percent_column(values: list):
+    """
+    Kolumna procentów ("45%") jako float64 - jedna konwersja dla wszystkich meczów.
+    Wartości niepoprawne ("N/A", "-", None) dają 0.0 zamiast przerywać parsowanie całej paczki.
+    """
+    import pandas as pd
+    series = pd.Series(values, dtype=object).astype(str).str.strip().str.rstrip("%")
+    return pd.to_numeric(series, errors="coerce").fillna(0.0).to_numpy(dtype="float64")
+
+def parse_prediction_rows(payloads: Dict[int, Dict]) -> List[Dict]:
+    """Wiersze tabeli `predictions` z odpowiedzi `predictions` (procenty konwertowane wektorowo)."""
+    match_ids, predictions = [], []
+    for match_id, payload in payloads.items():
+        if not isinstance(payload, dict):
+            continue
+        prediction = payload.get('predictions')
+        if not isinstance(prediction, dict) or not isinstance(prediction.get('percent'), dict):
+            log_warning(logger, f"Invalid predictions payload for match ID {match_id}.")
+            continue
+        match_ids.append(match_id)
+        predictions.append(prediction)
+    if not predictions:
+        return []
+
+    percents = {
+        side: _percent_column([prediction['percent'].get(side) for prediction in predictions])
+        for side in ("home", "draw", "away")
+    }
+    rows = []
+    for i, (match_id, prediction) in enumerate(zip(match_ids, predictions)):
+        try:
+            winner = prediction.get('winner')
+            goals = prediction.get('goals') or {}
+            rows.append({
+                "fixture_id": match_id,
+                "winner_team_id": winner['id'] if winner else None,
+                "winner_name": winner['name'] if winner else None,
+                "advice": prediction.get('advice'),
+                "home_win_percent": float(percents["home"][i]),
+                "draw_percent": float(percents["draw"][i]),
+                "away_win_percent": float(percents["away"][i]),
+                "goals_home": goals.get('home') if goals.get('home') is not None else 0,
+                "goals_away": goals.get('away') if goals.get('away') is not None else 0,
+            })
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            log_warning(logger, f"Skipping invalid predictions payload for match ID {match_id}: {e}")
+    return rows
+
+def remember_payload_team_forms(payload: Dict):
+    """Zapisuje formę obu drużyn z bloku `teams` odpowiedzi (wykorzystywana przez fetch_team_data)."""
+    for side in ("home", "away"):
+        team = payload.get('teams', {}).get(side) or {}
+        remember_team_form(team.get('id'), (team.get('league') or {}).get('form'))
+
+UPSERT_PREDICTIONS_QUERY = text("""
+    INSERT INTO predictions (
+        fixture_id, winner_team_id, winner_name, advice,
+        home_win_percent, draw_percent, away_win_percent,
+        goals_home, goals_away
+    )
+    VALUES (:fixture_id, :winner_team_id, :winner_name, :advice,
+            :home_win_percent, :draw_percent, :away_win_percent,
+            :goals_home, :goals_away)
+    ON DUPLICATE KEY UPDATE
+        winner_team_id = VALUES(winner_team_id),
+        winner_name = VALUES(winner_name),
+        advice = VALUES(advice),
+        home_win_percent = VALUES(home_win_percent),
+        draw_percent = VALUES(draw_percent),
+        away_win_percent = VALUES(away_win_percent),
+        goals_home = COALESCE(VALUES(goals_home), 0),
+        goals_away = COALESCE(VALUES(goals_away), 0);
+""")
+
+def upsert_predictions(rows: List[Dict]):
+    """Zapisuje wszystkie wiersze jednym poleceniem (pymysql wysyła executemany jako wielowierszowy INSERT) i jednym commitem."""
+    if not rows:
+        return
+    with SessionLocal() as session:
+        session.execute(UPSERT_PREDICTIONS_QUERY, rows)
+        session.commit()
+    log_info(logger, f"Inserted/updated predictions for {len(rows)} matches.")
+
+def ingest_predictions(match_ids: List[int], max_workers: int = 4, progress_bar=None) -> int:
+    """
+    Etap predykcji dla listy meczów: równoległe pobranie kanonicznych odpowiedzi,
+    wektorowe parsowanie, zapamiętanie formy drużyn i jeden zbiorczy upsert. Zwraca liczbę zapisanych wierszy.
+    """
+    start = time.perf_counter()
+    payloads = load_predictions_payloads(match_ids, max_workers=max_workers, progress_bar=progress_bar)
+    fetched = time.perf_counter()
+    rows = parse_prediction_rows(payloads)
+    for payload in payloads.values():
+        remember_payload_team_forms(payload)
+    parsed = time.perf_counter()
+    try:
+        upsert_predictions(rows)
+    except SQLAlchemyError as e:
+        log_error(logger, f"Error inserting predictions into database: {e}")
+        return 0
+    log_info(logger, f"Predictions: {len(rows)}/{len(match_ids)} matches, fetch={fetched - start:.2f}s "
+                     f"parse={parsed - fetched:.2f}s write={time.perf_counter() - parsed:.2f}s")
+    return len(rows)
+
 def fetch_h2h_from_predictions(fixtures_ids: List[int]) -> List[Dict]:
-    """Pobiera dane H2H na podstawie listy `fixture_id` i zwraca tylko mecze H2H."""
+    """Pobiera dane H2H na podstawie listy `fixture_id` i zwraca tylko mecze H2H (z kanonicznej kopii predykcji)."""
 
     matches = []
+    payloads = load_predictions_payloads(fixtures_ids)
     for match_id in fixtures_ids:
-        redis_key = f"predictions_h2h:{match_id}"
-        cached_data = redis_client.get(redis_key)
-        if cached_data:
-            h2h_matches = json.loads(cached_data).get("h2h", [])
-            matches.extend(h2h_matches)
+        if not isinstance(payloads.get(match_id), dict):
+            log_error(logger, f"⚠️ Brak danych H2H w API dla Meczu o ID: {match_id}")
             continue
-        try:
-            response = get_data("predictions", params={"fixture": match_id})
-            if response and 'response' in response and response['response']:
-                match_data = response['response'][0]
-                h2h_matches = match_data.get("h2h", [])
-                redis_client.setex(redis_key, 86400, json.dumps({"h2h": h2h_matches}))
-                matches.extend(h2h_matches)
-            else:
-                log_error(logger, f"⚠️ Brak danych H2H w API dla Meczu o ID: {match_id}")
-        except Exception as e:
-            log_error(logger, f"Błąd podczas pobierania H2H dla fixture_id {match_id}: {e}")
+        matches.extend(payloads[match_id].get("h2h", []))
     return matches
 
-def fetch_predictions_for_match(match_id: int, progress_bar=None) -> None:
-    """Pobierz predykcje dla danego ID meczu, sprawdź cache Redis i zapisz je w bazie danych."""
-
-    predictions_key = f"predictions:{match_id}"
-    try:
-        cached_data = redis_client.get(predictions_key)
-        if cached_data:
-            log_info(logger, f"Cache hit for predictions of match ID {match_id}")
-            predictions = json.loads(cached_data)
-        else:
-            log_info(logger, f"Fetching predictions for match ID {match_id}")
-            response = get_data("predictions", {"fixture": match_id})
-
-            if not response or 'response' not in response or not response['response']:
-                log_info(logger, f"No prediction data found for match ID {match_id}.")
-                return
-
-            predictions = response['response'][0]
-            redis_client.setex(predictions_key, cache_ttl, json.dumps(predictions))
-
-        predictions_data = {
-			"fixture_id": match_id,
-			"winner_team_id": predictions['predictions']['winner']['id'] if predictions['predictions']['winner'] else None,
-			"winner_name": predictions['predictions']['winner']['name'] if predictions['predictions']['winner'] else None,
-			"advice": predictions['predictions']['advice'],
-			"home_win_percent": float(predictions['predictions']['percent']['home'].replace('%', '')),
-			"draw_percent": float(predictions['predictions']['percent']['draw'].replace('%', '')),
-			"away_win_percent": float(predictions['predictions']['percent']['away'].replace('%', '')),
-			"goals_home": predictions['predictions']['goals']['home'] if predictions['predictions']['goals']['home'] is not None else 0,
-			"goals_away": predictions['predictions']['goals']['away'] if predictions['predictions']['goals']['away'] is not None else 0,
-		}
-
-        query = text("""
-            INSERT INTO predictions (
-                fixture_id, winner_team_id, winner_name, advice,
-                home_win_percent, draw_percent, away_win_percent,
-                goals_home, goals_away
-            )
-            VALUES (:fixture_id, :winner_team_id, :winner_name, :advice,
-                    :home_win_percent, :draw_percent, :away_win_percent,
-                    :goals_home, :goals_away)
-            ON DUPLICATE KEY UPDATE
-                winner_team_id = VALUES(winner_team_id),
-                winner_name = VALUES(winner_name),
-                advice = VALUES(advice),
-                home_win_percent = VALUES(home_win_percent),
-                draw_percent = VALUES(draw_percent),
-                away_win_percent = VALUES(away_win_percent),
-                goals_home = COALESCE(VALUES(goals_home), 0),
-    			goals_away = COALESCE(VALUES(goals_away), 0);
-        """)
-
-        with SessionLocal() as session:
-            session.execute(query, predictions_data)
-            session.commit()
-            log_info(logger, f"Inserted/updated predictions for match ID {match_id}.")
-
-        if progress_bar:
-            progress_bar.update(1)
-    except SQLAlchemyError as e:
-        log_error(logger, f"Error inserting predictions into database: {e}")
+def fetch_predictions_for_match(match_id: int, progress_bar=None) -> int:
+    """
+    Pobierz predykcje dla danego ID meczu (kanoniczna kopia w Redis), zapisz je w bazie i zapamiętaj formę drużyn.
+    Zwraca liczbę zapisanych wierszy (0 - brak predykcji albo błąd zapisu).
+    """
+    return ingest_predictions([match_id], max_workers=1, progress_bar=progress_bar)
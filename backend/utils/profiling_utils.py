@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.logging_utils import setup_logger, log_info, log_error
+
+# Setup logger for profiling
+logger = setup_logger("profiling_utils")
+
+# Tryb profilowania: "" (wyłączone), "basic" (czasy), "cprofile", "sampling", "memory" (czasy + szczyt pamięci)
+PROFILE_ENV = "PROFILE_STAGES"
+PROFILE_MODES = ("basic", "cprofile", "sampling", "memory")
+# tracemalloc spowalnia każdą alokację, dlatego pamięć mierzona jest tylko w trybie "memory"
+# albo z PROFILE_MEMORY=1 (w połączeniu z dowolnym innym trybem)
+PROFILE_MEMORY_ENV = "PROFILE_MEMORY"
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), '..', 'logs', 'profiles')
+
+# Kategorie czasu przypisywane na podstawie ścieżki pliku w wynikach cProfile/samplingu
+PATH_CATEGORIES = (
+    ("redis", "redis"),
+    ("pymysql", "mysql"),
+    ("sqlalchemy", "mysql"),
+    ("json", "json_decode"),
+    ("jinja2", "html_render"),
+    ("generators", "html_render"),
+    ("requests", "api_http"),
+    ("urllib3", "api_http"),
+    ("ssl", "api_http"),
+)
+
+_timings_lock = threading.Lock()
+_timings = defaultdict(lambda: {"seconds": 0.0, "calls": 0})
+
+def get_profile_mode() -> str:
+    mode = os.getenv(PROFILE_ENV, "").strip().lower()
+    if mode in ("1", "true", "yes"):
+        return "basic"
+    return mode if mode in PROFILE_MODES else ""
+
+def is_profiling_enabled() -> bool:
+    return bool(get_profile_mode())
+
+def is_memory_profiling_enabled() -> bool:
+    mode = get_profile_mode()
+    return mode == "memory" or (bool(mode) and os.getenv(PROFILE_MEMORY_ENV, "").strip().lower() in ("1", "true", "yes"))
+
+def record_timing(category: str, seconds: float):
+    """Dolicza czas do kategorii (np. api_wait, mysql, redis) bieżącego etapu. Bezpieczne dla wątków."""
+    if not is_profiling_enabled():
+        return
+    with _timings_lock:
+        _timings[category]["seconds"] += seconds
+        _timings[category]["calls"] += 1
+
+@contextmanager
+def timed(category: str):
+    """Context manager mierzący czas bloku i zapisujący go w kategorii."""
+    if not is_profiling_enabled():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(category, time.perf_counter() - start)
+
+def _reset_timings() -> dict:
+    with _timings_lock:
+        snapshot = {category: {"seconds": round(value["seconds"], 4), "calls": value["calls"]} for category, value in _timings.items()}
+        _timings.clear()
+    return snapshot
+
+def _category_for_path(path: str) -> str:
+    normalized = path.replace("\\", "/").lower()
+    for needle, category in PATH_CATEGORIES:
+        if f"/{needle}" in normalized:
+            return category
+    return "other"
+
+class SamplingProfiler:
+    """
+    Prosty profiler próbkujący: co `interval` sekund zapisuje bieżącą funkcję każdego wątku.
+    W przeciwieństwie do cProfile obejmuje wszystkie wątki (ThreadPoolExecutor w ETL).
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = defaultdict(int)
+        self.total_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                self.samples[(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+                self.total_samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def summary(self, top=25):
+        categories = defaultdict(float)
+        for (filename, _, _), count in self.samples.items():
+            categories[_category_for_path(filename)] += count * self.interval
+        top_functions = sorted(self.samples.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "categories": {category: round(seconds, 4) for category, seconds in categories.items()},
+            "top_functions": [
+                {"function": f"{os.path.basename(filename)}:{line}({name})", "samples": count}
+                for (filename, line, name), count in top_functions
+            ],
+        }
+
+def _cprofile_summary(profiler: cProfile.Profile, top=25) -> dict:
+    stats = pstats.Stats(profiler)
+    categories = defaultdict(float)
+    functions = []
+    for (filename, line, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        categories[_category_for_path(filename)] += tottime
+        functions.append((cumtime, tottime, ncalls, f"{os.path.basename(filename)}:{line}({name})"))
+    functions.sort(reverse=True)
+    return {
+        "categories": {category: round(seconds, 4) for category, seconds in categories.items()},
+        "top_functions": [
+            {"function": function, "cumtime": round(cumtime, 4), "tottime": round(tottime, 4), "calls": ncalls}
+            for cumtime, tottime, ncalls, function in functions[:top]
+        ],
+    }
+
+class RunReport:
+    """Zbiera pomiary etapów jednego uruchomienia i zapisuje je jako raport JSON."""
+    def __init__(self, run_name: str):
+        self.run_name = run_name
+        self.mode = get_profile_mode()
+        self.track_memory = is_memory_profiling_enabled()
+        self.started_at = datetime.now()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, stage_name: str):
+        """Mierzy czas ścienny, CPU i kategorie czasu dla etapu (szczyt pamięci - tylko gdy włączony)."""
+        if not self.mode:
+            yield
+            return
+
+        _reset_timings()
+        profiler = None
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+        elif self.mode == "sampling":
+            profiler = SamplingProfiler()
+
+        if self.track_memory:
+            tracemalloc.start()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if isinstance(profiler, cProfile.Profile):
+            profiler.enable()
+        elif profiler:
+            profiler.start()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+            elif profiler:
+                profiler.stop()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+
+            entry = {
+                "stage": stage_name,
+                "status": status,
+                "wall_seconds": round(wall, 4),
+                "cpu_seconds": round(cpu, 4),
+                "timings": _reset_timings(),
+            }
+            summary = f"wall={wall:.2f}s cpu={cpu:.2f}s"
+            if self.track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                entry["peak_memory_mb"] = round(peak / (1024 * 1024), 2)
+                summary += f" peak={entry['peak_memory_mb']}MB"
+            if isinstance(profiler, cProfile.Profile):
+                entry["profile"] = _cprofile_summary(profiler)
+            elif isinstance(profiler, SamplingProfiler):
+                entry["profile"] = profiler.summary()
+            self.stages.append(entry)
+            log_info(logger, f"[{self.run_name}] {stage_name}: {summary}")
+
+    def to_dict(self) -> dict:
+        return {
+            "run": self.run_name,
+            "mode": self.mode,
+            "memory": self.track_memory,
+            "started_at": self.started_at.isoformat(),
+            "total_wall_seconds": round(sum(stage["wall_seconds"] for stage in self.stages), 4),
+            "stages": self.stages,
+        }
+
+    def save(self, path=None):
+        """Zapisuje raport do logs/profiles/{run}_{timestamp}.json (tylko gdy profilowanie jest włączone)."""
+        if not self.mode:
+            return None
+        if path is None:
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            path = os.path.join(PROFILES_DIR, f"{self.run_name}_{self.started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        try:
+            with open(path, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+            log_info(logger, f"Raport profilowania zapisany: {path}")
+            print(f"📊 Raport profilowania: {path}")
+            return path
+        except OSError as e:
+            log_error(logger, f"Nie udało się zapisać raportu profilowania: {e}")
+            return None
+
+def diff_reports(old: dict, new: dict) -> list:
+    """Porównuje dwa raporty etap po etapie; zwraca listę wierszy z różnicami."""
+    old_stages = {stage["stage"]: stage for stage in old.get("stages", [])}
+    rows = []
+    for stage in new.get("stages", []):
+        before = old_stages.pop(stage["stage"], None)
+        row = {"stage": stage["stage"]}
+        for metric in ("wall_seconds", "cpu_seconds", "peak_memory_mb"):
+            # peak_memory_mb jest w raporcie tylko przy profilowaniu pamięci
+            previous = before.get(metric) if before else None
+            current = stage.get(metric)
+            row[metric] = {"old": previous, "new": current,
+                           "delta": round(current - previous, 4) if previous is not None and current is not None else None}
+        categories = set(stage.get("timings", {})) | set((before or {}).get("timings", {}))
+        row["timings"] = {
+            category: {
+                "old": (before or {}).get("timings", {}).get(category, {}).get("seconds"),
+                "new": stage.get("timings", {}).get(category, {}).get("seconds"),
+            }
+            for category in sorted(categories)
+        }
+        rows.append(row)
+    for name, stage in old_stages.items():
+        rows.append({"stage": name, "removed": True, "wall_seconds": {"old": stage["wall_seconds"], "new": None, "delta": None}})
+    return rows
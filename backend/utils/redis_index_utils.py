@@ -0,0 +1,121 @@
+import sys
+import os
+import json
+import time
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+
+from config.db_connection import get_redis_connection
+from utils.logging_utils import setup_logger, log_info, log_error
+
+# Setup logger for Redis indexes
+logger = setup_logger("redis_index_utils")
+
+# Global Redis connection
+redis_client = get_redis_connection()
+
+# Sorted set fixture_id -> czas rozpoczęcia meczu (unix timestamp)
+FIXTURE_EXPIRY_KEY = "fixture_expiry"
+# Klucze cache powiązane z przyszłym meczem - usuwane razem, gdy mecz się rozpocznie
+FIXTURE_KEY_PREFIXES = ("future_match", "future_match_db", "predictions")
+SCAN_COUNT = 1000
+DELETE_BATCH_SIZE = 500
+
+# Atomowe "pop" zakresu: zwraca i usuwa z indeksu do ARGV[2] meczów rozpoczętych przed ARGV[1]
+_pop_range_script = redis_client.register_script("""
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #ids > 0 then
+    redis.call('ZREM', KEYS[1], unpack(ids))
+end
+return ids
+""")
+
+def _kickoff_timestamp(fixture: dict):
+    """Czas rozpoczęcia meczu z obiektu `fixture` API (pole timestamp albo data ISO)."""
+    if fixture.get('timestamp'):
+        return int(fixture['timestamp'])
+    if fixture.get('date'):
+        return int(datetime.fromisoformat(fixture['date']).timestamp())
+    return None
+
+def register_fixtures(matches: list):
+    """Rejestruje mecze (pełne obiekty z API) w indeksie wygasania `fixture_expiry`."""
+    mapping = {}
+    for match in matches:
+        fixture = match.get('fixture', {}) if isinstance(match, dict) else {}
+        kickoff = _kickoff_timestamp(fixture) if fixture.get('id') else None
+        if kickoff is not None:
+            mapping[fixture['id']] = kickoff
+    if mapping:
+        redis_client.zadd(FIXTURE_EXPIRY_KEY, mapping)
+
+def expire_started_fixtures(now: float = None, batch_size: int = DELETE_BATCH_SIZE) -> int:
+    """
+    Usuwa klucze cache (FIXTURE_KEY_PREFIXES) meczów, które już się rozpoczęły.
+    Mecze zdejmowane są z indeksu paczkami (skrypt Lua), a klucze usuwane pipeline'em - bez KEYS i bez
+    odczytywania wartości. Zwraca liczbę usuniętych kluczy.
+    """
+    now = now if now is not None else time.time()
+    deleted, fixtures = 0, 0
+    while True:
+        fixture_ids = _pop_range_script(keys=[FIXTURE_EXPIRY_KEY], args=[now, batch_size])
+        if not fixture_ids:
+            break
+        fixtures += len(fixture_ids)
+        pipeline = redis_client.pipeline(transaction=False)
+        for fixture_id in fixture_ids:
+            pipeline.delete(*(f"{prefix}:{fixture_id}" for prefix in FIXTURE_KEY_PREFIXES))
+        deleted += sum(pipeline.execute())
+    log_info(logger, f"Expired {fixtures} started fixtures, deleted {deleted} cache keys.")
+    return deleted
+
+def scan_keys(pattern: str, count: int = SCAN_COUNT):
+    """Klucze pasujące do wzorca w paczkach (SCAN - nie blokuje Redis jak KEYS)."""
+    batch = []
+    for key in redis_client.scan_iter(match=pattern, count=count):
+        batch.append(key)
+        if len(batch) >= count:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def scan_values(pattern: str, count: int = SCAN_COUNT):
+    """Pary (klucz, wartość JSON) dla kluczy pasujących do wzorca - SCAN + jeden MGET na paczkę."""
+    for keys in scan_keys(pattern, count):
+        for key, raw in zip(keys, redis_client.mget(keys)):
+            if raw is None:
+                continue
+            try:
+                yield key, json.loads(raw)
+            except json.JSONDecodeError:
+                log_error(logger, f"Invalid JSON in Redis key {key}")
+
+def scan_delete(pattern: str, predicate=None, count: int = SCAN_COUNT) -> int:
+    """
+    Usuwa klucze pasujące do wzorca (fallback dla doraźnych porządków).
+    Z `predicate(value)` wartości czytane są MGET-em i usuwane są tylko klucze, dla których zwraca True.
+    """
+    deleted = 0
+    if predicate is None:
+        batches = scan_keys(pattern, count)
+    else:
+        batches = ([key for key, value in values if predicate(value)]
+                   for values in _chunks(scan_values(pattern, count), count))
+    for keys in batches:
+        for i in range(0, len(keys), DELETE_BATCH_SIZE):
+            deleted += redis_client.delete(*keys[i:i + DELETE_BATCH_SIZE])
+    return deleted
+
+def _chunks(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,52 @@
+import os
+import json
+
+# Zmienna środowiskowa z listą lig obsługiwanych przez bieżący proces (shard)
+SHARD_ENV = "SHARD_LEAGUE_IDS"
+
+def get_shard_league_ids():
+    """
+    Zwraca listę ID lig przypisanych do bieżącego procesu albo None,
+    jeśli proces nie działa w trybie shardowanym (obsługuje wszystkie ligi).
+    """
+    raw = os.getenv(SHARD_ENV)
+    if not raw:
+        return None
+    return [int(league_id) for league_id in json.loads(raw)]
+
+def is_sharded() -> bool:
+    return get_shard_league_ids() is not None
+
+def shard_key_suffix() -> str:
+    """
+    Sufiks kluczy Redis dla stanu należącego do sharda (np. ":shard_39_140"),
+    pusty poza trybem shardowanym - shardy nie nadpisują wzajemnie swojego stanu.
+    """
+    shard_leagues = get_shard_league_ids()
+    if shard_leagues is None:
+        return ""
+    return ":shard_" + "_".join(str(league_id) for league_id in sorted(shard_leagues))
+
+def filter_league_ids(league_ids: list) -> list:
+    """Ogranicza listę lig do lig z bieżącego sharda."""
+    shard_leagues = get_shard_league_ids()
+    if shard_leagues is None:
+        return list(league_ids)
+    return [league_id for league_id in league_ids if int(league_id) in shard_leagues]
+
+def shard_condition(column: str, params: dict) -> str:
+    """
+    Zwraca warunek SQL ograniczający zapytanie do lig z sharda (albo "1 = 1")
+    i dopisuje potrzebny parametr do `params`.
+    """
+    shard_leagues = get_shard_league_ids()
+    if shard_leagues is None:
+        return "1 = 1"
+    params["shard_leagues"] = tuple(shard_leagues) if shard_leagues else (-1,)
+    return f"{column} IN :shard_leagues"
+
+def split_leagues(league_ids: list, shards: int) -> list:
+    """Dzieli ligi na `shards` rozłącznych grup (round-robin, deterministycznie)."""
+    ordered = sorted(int(league_id) for league_id in league_ids)
+    groups = [ordered[i::shards] for i in range(max(1, shards))]
+    return [group for group in groups if group]
@@ -10,18 +10,18 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from config.db_connection import SessionLocal
 from utils.logging_utils import setup_logger, log_error, log_info
+from utils.shard_utils import shard_condition
+from utils.league_cache_utils import get_league_metadata
 from datetime import datetime
 
 # Setup logger for notifications
 logger = setup_logger("special_football_functions")
 
 def get_current_season(league_id: int):
-    """Pobiera bieżący sezon dla danej ligi z tabeli `leagues`."""
-    query = text("SELECT current_season FROM leagues WHERE league_id = :league_id")
+    """Zwraca bieżący sezon ligi z metadanych lig (pamięć procesu / Redis, jedno zapytanie do `leagues`)."""
     try:
-        with SessionLocal() as session:
-            result = session.execute(query, {"league_id": league_id}).fetchone()
-            return result[0] if result else None
+        league = get_league_metadata(league_id)
+        return league["current_season"] if league else None
     except SQLAlchemyError as e:
         log_error(logger, f"Error in get_current_season: {e}")
         raise
@@ -75,10 +75,11 @@ def get_match_result(score_home: int, score_away: int) -> str:
 def fetch_available_matches() -> List[Dict]:
     """Fetch a list of available matches for user selection."""
 
-    query = text("SELECT match_id, home_team_id, away_team_id, match_date FROM future_matches WHERE match_date >= NOW() ORDER BY match_date ASC;")
+    params = {}
+    query = text(f"SELECT match_id, home_team_id, away_team_id, match_date FROM future_matches WHERE match_date >= NOW() AND {shard_condition('league_id', params)} ORDER BY match_date ASC;")
     try:
         with SessionLocal() as session:
-            matches = session.execute(query).fetchall()
+            matches = session.execute(query, params).fetchall()
             log_info(logger, f"Fetched {len(matches)} available matches from the database.")
             return [dict(row._asdict()) for row in matches]  # Poprawka!
     except SQLAlchemyError as e:
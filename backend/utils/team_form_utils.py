@@ -0,0 +1,158 @@
+import sys
+import os
+import json
+import datetime
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import text
+
+from api.api_requests import get_data
+from config.db_connection import get_redis_connection, SessionLocal
+from utils.logging_utils import setup_logger, log_info, log_error
+from utils.cache_utils import cache_get_many
+
+# Setup logger for team form
+logger = setup_logger("team_form_utils")
+
+# Global Redis connection
+redis_client = get_redis_connection()
+
+# Trenerzy zmieniają się rzadko - cache `coach:{team_id}` odświeżany raz w tygodniu
+COACH_CACHE_TTL = 604800
+# Mecze starsze niż rok nie wchodzą do formy
+FORM_WINDOW_DAYS = 365
+# Jeśli ostatni zakończony mecz w bazie jest starszy, dane lokalne uznajemy za niepełne (fallback na API)
+FORM_MAX_AGE_DAYS = 30
+# Forma z odpowiedzi `predictions` - uzupełnia dane lokalne przed zapytaniem `fixtures?last=`
+PREDICTION_FORM_KEY = "prediction_team_form"
+PREDICTION_FORM_TTL = 86400
+
+def _form_summary(outcomes: list) -> dict:
+    """Forma z listy wyników (od najnowszego): 'W' / 'D' / 'L'."""
+    wins, draws, losses = outcomes.count("W"), outcomes.count("D"), outcomes.count("L")
+    streak = 0
+    for outcome in outcomes:
+        if outcome != outcomes[0]:
+            break
+        streak += 1
+    return {
+        "current_form": f"W{wins}-D{draws}-L{losses}",
+        "form_percentage": (wins * 20) + (draws * 10),
+        "streak": f"{outcomes[0]}{streak}" if outcomes else "",
+        "last_results": "".join(outcomes)
+    }
+
+def compute_team_forms(team_ids: list = None, last: int = 5) -> dict:
+    """
+    Liczy formę drużyn z tabeli matches w jednym zapytaniu (ROW_NUMBER() po dacie dla każdej drużyny).
+    Zwraca team_id -> {"current_form", "form_percentage", "streak", "last_results"} tylko dla drużyn,
+    które mają w bazie `last` zakończonych meczów, w tym mecz z ostatnich FORM_MAX_AGE_DAYS dni.
+    Bez `team_ids` liczy formę wszystkich drużyn.
+    """
+    params = {"days": FORM_WINDOW_DAYS, "last": last}
+    team_filter = ""
+    if team_ids is not None:
+        if not team_ids:
+            return {}
+        team_filter = "WHERE t.team_id IN :team_ids"
+        params["team_ids"] = tuple(team_ids)
+
+    query = text(f"""
+        SELECT team_id, goals_for, goals_against, date
+        FROM (
+            SELECT t.team_id, t.goals_for, t.goals_against, t.date,
+                   ROW_NUMBER() OVER (PARTITION BY t.team_id ORDER BY t.date DESC) AS rn
+            FROM (
+                SELECT home_team_id AS team_id, score_home AS goals_for, score_away AS goals_against, date
+                FROM matches
+                WHERE score_home IS NOT NULL AND score_away IS NOT NULL
+                  AND date <= NOW() AND date >= NOW() - INTERVAL :days DAY
+                UNION ALL
+                SELECT away_team_id AS team_id, score_away AS goals_for, score_home AS goals_against, date
+                FROM matches
+                WHERE score_home IS NOT NULL AND score_away IS NOT NULL
+                  AND date <= NOW() AND date >= NOW() - INTERVAL :days DAY
+            ) t
+            {team_filter}
+        ) ranked
+        WHERE rn <= :last
+        ORDER BY team_id, rn
+    """)
+    try:
+        with SessionLocal() as session:
+            rows = session.execute(query, params).fetchall()
+    except SQLAlchemyError as e:
+        log_error(logger, f"Error computing team forms: {e}")
+        return {}
+
+    results = {}
+    latest = {}
+    for team_id, goals_for, goals_against, match_date in rows:
+        outcome = "W" if goals_for > goals_against else "L" if goals_for < goals_against else "D"
+        results.setdefault(team_id, []).append(outcome)
+        latest.setdefault(team_id, match_date)
+
+    min_date = datetime.datetime.now() - datetime.timedelta(days=FORM_MAX_AGE_DAYS)
+    forms = {
+        team_id: _form_summary(outcomes)
+        for team_id, outcomes in results.items()
+        if len(outcomes) >= last and latest[team_id] >= min_date
+    }
+    log_info(logger, f"Local form computed for {len(forms)} teams ({len(results)} with matches in database).")
+    return forms
+
+def fetch_team_form_from_api(team_id: int, season: int, last: int = 5) -> dict:
+    """Forma drużyny z `fixtures?last=` - używana tylko, gdy w bazie brakuje meczów drużyny."""
+    fixtures_response = get_data("fixtures", params={"team": team_id, "season": season, "last": last})
+    outcomes = []
+    if fixtures_response and 'response' in fixtures_response and fixtures_response['response']:
+        for match in fixtures_response['response']:
+            side = 'home' if match['teams']['home']['id'] == team_id else 'away'
+            winner = match['teams'][side]['winner']
+            outcomes.append("W" if winner is True else "L" if winner is False else "D")
+    return _form_summary(outcomes)
+
+def get_team_coach(team_id: int):
+    """Aktualny trener drużyny; cache `coach:{team_id}` na tydzień (także brak trenera)."""
+    cache_key = f"coach:{team_id}"
+    cached_data = redis_client.get(cache_key)
+    if cached_data:
+        return json.loads(cached_data).get("name")
+
+    coach_name = None
+    coach_response = get_data("coachs", params={"team": team_id})
+    if coach_response and 'response' in coach_response and coach_response['response']:
+        current_date = datetime.date.today()
+        latest_start = datetime.date.min
+        for coach in coach_response['response']:
+            for career in coach.get("career", []):
+                if career["team"]["id"] == team_id and career["end"] is None:
+                    start_date = datetime.datetime.strptime(career["start"], "%Y-%m-%d").date()
+                    if latest_start < start_date <= current_date:
+                        latest_start = start_date
+                        coach_name = coach.get("name", None)
+
+    redis_client.setex(cache_key, COACH_CACHE_TTL, json.dumps({"name": coach_name}))
+    return coach_name
+
+def remember_team_form(team_id: int, season_form: str, last: int = 5):
+    """
+    Zapisuje formę drużyny z bloku `teams.*.league.form` odpowiedzi `predictions`
+    (wyniki sezonu od najstarszego) w cache `prediction_team_form:{team_id}` na dzień.
+    """
+    outcomes = [outcome for outcome in reversed(season_form or "") if outcome in "WDL"][:last]
+    if team_id is None or len(outcomes) < last:
+        return
+    redis_client.setex(f"{PREDICTION_FORM_KEY}:{team_id}", PREDICTION_FORM_TTL, json.dumps(_form_summary(outcomes)))
+
+def get_remembered_team_form(team_id: int):
+    """Forma drużyny zapamiętana z odpowiedzi `predictions` (None, jeśli brak)."""
+    cached_data = redis_client.get(f"{PREDICTION_FORM_KEY}:{team_id}")
+    return json.loads(cached_data) if cached_data else None
+
+def get_remembered_team_forms(team_ids: list) -> dict:
+    """Formy wielu drużyn zapamiętane z odpowiedzi `predictions` - jeden MGET (cache_get_many)."""
+    return cache_get_many(PREDICTION_FORM_KEY, team_ids)
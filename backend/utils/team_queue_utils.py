@@ -0,0 +1,116 @@
+import sys
+import os
+import time
+import uuid
+import threading
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.db_connection import get_redis_connection
+from utils.logging_utils import setup_logger, log_info, log_error
+from utils.team_season_utils import resolve_team_season, resolve_team_seasons
+
+# Setup logger for team queue
+logger = setup_logger("team_queue_utils")
+
+# Global Redis connection
+redis_client = get_redis_connection()
+
+# Identyfikator uruchomienia pipeline'u - ustawiany przez update_data.py i dziedziczony przez shardy.
+# Skrypt uruchomiony samodzielnie dostaje własny identyfikator (brak współdzielenia z innymi runami),
+# odnawiany co RUN_TTL - długo działający proces (np. worker) nie korzysta w nieskończoność ze starych sezonów.
+RUN_ID_ENV = "PIPELINE_RUN_ID"
+RUN_TTL = 24 * 3600
+
+_local_run = {"id": uuid.uuid4().hex[:12], "started": time.time()}
+# Pamięć sezonów w procesie - tylko dla bieżącego run_id: {"run_id": ..., "seasons": {team_id: season}}
+_season_memo = {"run_id": None, "seasons": {}}
+_season_lock = threading.Lock()
+
+def get_run_id() -> str:
+    run_id = os.getenv(RUN_ID_ENV)
+    if run_id:
+        return run_id
+    with _season_lock:
+        if time.time() - _local_run["started"] > RUN_TTL:
+            _local_run.update(id=uuid.uuid4().hex[:12], started=time.time())
+        return _local_run["id"]
+
+def _run_seasons(run_id: str) -> dict:
+    """Sezony zapamiętane w procesie dla `run_id`; zmiana uruchomienia czyści pamięć."""
+    with _season_lock:
+        if _season_memo["run_id"] != run_id:
+            _season_memo.update(run_id=run_id, seasons={})
+        return _season_memo["seasons"]
+
+def get_team_season_for_run(team_id: int):
+    """
+    Zwraca sezon drużyny (resolve_team_season) zapamiętany na czas bieżącego uruchomienia.
+    Wynik trzymany jest w pamięci procesu oraz w hashu Redis `team_run:{run_id}:season`,
+    więc kolejne etapy i shardy nie odpytują ponownie API o tę samą drużynę.
+    """
+    run_id = get_run_id()
+    seasons = _run_seasons(run_id)
+    if team_id in seasons:
+        return seasons[team_id]
+
+    memo_key = f"team_run:{run_id}:season"
+    cached = redis_client.hget(memo_key, team_id)
+    if cached is not None:
+        season = int(cached) if cached else None
+    else:
+        season = resolve_team_season(team_id)
+        redis_client.hset(memo_key, team_id, season if season is not None else "")
+        redis_client.expire(memo_key, RUN_TTL)
+
+    with _season_lock:
+        seasons[team_id] = season
+    return season
+
+def prefetch_team_seasons_for_run(team_ids: list):
+    """Wyznacza sezony listy drużyn jednym przebiegiem (jedno zapytanie do bazy) i zapamiętuje je dla runu."""
+    run_id = get_run_id()
+    memo = _run_seasons(run_id)
+    memo_key = f"team_run:{run_id}:season"
+    missing = [team_id for team_id in team_ids if team_id not in memo]
+    if not missing:
+        return
+    seasons = resolve_team_seasons(missing)
+    pipeline = redis_client.pipeline()
+    for team_id, season in seasons.items():
+        pipeline.hset(memo_key, team_id, season if season is not None else "")
+    pipeline.expire(memo_key, RUN_TTL)
+    pipeline.execute()
+    with _season_lock:
+        memo.update(seasons)
+
+class TeamWorkQueue:
+    """
+    Kolejka drużyn do przetworzenia przez etap ETL bez duplikatów.
+    Unikalność zapewnia zbiór Redis `team_queue:{run_id}:{stage}` - drużyna dodana raz
+    (także przez inny shard tego samego uruchomienia) nie trafi do kolejki ponownie.
+    """
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.key = f"team_queue:{get_run_id()}:{stage}"
+
+    def add_many(self, team_ids: list) -> list:
+        """Dodaje drużyny do kolejki; zwraca tylko nowe ID w kolejności wejściowej."""
+        unique_ids = list(dict.fromkeys(team_id for team_id in team_ids if team_id is not None))
+        if not unique_ids:
+            return []
+        try:
+            pipeline = redis_client.pipeline()
+            for team_id in unique_ids:
+                pipeline.sadd(self.key, team_id)
+            pipeline.expire(self.key, RUN_TTL)
+            added = pipeline.execute()[:-1]
+        except Exception as e:
+            log_error(logger, f"Błąd kolejki drużyn {self.key}, przetwarzanie bez współdzielenia: {e}")
+            return unique_ids
+
+        queued = [team_id for team_id, is_new in zip(unique_ids, added) if is_new]
+        skipped = len(team_ids) - len(queued)
+        log_info(logger, f"[{self.stage}] Drużyny w kolejce: {len(queued)} (pominięte duplikaty: {skipped})")
+        return queued
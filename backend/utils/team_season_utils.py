@@ -0,0 +1,129 @@
+import sys
+import os
+import json
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import text
+
+from config.db_connection import get_redis_connection, SessionLocal
+from utils.logging_utils import setup_logger, log_info, log_error
+from utils.teams_utils import get_latest_team_season
+
+# Setup logger for team seasons
+logger = setup_logger("team_season_utils")
+
+# Global Redis connection
+redis_client = get_redis_connection()
+
+# Hash team_id -> {"season", "season_end", "source", "probed"} trzymany między uruchomieniami
+TEAM_SEASON_KEY = "team_season"
+TEAM_SEASON_TTL = 15552000
+# Miesiące przełomu sezonu - gdy liga nie ma daty końca sezonu, w tym okresie sprawdzamy API
+SEASON_BOUNDARY_MONTHS = (6, 7, 8)
+# Jak często (w dniach) ponownie sprawdzać API dla drużyny na przełomie sezonu
+REPROBE_DAYS = 7
+PROBE_WORKERS = 5
+# Mecze z tego okresu wiążą drużynę z ligą (oprócz przyszłych meczów)
+RECENT_MATCHES_DAYS = 365
+
+def fetch_db_team_seasons(team_ids) -> dict:
+    """
+    Wyznacza sezon drużyn na podstawie danych w bazie: ligi przyszłych i ostatnich meczów
+    oraz `leagues.current_season` / `leagues.end_date`. Jedno zapytanie dla całej listy.
+    """
+    if not team_ids:
+        return {}
+    query = text("""
+        SELECT t.team_id, MAX(l.current_season) AS season, MAX(l.end_date) AS season_end
+        FROM (
+            SELECT home_team_id AS team_id, league_id FROM future_matches
+            UNION
+            SELECT away_team_id AS team_id, league_id FROM future_matches
+            UNION
+            SELECT home_team_id AS team_id, league_id FROM matches WHERE date >= NOW() - INTERVAL :days DAY
+            UNION
+            SELECT away_team_id AS team_id, league_id FROM matches WHERE date >= NOW() - INTERVAL :days DAY
+        ) t
+        JOIN leagues l ON l.league_id = t.league_id
+        WHERE t.team_id IN :team_ids
+        GROUP BY t.team_id
+    """)
+    try:
+        with SessionLocal() as session:
+            rows = session.execute(query, {"team_ids": tuple(team_ids), "days": RECENT_MATCHES_DAYS}).fetchall()
+    except SQLAlchemyError as e:
+        log_error(logger, f"Error fetching team seasons from database: {e}")
+        return {}
+    return {
+        row[0]: {"season": row[1], "season_end": row[2].isoformat() if row[2] else None}
+        for row in rows if row[1] is not None
+    }
+
+def needs_probe(entry: dict, today: date = None) -> bool:
+    """
+    Czy sezon drużyny trzeba potwierdzić w API (brak danych albo przełom sezonu).
+    Okno REPROBE_DAYS obowiązuje także dla wyniku negatywnego (API nie zwróciło sezonu).
+    """
+    today = today or date.today()
+    if not entry:
+        return True
+    if entry.get("probed") and date.fromisoformat(entry["probed"]) > today - timedelta(days=REPROBE_DAYS):
+        return False
+    if entry.get("season") is None:
+        return True
+    if entry.get("season_end"):
+        return date.fromisoformat(entry["season_end"]) < today
+    return today.month in SEASON_BOUNDARY_MONTHS
+
+def resolve_team_seasons(team_ids) -> dict:
+    """
+    Zwraca team_id -> sezon. Sezon pochodzi z bazy (ligi drużyny) i z hasha Redis `team_season`;
+    API (`teams/seasons` + `fixtures?last=5`) odpytywane jest tylko dla drużyn bez danych
+    oraz na przełomie sezonu (nie częściej niż co REPROBE_DAYS dni na drużynę).
+    """
+    team_ids = list(dict.fromkeys(team_id for team_id in team_ids if team_id is not None))
+    if not team_ids:
+        return {}
+
+    stored = {}
+    for team_id, raw in zip(team_ids, redis_client.hmget(TEAM_SEASON_KEY, team_ids)):
+        if raw:
+            stored[team_id] = json.loads(raw)
+
+    entries = {}
+    db_seasons = fetch_db_team_seasons(team_ids)
+    for team_id in team_ids:
+        entry = stored.get(team_id)
+        db_entry = db_seasons.get(team_id)
+        if db_entry and (not entry or entry.get("season") is None or db_entry["season"] >= entry["season"]):
+            entry = {**(entry or {}), **db_entry, "source": "db"}
+        entries[team_id] = entry
+
+    today = date.today()
+    to_probe = [team_id for team_id in team_ids if needs_probe(entries[team_id], today)]
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=max(1, min(PROBE_WORKERS, len(to_probe)))) as executor:
+            for team_id, season in zip(to_probe, executor.map(get_latest_team_season, to_probe)):
+                entry = entries[team_id]
+                if season is None and entry:
+                    season = entry.get("season")
+                entries[team_id] = {**(entry or {}), "season": season, "source": "api", "probed": today.isoformat()}
+
+    updates = {team_id: json.dumps(entry) for team_id, entry in entries.items() if entry and entries[team_id] != stored.get(team_id)}
+    if updates:
+        pipeline = redis_client.pipeline()
+        pipeline.hset(TEAM_SEASON_KEY, mapping=updates)
+        pipeline.expire(TEAM_SEASON_KEY, TEAM_SEASON_TTL)
+        pipeline.execute()
+
+    log_info(logger, f"Team seasons: {len(team_ids)} teams, {len(db_seasons)} from database, {len(to_probe)} API probes.")
+    return {team_id: entry.get("season") if entry else None for team_id, entry in entries.items()}
+
+def resolve_team_season(team_id: int):
+    """Sezon jednej drużyny (zob. resolve_team_seasons)."""
+    return resolve_team_seasons([team_id]).get(team_id)
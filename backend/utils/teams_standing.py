@@ -5,13 +5,14 @@ import json
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import text
 
 from api.api_requests import get_data
 from config.db_connection import get_redis_connection, SessionLocal
 from utils.logging_utils import setup_logger, log_error, log_info, log_warning
+from utils.teams_utils import get_existing_team_ids
 
 # Setup logger for notifications
 logger = setup_logger("utils_teams_standing")
@@ -20,6 +21,10 @@ logger = setup_logger("utils_teams_standing")
 redis_client = get_redis_connection()
 cache_ttl = 1209600
 
+# Zbiór "liga:sezon", dla których API nie zwraca tabeli - nie odpytujemy ich ponownie przez tydzień
+NO_DATA_SEASONS_PREFIX = "standings_no_data"
+NO_DATA_TTL = 604800
+
 def fetch_team_standing(team_id, season):
     # Redis cache key
     cache_key = f"team_standing_data:{team_id}:{season}"
@@ -49,8 +54,92 @@ def fetch_team_standing(team_id, season):
 
     return []  # Zwracamy pustą listę, jeśli nie znaleziono danych w żadnym sezonie
 
-def insert_team_standing_to_db(standings_data):
-    """ Wstawia lub aktualizuje dane klasyfikacji drużyn w bazie danych. :param standings_data: Dane z API (może być lista lub pojedynczy słownik) """
+def fetch_league_standing(league_id, season, refresh=False):
+    """
+    Pobiera całą tabelę ligi jednym zapytaniem `standings?league=&season=`.
+    Wynik trafia do cache `league_standing_data:{league_id}:{season}`; sezony bez danych
+    zapamiętywane są w osobnych kluczach `standings_no_data:{league_id}:{season}` (każdy z własnym TTL).
+    `refresh=True` pomija tylko cache tabeli - zapamiętany brak danych obowiązuje nadal.
+    Brak danych zapisywany jest wyłącznie dla pustej odpowiedzi API, nie po błędzie zapytania ani limicie.
+    """
+    cache_key = f"league_standing_data:{league_id}:{season}"
+    no_data_key = f"{NO_DATA_SEASONS_PREFIX}:{league_id}:{season}"
+
+    if refresh:
+        redis_client.delete(cache_key)
+    else:
+        cached_data = redis_client.get(cache_key)
+        if cached_data:
+            return json.loads(cached_data)
+    if redis_client.exists(no_data_key):
+        log_info(logger, f"Brak tabeli dla ligi {league_id} w sezonie {season} (zapamiętane), pomijam.")
+        return []
+
+    # cache=False - surowa odpowiedź odróżnia pustą tabelę (lista `response` bez błędów) od błędu (None)
+    data = get_data("standings", params={"league": league_id, "season": season}, cache=False)
+    if not isinstance(data, dict) or not isinstance(data.get('response'), list) or data.get('errors'):
+        log_warning(logger, f"Nie udało się pobrać tabeli ligi {league_id} na sezon {season}.")
+        return []
+    if data['response']:
+        standings = data['response']
+        pipeline = redis_client.pipeline()
+        pipeline.setex(cache_key, cache_ttl, json.dumps(standings))
+        pipeline.delete(no_data_key)
+        pipeline.execute()
+        return standings
+
+    log_info(logger, f"Brak danych tabeli dla ligi {league_id} na sezon {season}")
+    redis_client.setex(no_data_key, NO_DATA_TTL, 1)
+    return []
+
+def get_standing_team_ids(standings_data) -> set:
+    """Zwraca ID drużyn obecnych w danych klasyfikacji (wszystkie grupy - każda drużyna zapisywana jest z pierwszej)."""
+    team_ids = set()
+    for league_data in standings_data or []:
+        if not isinstance(league_data, dict):
+            continue
+        for group in league_data.get("league", {}).get("standings") or []:
+            team_ids.update(team.get('team', {}).get('id') for team in group if isinstance(team, dict))
+    team_ids.discard(None)
+    return team_ids
+
+def load_league_standings(league_teams: dict, refresh=True, max_workers=4, progress_bar=None) -> set:
+    """
+    Odświeża klasyfikacje dla lig: jedno zapytanie na ligę zamiast jednego na drużynę.
+    :param league_teams: league_id -> {"season": sezon, "team_ids": drużyny wymagające odświeżenia}
+    Zwraca zbiór drużyn, których wiersze zostały zapisane - pozostałe wymagają zapytania per drużyna.
+    """
+    covered = set()
+
+    def process_league(league_id, season):
+        standings = fetch_league_standing(league_id, season, refresh=refresh)
+        # Tabela ligi może zawierać drużyny spoza tabeli teams (klucz obcy) - zapisujemy tylko znane
+        team_ids = get_existing_team_ids(get_standing_team_ids(standings))
+        if team_ids:
+            insert_team_standing_to_db(standings, team_ids=team_ids)
+        return team_ids
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(process_league, league_id, league["season"]): league_id
+            for league_id, league in league_teams.items() if league.get("season")
+        }
+        for future in as_completed(futures):
+            league_id = futures[future]
+            try:
+                team_ids = future.result()
+                covered.update(team_ids & set(league_teams[league_id]["team_ids"]))
+            except Exception as e:
+                log_error(logger, f"Błąd podczas pobierania tabeli ligi {league_id}: {e}")
+            finally:
+                if progress_bar:
+                    progress_bar.update(1)
+
+    log_info(logger, f"Tabele lig: {len(futures)} zapytań, pokryte drużyny: {len(covered)}")
+    return covered
+
+def insert_team_standing_to_db(standings_data, team_ids=None):
+    """ Wstawia lub aktualizuje dane klasyfikacji drużyn w bazie danych. :param standings_data: Dane z API (może być lista lub pojedynczy słownik), :param team_ids: opcjonalny zbiór drużyn do zapisania """
 
     # Sprawdzamy, czy dane są listą, jeśli nie, zamieniamy je na listę
     if not isinstance(standings_data, list):
@@ -76,13 +165,22 @@ def insert_team_standing_to_db(standings_data):
             log_info(logger, f"Brak danych w klasyfikacji dla ligi ID {league_id}")
             continue
 
-        # Pobranie wszystkich drużyn w tej lidze
-        teams = teams[0]
+        # Tabela z kilkoma grupami (konferencje, rundy finałowe) ma kilka list. Klucz unikalny to
+        # (team_id, season, league_id), więc drużyna zapisywana jest tylko z pierwszej grupy, w której
+        # występuje - jak dotąd dla pierwszej grupy; drużyny z pozostałych grup dostają własny wiersz.
+        teams = [team for group in teams if isinstance(group, list) for team in group]
+        seen_team_ids = set()
 
         for team in teams:
             if not isinstance(team, dict):  # Sprawdzamy, czy team to słownik
                 log_error(logger, f"Nieprawidłowy format danych drużyny: {team}")
                 continue
+            team_id = team.get('team', {}).get('id')
+            if team_ids is not None and team_id not in team_ids:
+                continue
+            if team_id in seen_team_ids:
+                continue
+            seen_team_ids.add(team_id)
 
             row = {
                 "league_id": league_id,
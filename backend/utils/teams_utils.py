@@ -1,7 +1,6 @@
 import sys
 import os
 import json
-import datetime
 
 # Add the necessary directories to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -14,6 +13,7 @@ from api.api_requests import get_data
 from utils.progress_utils import create_progress_bar
 from config.db_connection import get_redis_connection, SessionLocal
 from utils.logging_utils import setup_logger, log_error, log_info, log_warning
+from utils.team_form_utils import compute_team_forms, fetch_team_form_from_api, get_team_coach, get_remembered_team_form, get_remembered_team_forms
 
 # Setup logger for notifications
 logger = setup_logger("teams_utils")
@@ -83,89 +83,80 @@ def get_teams_name():
         log_error(logger, f"Error fetching available teams: {e}")
         return []
 
-def check_missing_teams(team_ids, league_id, season):
-    """Check if all team IDs exist in the 'teams' table and log missing teams."""
-
+def get_existing_team_ids(team_ids) -> set:
+    """Zwraca podzbiór ID drużyn istniejących w tabeli teams (jedno zapytanie)."""
     if not team_ids:
-        return {}, []
-    placeholders = ", ".join([f":id_{i}" for i in range(len(team_ids))])
-    query = f"SELECT team_id, name FROM teams WHERE team_id IN ({placeholders})"
+        return set()
+    query = text("SELECT team_id FROM teams WHERE team_id IN :team_ids")
+    with SessionLocal() as session:
+        rows = session.execute(query, {"team_ids": tuple(team_ids)}).fetchall()
+    return {row[0] for row in rows}
 
+def ensure_teams_exist(team_leagues: dict, max_workers=4) -> set:
+    """
+    Uzupełnia brakujące drużyny przed zapisem meczów.
+    :param team_leagues: team_id -> (league_id, season) z danych meczów
+    Brakujące drużyny wyznaczane są jednym zapytaniem, każda liga z brakami pobierana jest
+    co najwyżej raz (równolegle). Zwraca zbiór drużyn obecnych w bazie po uzupełnieniu.
+    """
     try:
-        with SessionLocal() as session:
-            params = {f"id_{i}": team_id for i, team_id in enumerate(team_ids)}
-            existing_teams = {
-                row[0]: row[1]
-                for row in session.execute(text(query), params).fetchall()
-            }
-            missing_team_ids = set(team_ids) - set(existing_teams.keys())
-            if missing_team_ids:
-                log_warning(logger, f"Brakujące drużyny w bazie danych: {missing_team_ids}")
-                fetch_and_insert_teams(league_id=league_id, season=season)
-
-            return existing_teams, list(missing_team_ids)
+        existing = get_existing_team_ids(list(team_leagues))
     except SQLAlchemyError as e:
         log_error(logger, f"Error checking missing teams: {e}")
-        return {}, []
+        return set()
+
+    missing = set(team_leagues) - existing
+    if not missing:
+        return existing
+
+    leagues_to_fetch = {team_leagues[team_id] for team_id in missing if all(team_leagues[team_id])}
+    log_warning(logger, f"Brakujące drużyny w bazie danych: {missing} (ligi do pobrania: {len(leagues_to_fetch)})")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(leagues_to_fetch) or 1))) as executor:
+        futures = {
+            executor.submit(fetch_and_insert_teams, league_id=league_id, season=season): (league_id, season)
+            for league_id, season in leagues_to_fetch
+        }
+        for future, (league_id, season) in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                log_error(logger, f"Error fetching teams for league {league_id}, season {season}: {e}")
 
-def fetch_team_data(team, season, current_form=5, pbar=None):
+    try:
+        existing |= get_existing_team_ids(list(missing))
+    except SQLAlchemyError as e:
+        log_error(logger, f"Error checking missing teams: {e}")
+    return existing
+
+def fetch_team_data(team, season, current_form=5, pbar=None, forms=None):
+    """
+    Uzupełnia dane drużyny o trenera i formę.
+    Forma liczona jest lokalnie z tabeli matches (`forms` z compute_team_forms albo zapytanie dla tej drużyny);
+    potem forma zapamiętana z odpowiedzi `predictions`; zapytanie `fixtures?last=` do API tylko, gdy brakuje obu.
+    """
     try:
         team_data = team['team']
+        team_id = team_data['id']
 
-        # Fetch coach data
-        coach_name = None
-        coach_endpoint = "coachs"
-        coach_params = {"team": team_data['id']}
-        coach_response = get_data(coach_endpoint, params=coach_params)
-
-        if coach_response and 'response' in coach_response and coach_response['response']:
-            current_date = datetime.date.today()
-            latest_start = datetime.date.min
-            last_coach = None
-
-            for coach in coach_response['response']:
-                for career in coach.get("career", []):
-                    if career["team"]["id"] == team_data['id'] and career["end"] is None:
-                        start_date = datetime.datetime.strptime(career["start"], "%Y-%m-%d").date()
-                        if start_date <= current_date and start_date > latest_start:
-                            latest_start = start_date
-                            last_coach = coach
-            if last_coach:
-                coach_name = last_coach.get("name", None)
+        coach_name = get_team_coach(team_id)
 
         if pbar:
             pbar.update(1)  # Update progress bar after fetching coach data
 
-        # Fetch current form (last 5 matches)
-        fixtures_endpoint = "fixtures"
-        fixtures_params = {"team": team_data['id'], "season": season, "last": current_form}
-        fixtures_response = get_data(fixtures_endpoint, params=fixtures_params)
-        current_form = "W0-D0-L0"
-        form_percentage = 0
-        if fixtures_response and 'response' in fixtures_response and fixtures_response['response']:
-            last_matches = fixtures_response['response']
-            results = []
-            for match in last_matches:
-                if match['teams']['home']['id'] == team_data['id']:
-                    results.append(match['teams']['home']['winner'])
-                else:
-                    results.append(match['teams']['away']['winner'])
-
-            wins = results.count(True)
-            losses = results.count(False)
-            draws = results.count(None)
-
-            # Calculate form percentage
-            form_percentage = (wins * 20) + (draws * 10)
-            current_form = f"W{wins}-D{draws}-L{losses}"
+        if forms is None:
+            forms = compute_team_forms([team_id], last=current_form)
+        form = forms.get(team_id) or get_remembered_team_form(team_id)
+        if form is None:
+            form = fetch_team_form_from_api(team_id, season, last=current_form)
 
         if pbar:
             pbar.update(1) # Update progress bar after fetching form data
 
         # Add processed data to team object
         team['coach_name'] = coach_name
-        team['current_form'] = current_form
-        team['form_percentage'] = form_percentage
+        team['current_form'] = form['current_form']
+        team['form_percentage'] = form['form_percentage']
+        team['streak'] = form['streak']
 
         if pbar:
             pbar.update(1)  # Update progress bar after final processing
@@ -175,13 +166,14 @@ def fetch_team_data(team, season, current_form=5, pbar=None):
         log_error(logger, f"Error processing team data: {e}")
         return None
 
-def fetch_and_insert_team(team_id, season):
+def fetch_and_insert_team(team_id, season, forms=None):
     """
     Fetches and processes detailed team data for a specific team ID and season,
     then inserts it into the database.
 
     :param team_id: ID of the team
     :param season: Season year (e.g., 2023)
+    :param forms: Optional team forms computed in bulk (compute_team_forms)
     """
     # Redis cache key
     cache_key = f"team_full_data:{team_id}:{season}"
@@ -208,7 +200,7 @@ def fetch_and_insert_team(team_id, season):
             return []
 
         # Use fetch_team_data to process additional details
-        team = fetch_team_data(team, season, current_form=5)
+        team = fetch_team_data(team, season, current_form=5, forms=forms)
         if not team:
             log_warning(logger, f"Nie udało się przetworzyć danych dla drużyny o ID {team_id}.")
             return []
@@ -249,11 +241,16 @@ def fetch_and_insert_teams(league_id, season):
             return []
 
         teams = data['response']
+        # Forma wszystkich drużyn ligi jednym zapytaniem do bazy
+        team_ids = [t['team']['id'] for t in teams if 'team' in t and 'id' in t['team']]
+        forms = compute_team_forms(team_ids)
+        # Braki lokalnej formy uzupełniane formą zapamiętaną z `predictions` (jeden MGET dla całej ligi)
+        forms.update(get_remembered_team_forms([team_id for team_id in team_ids if team_id not in forms]))
 
         # Tworzenie paska postępu
         with create_progress_bar(total=len(teams) * 3, desc="Processing team data", unit="steps") as pbar:
             with ThreadPoolExecutor(max_workers=4) as executor:
-                teams = list(executor.map(lambda t: fetch_team_data(t, season, pbar=pbar), teams))
+                teams = list(executor.map(lambda t: fetch_team_data(t, season, pbar=pbar, forms=forms), teams))
 
         # Store full data in Redis for 30 days
         redis_client.setex(cache_key, cache_ttl, json.dumps(teams))
@@ -0,0 +1,108 @@
+import sys
+import os
+import argparse
+
+# Add the necessary directories to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.settings import load_env
+from utils.logging_utils import setup_logger, log_info, log_warning
+from utils.job_queue_utils import JOB_TYPES, JobWorker, enqueue_jobs, queue_stats
+from utils.match_statistics_utils import fetch_match_statistics, parse_match_statistics, insert_match_statistics_to_db
+from utils.match_events_utils import run_all_proccess_event_match
+from utils.match_utils import match_id_exists, get_unique_fixture_ids
+from utils.predictions_utils import fetch_predictions_for_match, fetch_predictions_matches, fetch_h2h_from_predictions
+from utils.h2h_utils import store_h2h_matches
+from utils.players_utils import fetch_and_insert_players
+from utils.future_utils import fetch_future_match_ids, fetch_future_team_ids
+from utils.team_queue_utils import get_team_season_for_run
+
+# Load environment variables from .env file (once per process)
+load_env()
+
+# Set up logging
+logger = setup_logger("worker")
+
+# Funkcje z utils/* logują błędy i zwracają pusty wynik - handler zgłasza wyjątek,
+# żeby JobWorker ponowił zadanie (a po MAX_ATTEMPTS przeniósł je do jobs:dead_letter)
+
+def handle_statistics(fixture_id):
+    """Statystyki meczu (tylko dla meczów obecnych w tabeli matches)."""
+    if not match_id_exists(fixture_id):
+        log_warning(logger, f"Match ID {fixture_id} does not exist in matches table. Skipping.")
+        return
+    statistics = fetch_match_statistics(fixture_id)
+    if not statistics:
+        raise LookupError(f"No statistics fetched for fixture {fixture_id}")
+    if not insert_match_statistics_to_db(parse_match_statistics(fixture_id, statistics)):
+        raise RuntimeError(f"Failed to store statistics for fixture {fixture_id}")
+
+def handle_events(fixture_id):
+    if not run_all_proccess_event_match(fixture_id):
+        raise RuntimeError(f"Failed to fetch or store events for fixture {fixture_id}")
+
+def handle_h2h(fixture_id):
+    h2h_matches = fetch_h2h_from_predictions([fixture_id])
+    if not h2h_matches:
+        raise LookupError(f"No H2H data for fixture {fixture_id}")
+    if not store_h2h_matches(h2h_matches):
+        raise RuntimeError(f"Failed to store H2H matches for fixture {fixture_id}")
+
+def handle_predictions(fixture_id):
+    if not fetch_predictions_for_match(fixture_id):
+        raise RuntimeError(f"No predictions stored for fixture {fixture_id}")
+
+def handle_players(team_id):
+    season = get_team_season_for_run(team_id)
+    if season is None:
+        raise ValueError(f"No season found for team {team_id}")
+    if not fetch_and_insert_players(team_id, season):
+        raise RuntimeError(f"Failed to fetch or store players for team {team_id}, season {season}")
+
+# Obsługa zadań według typu - korzysta z istniejących funkcji utils/*
+JOB_HANDLERS = {
+    "statistics": handle_statistics,
+    "events": handle_events,
+    "h2h": handle_h2h,
+    "predictions": handle_predictions,
+    "players": handle_players,
+}
+
+# Źródła zadań dla `enqueue` - te same zapytania co w etapach ETL (z uwzględnieniem sharda)
+JOB_SOURCES = {
+    "statistics": lambda: [{"fixture_id": fixture_id} for fixture_id in get_unique_fixture_ids()],
+    "events": lambda: [{"fixture_id": fixture_id} for fixture_id in get_unique_fixture_ids()],
+    "h2h": lambda: [{"fixture_id": fixture_id} for fixture_id in fetch_predictions_matches()],
+    "predictions": lambda: [{"fixture_id": fixture_id} for fixture_id in fetch_future_match_ids()],
+    "players": lambda: [{"team_id": team_id} for team_id in fetch_future_team_ids()],
+}
+
+def enqueue(job_types):
+    for job_type in job_types:
+        enqueue_jobs(job_type, JOB_SOURCES[job_type]())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker kolejki zadań (Redis Streams)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Przetwarzaj zadania z kolejki")
+    run_parser.add_argument("--types", nargs="+", choices=JOB_TYPES, default=list(JOB_TYPES))
+    run_parser.add_argument("--consumer", default=None, help="Nazwa konsumenta (domyślnie host-pid)")
+    run_parser.add_argument("--batch-size", type=int, default=10)
+    run_parser.add_argument("--drain", action="store_true", help="Zakończ, gdy kolejka jest pusta")
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Dodaj zadania do kolejki na podstawie bazy")
+    enqueue_parser.add_argument("--types", nargs="+", choices=JOB_TYPES, default=list(JOB_TYPES))
+
+    subparsers.add_parser("stats", help="Pokaż stan kolejek")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        worker = JobWorker(JOB_HANDLERS, job_types=args.types, consumer=args.consumer, batch_size=args.batch_size)
+        result = worker.run(drain=args.drain)
+        log_info(logger, f"Worker result: {result}")
+    elif args.command == "enqueue":
+        enqueue(args.types)
+    else:
+        for job_type, stats in queue_stats().items():
+            print(f"{job_type:<12} length={stats['length']:<8} pending={stats['pending']}")
@@ -0,0 +1,14 @@
+-- Klucz naturalny player_statistics: jeden wiersz na (zawodnik, drużyna, liga, sezon).
+-- Wymagany przez zbiorczy upsert w backend/utils/player_statistics_utils.py.
+
+-- Usunięcie ewentualnych duplikatów (zostaje wiersz o najwyższym id)
+DELETE ps_old FROM `player_statistics` ps_old
+JOIN `player_statistics` ps_new
+  ON ps_new.`player_id` = ps_old.`player_id`
+ AND ps_new.`team_id` = ps_old.`team_id`
+ AND ps_new.`league_id` = ps_old.`league_id`
+ AND ps_new.`season` = ps_old.`season`
+ AND ps_new.`id` > ps_old.`id`;
+
+ALTER TABLE `player_statistics`
+  ADD UNIQUE KEY `unique_player_team_league_season` (`player_id`,`team_id`,`league_id`,`season`);
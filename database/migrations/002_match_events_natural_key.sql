@@ -0,0 +1,48 @@
+-- Klucz naturalny match_events: (mecz, drużyna, zawodnik z API, typ, minuta, doliczony czas, numer kolejny).
+-- Dotąd tabela miała tylko klucz sztuczny, więc każde ponowne przetworzenie meczu dopisywało duplikaty.
+-- Zawodnik w kluczu to surowe ID z API (`api_player_id`), a nie player_id - klucz obcy do `players`,
+-- który bywa NULL, dopóki zawodnik nie zostanie dopisany; po jego uzupełnieniu klucz by się zmienił.
+-- NULL w unikalnym indeksie nie koliduje, dlatego zawodnik i doliczony czas wchodzą do klucza
+-- przez kolumny generowane (NULL -> 0).
+
+ALTER TABLE `match_events`
+  ADD COLUMN `api_player_id` int(11) DEFAULT NULL AFTER `player_id`,
+  ADD COLUMN `event_seq` smallint(5) UNSIGNED NOT NULL DEFAULT 0 AFTER `assist_player_id`;
+
+-- Dla istniejących wierszy z rozpoznanym zawodnikiem ID z API to player_id
+UPDATE `match_events` SET `api_player_id` = `player_id` WHERE `player_id` IS NOT NULL;
+
+-- Wiersze z nierozpoznanym zawodnikiem nie mają zapisanego ID z API - z kluczem 0 zostałyby obok
+-- wierszy dopisanych przy ponownym przetworzeniu meczu. Usuwamy je; wracają z poprawnym kluczem
+-- po ponownym przetworzeniu zdarzeń (np. `python worker.py enqueue --types events`).
+DELETE FROM `match_events` WHERE `player_id` IS NULL;
+
+ALTER TABLE `match_events`
+  ADD COLUMN `player_key` int(11) GENERATED ALWAYS AS (coalesce(`api_player_id`,0)) STORED AFTER `event_seq`,
+  ADD COLUMN `extra_time_key` smallint(5) UNSIGNED GENERATED ALWAYS AS (coalesce(`extra_time`,0)) STORED AFTER `player_key`;
+
+-- Usunięcie duplikatów z ponownych uruchomień (identyczne zdarzenia - zostaje wiersz o najniższym id)
+DELETE dup FROM `match_events` dup
+JOIN `match_events` orig
+  ON orig.`match_id` = dup.`match_id`
+ AND orig.`team_id` = dup.`team_id`
+ AND orig.`player_key` = dup.`player_key`
+ AND orig.`event_type` = dup.`event_type`
+ AND orig.`event_time` = dup.`event_time`
+ AND orig.`extra_time_key` = dup.`extra_time_key`
+ AND orig.`event_detail` = dup.`event_detail`
+ AND orig.`id` < dup.`id`;
+
+-- Numer kolejny dla pozostałych zdarzeń o tym samym kluczu (w kolejności zapisu, jak w parserze)
+UPDATE `match_events` me
+JOIN (
+    SELECT `id`, ROW_NUMBER() OVER (
+        PARTITION BY `match_id`, `team_id`, `player_key`, `event_type`, `event_time`, `extra_time_key`
+        ORDER BY `id`
+    ) - 1 AS `seq`
+    FROM `match_events`
+) ranked ON ranked.`id` = me.`id`
+SET me.`event_seq` = ranked.`seq`;
+
+ALTER TABLE `match_events`
+  ADD UNIQUE KEY `unique_event` (`match_id`,`team_id`,`player_key`,`event_type`,`event_time`,`extra_time_key`,`event_seq`);
@@ -91,8 +91,12 @@ CREATE TABLE `match_events` (
   `event_detail` varchar(64) NOT NULL,
   `is_penalty` tinyint(1) NOT NULL DEFAULT 0,
   `player_id` int(11) DEFAULT NULL,
+  `api_player_id` int(11) DEFAULT NULL,
   `team_id` int(11) NOT NULL,
   `assist_player_id` int(11) DEFAULT NULL,
+  `event_seq` smallint(5) UNSIGNED NOT NULL DEFAULT 0,
+  `player_key` int(11) GENERATED ALWAYS AS (coalesce(`api_player_id`,0)) STORED,
+  `extra_time_key` smallint(5) UNSIGNED GENERATED ALWAYS AS (coalesce(`extra_time`,0)) STORED,
   `last_data_insert` datetime DEFAULT current_timestamp() ON UPDATE current_timestamp()
 ) ;
 
@@ -254,6 +258,7 @@ ALTER TABLE `matches`
 
 ALTER TABLE `match_events`
   ADD PRIMARY KEY (`id`),
+  ADD UNIQUE KEY `unique_event` (`match_id`,`team_id`,`player_key`,`event_type`,`event_time`,`extra_time_key`,`event_seq`),
   ADD KEY `player_id` (`player_id`),
   ADD KEY `idx_match_team` (`match_id`,`team_id`);
 
@@ -269,6 +274,7 @@ ALTER TABLE `players`
 
 ALTER TABLE `player_statistics`
   ADD PRIMARY KEY (`id`),
+  ADD UNIQUE KEY `unique_player_team_league_season` (`player_id`,`team_id`,`league_id`,`season`),
   ADD KEY `player_statistics_ibfk_1` (`player_id`),
   ADD KEY `player_statistics_ibfk_2` (`team_id`),
   ADD KEY `player_statistics_ibfk_3` (`league_id`);